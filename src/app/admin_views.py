@@ -0,0 +1,277 @@
+# app/admin_views.py
+"""
+Views do Flask-Admin para as tabelas grandes (LEITURAS_SENSOR, FALHAS, ALERTAS).
+
+O ModelView padrão faz COUNT(*) + OFFSET em toda listagem; com dezenas de milhões de
+leituras a página estoura o timeout. KeysetModelView:
+
+- Paginação keyset em (data, id) decrescente, como /api/alerts: a próxima página é
+  `data/id < último da página` (?apos=), a anterior `> primeiro` (?antes=); o número da
+  página na URL é só rótulo. Sem COUNT: pager simples (anterior/próxima), sem total
+- Ordenação fixa pela chave do keyset (colunas não ordenáveis) e sem busca textual
+  (LIKE varre a tabela); filtros só em colunas indexadas (sensor, peça, data, status)
+- Sem filtro de data, a lista mostra as últimas ADMIN_JANELA_HORAS (default 24h)
+- Sensor/peça (e a falha, em ALERTAS) carregados na mesma consulta (joinedload), sem
+  um SELECT por linha ao renderizar
+- Exportar CSV não trava a requisição: a seleção filtrada (mesma janela/filtros da lista)
+  é gravada em segundo plano, em lotes keyset, em ADMIN_EXPORT_DIR/<job>.csv; o link da
+  mensagem baixa o arquivo quando estiver pronto (estado pelo arquivo: .part/.csv/.err,
+  vale entre workers do gunicorn no mesmo container). Até ADMIN_EXPORT_MAX linhas
+
+Ambiente (opcional):
+    ADMIN_JANELA_HORAS=24   ADMIN_PAGE_SIZE=50
+    ADMIN_EXPORT_DIR=/tmp/admin_exports   ADMIN_EXPORT_LOTE=5000   ADMIN_EXPORT_MAX=1000000
+"""
+import csv
+import os
+import re
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app, flash, g, has_request_context, redirect, request, send_file, url_for
+from flask_admin import Admin, expose
+from flask_admin.contrib.sqla import ModelView
+from flask_admin.contrib.sqla import filters as flt
+from flask_admin.helpers import get_redirect_target
+from markupsafe import Markup
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import contains_eager, joinedload
+
+from .extensions import db
+from .models import Alerta, Ciclo, Falha, Leitura, Peca, Sensor
+
+ADMIN_JANELA_HORAS = float(os.getenv("ADMIN_JANELA_HORAS", "24"))
+ADMIN_PAGE_SIZE = int(os.getenv("ADMIN_PAGE_SIZE", "50"))
+ADMIN_EXPORT_DIR = os.getenv("ADMIN_EXPORT_DIR", os.path.join(tempfile.gettempdir(), "admin_exports"))
+ADMIN_EXPORT_LOTE = int(os.getenv("ADMIN_EXPORT_LOTE", "5000"))
+ADMIN_EXPORT_MAX = int(os.getenv("ADMIN_EXPORT_MAX", "1000000"))
+
+_exports = ThreadPoolExecutor(max_workers=1, thread_name_prefix="admin-export")
+_JOB = re.compile(r"^[\w-]+$")
+
+
+def _coluna(c):
+    """Column de um atributo mapeado (Leitura.id_sensor) ou da própria Column."""
+    return c.property.columns[0] if hasattr(c, "property") else c
+
+
+class KeysetModelView(ModelView):
+    """ModelView sem COUNT/OFFSET: keyset em `chave` = (coluna de data, coluna de id), decrescente."""
+
+    chave = ()
+    carregar = ()                   # opções de eager load aplicadas em get_query
+
+    simple_list_pager = True
+    page_size = ADMIN_PAGE_SIZE
+    can_set_page_size = True
+    column_display_pk = True
+    column_sortable_list = ()
+    column_searchable_list = ()
+    can_export = True
+    export_types = ["csv"]
+
+    def get_query(self):
+        return super().get_query().options(*self.carregar)
+
+    # ---------------- keyset ----------------
+    def _chave(self, obj) -> tuple:
+        return tuple(getattr(obj, c.key) for c in self.chave)
+
+    def _cursor(self, obj) -> str:
+        data, id_ = self._chave(obj)
+        return f"{data.isoformat()}|{id_}"
+
+    @staticmethod
+    def _parse_cursor(cursor: str):
+        data, id_ = cursor.rsplit("|", 1)
+        return datetime.fromisoformat(data), int(id_)
+
+    def _filtra_data(self, filters) -> bool:
+        alvo = _coluna(self.chave[0])
+        return any(_coluna(self._filters[idx].column) is alvo for idx, _, _ in filters or ())
+
+    def get_list(self, page, sort_column, sort_desc, search, filters, execute=True, page_size=None,
+                 *, apos=None, antes=None):
+        """Página da lista (ou lote do export): filtros -> janela padrão -> keyset -> LIMIT."""
+        if has_request_context() and apos is None and antes is None:
+            apos, antes = request.args.get("apos"), request.args.get("antes")
+        data, id_ = self.chave
+
+        query = self.get_query()
+        if filters and self._filters:
+            query, _, _, _ = self._apply_filters(query, None, {}, {}, filters)
+        if not self._filtra_data(filters):
+            query = query.filter(data >= datetime.utcnow() - timedelta(hours=ADMIN_JANELA_HORAS))
+
+        try:
+            c_data, c_id = self._parse_cursor(antes or apos) if (antes or apos) else (None, None)
+        except ValueError:
+            c_data = c_id = antes = apos = None
+        if antes:
+            query = query.filter(or_(data > c_data, and_(data == c_data, id_ > c_id))).order_by(data, id_)
+        else:
+            if apos:
+                query = query.filter(or_(data < c_data, and_(data == c_data, id_ < c_id)))
+            query = query.order_by(data.desc(), id_.desc())
+        query = query.limit(page_size or self.page_size)
+        if not execute:
+            return None, query
+
+        rows = query.all()
+        if antes:
+            rows.reverse()
+        if has_request_context():
+            g.admin_keyset = {
+                "pagina": request.args.get("page", 0, type=int),
+                "anterior": self._cursor(rows[0]) if rows else None,
+                "proximo": self._cursor(rows[-1]) if rows else None,
+            }
+            if not self._filtra_data(filters) and request.endpoint == f"{self.endpoint}.index_view":
+                flash(f"Sem filtro de data: mostrando as últimas {ADMIN_JANELA_HORAS:g}h.", "info")
+        return None, rows
+
+    def _get_list_url(self, view_args):
+        """Links do pager levam o cursor: página+1 -> ?apos=, página-1 -> ?antes=."""
+        extra = {k: v for k, v in view_args.extra_args.items() if k not in ("apos", "antes")}
+        nav = g.get("admin_keyset") or {"pagina": 0}
+        page = view_args.page or 0
+        if page == nav["pagina"]:
+            extra.update({k: request.args[k] for k in ("apos", "antes") if k in request.args})
+        elif page == nav["pagina"] + 1 and nav.get("proximo"):
+            extra["apos"] = nav["proximo"]
+        elif page == nav["pagina"] - 1 and page > 0 and nav.get("anterior"):
+            extra["antes"] = nav["anterior"]
+        else:
+            page = 0
+        return super()._get_list_url(view_args.clone(page=page, extra_args=extra))
+
+    # ---------------- exportação assíncrona ----------------
+    def _arquivo(self, job: str, sufixo: str) -> str:
+        return os.path.join(ADMIN_EXPORT_DIR, f"{job}{sufixo}")
+
+    def _exportar(self, app, filtros, job: str) -> None:
+        """Roda no pool: grava a seleção em <job>.csv.part em lotes keyset e renomeia no fim."""
+        parcial = self._arquivo(job, ".csv.part")
+        with app.app_context():
+            try:
+                with open(parcial, "w", newline="", encoding="utf-8") as f:
+                    w = csv.writer(f)
+                    w.writerow([str(nome) for _, nome in self._export_columns])
+                    n, apos = 0, None
+                    while n < ADMIN_EXPORT_MAX:
+                        _, rows = self.get_list(0, None, False, None, filtros, apos=apos,
+                                                page_size=min(ADMIN_EXPORT_LOTE, ADMIN_EXPORT_MAX - n))
+                        if not rows:
+                            break
+                        for r in rows:
+                            w.writerow([self.get_export_value(r, c) for c, _ in self._export_columns])
+                        n += len(rows)
+                        apos = self._cursor(rows[-1])
+                        # fim da transação a cada lote: não segura snapshot (nem o checkpoint do WAL)
+                        self.session.rollback()
+                        self.session.expunge_all()
+                os.replace(parcial, self._arquivo(job, ".csv"))
+                print(f"[admin] export {job}: {n} linhas")
+            except Exception as e:
+                with open(self._arquivo(job, ".err"), "w", encoding="utf-8") as f:
+                    f.write(str(e).splitlines()[0] if str(e) else type(e).__name__)
+                if os.path.exists(parcial):
+                    os.remove(parcial)
+                print(f"[admin] export {job} falhou: {e}")
+            finally:
+                self.session.remove()
+
+    @expose("/export/<export_type>/")
+    def export(self, export_type):
+        return_url = get_redirect_target() or self.get_url(".index_view")
+        if not self.can_export or export_type not in self.export_types:
+            flash("Permissão negada.", "error")
+            return redirect(return_url)
+        os.makedirs(ADMIN_EXPORT_DIR, exist_ok=True)
+        job = f"{self.endpoint}-{datetime.utcnow():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}"
+        filtros = self._get_list_extra_args().filters
+        open(self._arquivo(job, ".csv.part"), "w").close()     # "em andamento" já visível
+        _exports.submit(self._exportar, current_app._get_current_object(), filtros, job)
+        link = url_for(".exportacao", job=job)
+        flash(Markup(f'Exportação iniciada em segundo plano: <a href="{link}">{job}.csv</a> '
+                     f"(o link baixa o arquivo quando estiver pronto)."), "info")
+        return redirect(url_for(".index_view", **request.args))
+
+    @expose("/exportacao/<job>/")
+    def exportacao(self, job):
+        if not _JOB.match(job) or not job.startswith(f"{self.endpoint}-"):
+            flash("Exportação inexistente.", "error")
+            return redirect(url_for(".index_view"))
+        pronto, erro = self._arquivo(job, ".csv"), self._arquivo(job, ".err")
+        if os.path.exists(pronto):
+            return send_file(pronto, mimetype="text/csv", as_attachment=True, download_name=f"{job}.csv")
+        if os.path.exists(erro):
+            with open(erro, encoding="utf-8") as f:
+                flash(f"Exportação {job} falhou: {f.read()}", "error")
+        elif os.path.exists(self._arquivo(job, ".csv.part")):
+            flash(Markup(f'Exportação {job} em andamento; <a href="{url_for(".exportacao", job=job)}">'
+                         f"tente de novo</a> em instantes."), "info")
+        else:
+            flash("Exportação inexistente.", "error")
+        return redirect(url_for(".index_view"))
+
+
+def _datas(coluna, nome: str) -> list:
+    return [flt.DateTimeBetweenFilter(coluna, nome), flt.DateTimeGreaterFilter(coluna, nome),
+            flt.DateTimeSmallerFilter(coluna, nome)]
+
+
+class LeituraView(KeysetModelView):
+    chave = (Leitura.leitura_data_hora, Leitura.id_leitura)
+    carregar = (joinedload(Leitura.sensor).joinedload(Sensor.peca),)
+    column_list = ("id_leitura", "leitura_data_hora", "id_sensor", "sensor.tipo_sensor", "sensor.peca.tipo",
+                   "leitura_valor")
+    column_labels = {"sensor.tipo_sensor": "Tipo sensor", "sensor.peca.tipo": "Peça"}
+    # (id_sensor[, data]) -> IX_LEITURAS_SENSOR_DATA; só data -> IX_LEITURAS_DATA
+    column_filters = [flt.IntEqualFilter(Leitura.id_sensor, "Sensor"), *_datas(Leitura.leitura_data_hora, "Data")]
+
+
+class FalhaView(KeysetModelView):
+    chave = (Falha.data, Falha.id_falha)
+    carregar = (joinedload(Falha.sensor), joinedload(Falha.peca))
+    column_list = ("id_falha", "data", "status", "id_sensor", "sensor.tipo_sensor", "peca.tipo",
+                   "qtd_excedencias", "valor_pico", "ultima_ocorrencia", "data_fim", "origem", "descricao")
+    column_labels = {"sensor.tipo_sensor": "Tipo sensor", "peca.tipo": "Peça"}
+    # IX_FALHAS_DATA / IX_FALHAS_SENSOR_DATA / IX_FALHAS_PECA_DATA / IX_FALHAS_SENSOR_STATUS
+    column_filters = [flt.IntEqualFilter(Falha.id_sensor, "Sensor"), flt.IntEqualFilter(Falha.id_peca, "Peça"),
+                      flt.FilterEqual(Falha.status, "Status"), *_datas(Falha.data, "Data")]
+
+
+class AlertaView(KeysetModelView):
+    """Alertas ordenados pela data do incidente (JOIN FALHAS, como /api/alerts)."""
+    chave = (Falha.data, Alerta.id_alerta)
+    column_list = ("id_alerta", "falha.data", "nivel_risco", "id_falha", "falha.status", "falha.id_sensor",
+                   "falha.sensor.tipo_sensor", "falha.peca.tipo")
+    column_labels = {"falha.data": "Data", "falha.status": "Status", "falha.id_sensor": "Sensor",
+                     "falha.sensor.tipo_sensor": "Tipo sensor", "falha.peca.tipo": "Peça"}
+    column_filters = [flt.FilterEqual(Alerta.nivel_risco, "Nível"), flt.IntEqualFilter(Falha.id_sensor, "Sensor"),
+                      flt.FilterEqual(Falha.status, "Status"), *_datas(Falha.data, "Data")]
+    form_excluded_columns = ("falha",)      # select com todas as FALHAS no formulário
+
+    def _chave(self, obj) -> tuple:
+        return obj.falha.data, obj.id_alerta
+
+    def get_query(self):
+        return (
+            self.session.query(Alerta)
+            .join(Alerta.falha)
+            .options(contains_eager(Alerta.falha).joinedload(Falha.sensor),
+                     contains_eager(Alerta.falha).joinedload(Falha.peca))
+        )
+
+
+def init_admin(app) -> None:
+    admin = Admin(app, name="Admin", template_mode="bootstrap4")
+    admin.add_view(ModelView(Peca, db.session))
+    admin.add_view(ModelView(Sensor, db.session))
+    admin.add_view(ModelView(Ciclo, db.session))
+    admin.add_view(LeituraView(Leitura, db.session))
+    admin.add_view(FalhaView(Falha, db.session))
+    admin.add_view(AlertaView(Alerta, db.session))
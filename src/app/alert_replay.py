@@ -0,0 +1,264 @@
+# app/alert_replay.py
+"""
+Reavaliação offline dos alertas a partir do histórico de LEITURAS_SENSOR.
+
+Depois de um backfill (app/bulk.py, que não passa pelo motor) ou de mudar ALERT_THRESH_*,
+ALERT_MIN_STREAK, ALERT_WINDOW_SECONDS ou ALERT_COOLDOWN_SECONDS, recalcula quais
+incidentes de origem "leitura" (FALHAS + ALERTAS) deveriam existir e compara com os gravados.
+
+Mesma regra do motor online (app/alerting.py), com as leituras em ordem (data, id_leitura):
+- excedência: valor >= limiar do tipo do sensor
+- abertura: sem incidente ativo, a leitura atual e as N-1 anteriores do sensor são
+  excedências e cobrem <= ALERT_WINDOW_SECONDS -> data = leitura atual, qtd = N,
+  pico = máx. das N
+- coalescência: excedência a <= ALERT_COOLDOWN_SECONDS da anterior absorvida soma 1 na qtd,
+  atualiza pico e última ocorrência; intervalo maior encerra o incidente (data_fim =
+  última ocorrência) e a excedência volta a ser candidata a abertura
+- status: resolvida se encerrada ou sem excedência há mais que o cooldown (como
+  resolve_expired); senão aberta (nada coalescido) ou em_andamento
+
+Vetorizado (NumPy), sem laço por leitura: comprimento da sequência de excedências por
+cumsum -> candidatas a abertura; excedências quebradas em segmentos por sensor e
+intervalo > cooldown -> em cada segmento o incidente abre na 1ª candidata e absorve o
+resto do segmento (qtd, pico e última ocorrência por reduceat).
+
+Leituras lidas em blocos (yield_per) em ordem (id_sensor, data, id) pelo índice
+IX_LEITURAS_SENSOR_DATA; o último sensor de cada bloco segue para o próximo, então a
+memória é a do maior sensor (~24 bytes/leitura), não a da tabela.
+
+Fora do escopo: incidentes origem "api" (POST /api/alerts) não são recalculados; no motor
+online eles também absorvem excedências de leitura, então sensores com alertas externos
+podem divergir. Empates de timestamp seguem id_leitura.
+
+Como rodar:
+    docker compose exec web python -m app.alert_replay                 (só relatório)
+    docker compose exec web python -m app.alert_replay --aplicar        (insere/corrige)
+    docker compose exec web python -m app.alert_replay --aplicar --podar  (+ apaga os que sobram)
+    [--sensor 3 --sensor 4] [--agora 2025-10-04T12:00:00]
+"""
+import argparse
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import bindparam, delete, insert, select, update
+
+from .alerting import ABERTA, EM_ANDAMENTO, RESOLVIDA, threshold_for
+from .extensions import db
+from .models import Alerta, Falha, Leitura, Sensor
+
+REPLAY_CHUNK = int(os.getenv("ALERT_REPLAY_CHUNK", "200000"))
+ORIGEM = "leitura"
+US = 1_000_000
+
+
+def find_incidents(sensor: np.ndarray, ts_us: np.ndarray, valores: np.ndarray, limiar: np.ndarray,
+                   streak: int, window_s: float, cooldown_s: float) -> dict:
+    """
+    Incidentes da regra online sobre leituras ordenadas por (sensor, data, id).
+    Entradas alinhadas por leitura (ts em µs, limiar do sensor de cada leitura).
+    Retorna arrays por incidente: id_sensor, data, ultima (µs), qtd, pico, valor (da
+    leitura de abertura) e ultimo_do_sensor (nenhuma excedência do sensor depois do incidente).
+    """
+    n = len(ts_us)
+    vazio = {k: np.empty(0, dtype=d) for k, d in (
+        ("id_sensor", np.int64), ("data", np.int64), ("ultima", np.int64), ("qtd", np.int64),
+        ("pico", float), ("valor", float), ("ultimo_do_sensor", bool))}
+    if n == 0:
+        return vazio
+    idx = np.arange(n)
+    with np.errstate(invalid="ignore"):
+        exc = valores >= limiar                       # NaN nunca é excedência
+    novo_sensor = np.r_[True, sensor[1:] != sensor[:-1]]
+
+    # comprimento da sequência de excedências consecutivas terminando em i
+    inicio = exc & (novo_sensor | ~np.r_[False, exc[:-1]])
+    ultimo_inicio = np.maximum.accumulate(np.where(inicio, idx, 0))
+    run = np.where(exc, idx - ultimo_inicio + 1, 0)
+    cand = run >= streak
+    primeira = np.where(cand, idx - (streak - 1), 0)
+    cand &= (ts_us - ts_us[primeira]) <= window_s * US
+
+    # só excedências: segmentos = mesmo sensor e intervalo <= cooldown
+    e = np.flatnonzero(exc)
+    if len(e) == 0:
+        return vazio
+    s_e, t_e, v_e, c_e = sensor[e], ts_us[e], valores[e], cand[e]
+    quebra = np.r_[True, (s_e[1:] != s_e[:-1]) | ((t_e[1:] - t_e[:-1]) > cooldown_s * US)]
+    seg = np.cumsum(quebra) - 1
+    fim_seg = np.r_[np.flatnonzero(quebra)[1:] - 1, len(e) - 1]
+
+    pos = np.flatnonzero(c_e)
+    if len(pos) == 0:
+        return vazio
+    abre = pos[np.r_[True, seg[pos][1:] != seg[pos][:-1]]]    # 1ª candidata de cada segmento
+    fim = fim_seg[seg[abre]]
+
+    # pico = máx(N leituras da abertura (consecutivas em e), excedências absorvidas)
+    pico = v_e[abre].copy()
+    for k in range(1, streak):
+        pico = np.maximum(pico, v_e[abre - k])
+    cortes = np.empty(2 * len(abre), dtype=np.int64)
+    cortes[0::2], cortes[1::2] = abre, fim + 1
+    absorvidas = np.maximum.reduceat(np.r_[v_e, -np.inf], cortes)[0::2]
+
+    seg_final_sensor = np.r_[s_e[1:] != s_e[:-1], True]        # último segmento do sensor?
+    return {
+        "id_sensor": s_e[abre].astype(np.int64),
+        "data": t_e[abre],
+        "ultima": t_e[fim],
+        "qtd": (fim - abre + streak).astype(np.int64),
+        "pico": np.maximum(pico, absorvidas),
+        "valor": v_e[abre],
+        "ultimo_do_sensor": seg_final_sensor[fim],
+    }
+
+
+def _to_dt(us) -> datetime:
+    return np.datetime64(int(us), "us").astype(datetime)
+
+
+def _read_blocks(ids: list = None):
+    """(sensor, ts_us, valor) em blocos; cada bloco termina num sensor completo."""
+    stmt = (
+        select(Leitura.id_sensor, Leitura.leitura_data_hora, Leitura.leitura_valor)
+        .where(Leitura.id_sensor.isnot(None), Leitura.leitura_data_hora.isnot(None))
+        .order_by(Leitura.id_sensor, Leitura.leitura_data_hora, Leitura.id_leitura)
+        .execution_options(yield_per=REPLAY_CHUNK)
+    )
+    if ids:
+        stmt = stmt.where(Leitura.id_sensor.in_(ids))
+    resto = None
+    with db.engine.connect() as conn:
+        for part in conn.execute(stmt).partitions(REPLAY_CHUNK):
+            bloco = (
+                np.fromiter((r[0] for r in part), np.int64, len(part)),
+                np.array([r[1] for r in part], dtype="datetime64[us]").astype(np.int64),
+                np.fromiter((np.nan if r[2] is None else float(r[2]) for r in part), float, len(part)),
+            )
+            if resto is not None:
+                bloco = tuple(np.concatenate(p) for p in zip(resto, bloco))
+            corte = int(np.searchsorted(bloco[0], bloco[0][-1]))   # início do último sensor
+            resto = tuple(a[corte:] for a in bloco)
+            if corte:
+                yield tuple(a[:corte] for a in bloco)
+    if resto is not None and len(resto[0]):
+        yield resto
+
+
+def recompute(ids: list = None, agora: datetime = None) -> tuple:
+    """Incidentes esperados [{...}] por (id_sensor, data) + nº de leituras e segundos no kernel."""
+    cfg = current_app.config
+    streak, window = int(cfg["ALERT_MIN_STREAK"]), int(cfg["ALERT_WINDOW_SECONDS"])
+    cooldown = int(cfg["ALERT_COOLDOWN_SECONDS"])
+    agora_us = np.datetime64(agora or datetime.utcnow(), "us").astype(np.int64)
+
+    sensores = {s.id_sensor: s for s in db.session.query(Sensor)}
+    esperados, leituras, t_kernel = {}, 0, 0.0
+    for sensor, ts, valores in _read_blocks(ids):
+        t0 = time.perf_counter()
+        u, inv = np.unique(sensor, return_inverse=True)
+        lim_u = np.array([threshold_for(sensores[s].tipo_sensor) if s in sensores else np.inf for s in u.tolist()])
+        inc = find_incidents(sensor, ts, valores, lim_u[inv], streak, window, cooldown)
+        t_kernel += time.perf_counter() - t0
+        leituras += len(ts)
+
+        resolvida = ~inc["ultimo_do_sensor"] | (inc["ultima"] < agora_us - cooldown * US)
+        for i in range(len(inc["data"])):
+            s = sensores[int(inc["id_sensor"][i])]
+            qtd, ultima = int(inc["qtd"][i]), _to_dt(inc["ultima"][i])
+            status = RESOLVIDA if resolvida[i] else (ABERTA if qtd == streak else EM_ANDAMENTO)
+            data = _to_dt(inc["data"][i])
+            esperados[(s.id_sensor, data)] = {
+                "id_peca": s.id_peca, "id_sensor": s.id_sensor, "data": data, "origem": ORIGEM,
+                "descricao": (f"Excedido limiar ({threshold_for(s.tipo_sensor)}) em {streak} leituras para o sensor "
+                              f"{s.id_sensor} ({s.tipo_sensor}). Valor atual={float(inc['valor'][i])}")[:255],
+                "qtd_excedencias": qtd, "valor_pico": float(inc["pico"][i]), "ultima_ocorrencia": ultima,
+                "status": status, "data_fim": ultima if status == RESOLVIDA else None,
+            }
+    return esperados, leituras, t_kernel
+
+
+CAMPOS_DIFF = ("qtd_excedencias", "ultima_ocorrencia", "status", "data_fim")
+
+
+def _igual(atual, novo: dict) -> bool:
+    if any(getattr(atual, c) != novo[c] for c in CAMPOS_DIFF):
+        return False
+    return atual.valor_pico is not None and abs(atual.valor_pico - novo["valor_pico"]) <= 1e-4
+
+
+def diff(esperados: dict, ids: list = None) -> dict:
+    q = db.session.query(Falha).filter(Falha.origem == ORIGEM)
+    if ids:
+        q = q.filter(Falha.id_sensor.in_(ids))
+    existentes = {(f.id_sensor, f.data): f for f in q}
+    return {
+        "novos": [v for k, v in esperados.items() if k not in existentes],
+        "divergentes": [(existentes[k], v) for k, v in esperados.items()
+                        if k in existentes and not _igual(existentes[k], v)],
+        "sobrando": [f for k, f in existentes.items() if k not in esperados],
+        "iguais": sum(1 for k, v in esperados.items() if k in existentes and _igual(existentes[k], v)),
+    }
+
+
+def apply(d: dict, podar: bool = False) -> None:
+    """Grava o diff numa transação: INSERT em lote (+ ALERTA), UPDATE em lote, DELETE opcional."""
+    if d["novos"]:
+        db.session.execute(insert(Falha), d["novos"])
+        # ALERTA para as falhas recém-inseridas (ids gerados pelo banco, achadas pela chave
+        # (id_sensor, data)); falhas de outros sensores fora do --sensor ficam como estão
+        chaves = {(v["id_sensor"], v["data"]) for v in d["novos"]}
+        orfas = (
+            select(Falha.id_falha, Falha.id_sensor, Falha.data)
+            .outerjoin(Alerta, Alerta.id_falha == Falha.id_falha)
+            .where(Falha.origem == ORIGEM, Alerta.id_alerta.is_(None),
+                   Falha.id_sensor.in_({s for s, _ in chaves}),
+                   Falha.data.between(min(dt for _, dt in chaves), max(dt for _, dt in chaves)))
+        )
+        db.session.execute(insert(Alerta), [{"id_falha": i, "nivel_risco": "ALTO"}
+                                            for i, s, dt in db.session.execute(orfas) if (s, dt) in chaves])
+    if d["divergentes"]:
+        t = Falha.__table__
+        stmt = update(t).where(t.c.id_falha == bindparam("_id")).values(
+            {c: bindparam(c) for c in CAMPOS_DIFF + ("valor_pico",)})
+        db.session.execute(stmt, [{"_id": f.id_falha, **{c: v[c] for c in CAMPOS_DIFF + ("valor_pico",)}}
+                                  for f, v in d["divergentes"]])
+    if podar and d["sobrando"]:
+        ids = [f.id_falha for f in d["sobrando"]]
+        db.session.execute(delete(Alerta).where(Alerta.id_falha.in_(ids)))   # SQLite não cascateia
+        db.session.execute(delete(Falha).where(Falha.id_falha.in_(ids)).execution_options(synchronize_session=False))
+    db.session.commit()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Recalcula os incidentes de alerta a partir do histórico de leituras.")
+    ap.add_argument("--aplicar", action="store_true", help="insere os que faltam e corrige os divergentes")
+    ap.add_argument("--podar", action="store_true", help="com --aplicar: apaga incidentes de leitura que não deveriam existir")
+    ap.add_argument("--sensor", type=int, action="append", help="só este sensor (repetível)")
+    ap.add_argument("--agora", help="ISO 8601: referência para o status (default: agora, UTC)")
+    args = ap.parse_args()
+    if args.podar and not args.aplicar:
+        ap.error("--podar exige --aplicar")
+
+    from .factory import create_cli_app
+    app = create_cli_app()
+    with app.app_context():
+        t0 = time.perf_counter()
+        esperados, leituras, t_kernel = recompute(args.sensor, datetime.fromisoformat(args.agora) if args.agora else None)
+        d = diff(esperados, args.sensor)
+        taxa = f"{leituras / t_kernel / 1e6:.1f} M leituras/s no kernel" if t_kernel else "-"
+        print(f"[alert_replay] {leituras} leituras em {time.perf_counter() - t0:.1f}s ({taxa}) -> "
+              f"{len(esperados)} incidentes: {d['iguais']} iguais, {len(d['novos'])} faltando, "
+              f"{len(d['divergentes'])} divergentes, {len(d['sobrando'])} sobrando")
+        if args.aplicar:
+            apply(d, podar=args.podar)
+            podados = len(d["sobrando"]) if args.podar else 0
+            print(f"[alert_replay] aplicado: {len(d['novos'])} inseridos, {len(d['divergentes'])} corrigidos, "
+                  f"{podados} apagados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# app/alerting.py
+"""
+Motor de alertas com coalescência por sensor.
+
+Cada incidente é uma linha em FALHAS (+ 1 ALERTA) com máquina de estados:
+    aberta -> em_andamento -> resolvida
+
+- Abertura: N leituras consecutivas >= limiar dentro da janela (ALERT_MIN_STREAK /
+  ALERT_WINDOW_SECONDS), ou um POST em /api/alerts (o cliente já decidiu).
+- Excedências seguintes com intervalo <= ALERT_COOLDOWN_SECONDS da última ocorrência
+  NÃO inserem linhas: atualizam contador, pico e última ocorrência do incidente aberto.
+- Sem excedências por mais de ALERT_COOLDOWN_SECONDS o incidente é resolvido
+  (na próxima excedência do sensor ou pela varredura `python -m app.alerting`).
+"""
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import case, update
+from .extensions import db
+from .models import Leitura, Falha, Alerta
+from .ingest import naive_utc
+
+ABERTA, EM_ANDAMENTO, RESOLVIDA = "aberta", "em_andamento", "resolvida"
+ATIVOS = (ABERTA, EM_ANDAMENTO)
+
+
+def threshold_for(tipo_sensor: str) -> float:
+    cfg = current_app.config
+    tipo = (tipo_sensor or "").strip().lower()
+    if "temp" in tipo:         # temperatura
+        return cfg["ALERT_THRESH_TEMPERATURA"]
+    if "vibra" in tipo:        # vibração
+        return cfg["ALERT_THRESH_VIBRACAO"]
+    # default se vier outro tipo
+    return max(cfg["ALERT_THRESH_TEMPERATURA"], cfg["ALERT_THRESH_VIBRACAO"])
+
+
+def _streak_values(id_sensor: int, ts: datetime, threshold: float, streak: int, window: int):
+    """
+    As N leituras mais recentes do sensor até `ts` (incluindo a atual) estão >= limiar
+    dentro da janela? Retorna os N valores (mais recente primeiro) ou None.
+    """
+    recentes = (
+        db.session.query(Leitura.leitura_valor, Leitura.leitura_data_hora)
+        .filter(Leitura.id_sensor == id_sensor, Leitura.leitura_data_hora <= ts)
+        .order_by(Leitura.leitura_data_hora.desc())
+        .limit(streak)
+        .all()
+    )
+    if len(recentes) < streak:
+        return None
+    if not all(v >= threshold for v, _ in recentes):
+        return None
+    intervalo = (recentes[0][1] - recentes[-1][1]).total_seconds()
+    return [v for v, _ in recentes] if intervalo <= window else None
+
+
+def _incidente_aberto(id_sensor: int):
+    return (
+        db.session.query(Falha.id_falha, Falha.ultima_ocorrencia, Alerta.id_alerta, Alerta.nivel_risco)
+        .outerjoin(Alerta, Alerta.id_falha == Falha.id_falha)
+        .filter(Falha.id_sensor == id_sensor, Falha.status.in_(ATIVOS))
+        .order_by(Falha.id_falha.desc())
+        .first()
+    )
+
+
+def register_exceedance(sensor, valor, ts, *, nivel="ALTO", origem="leitura", require_streak=True):
+    """
+    Registra uma excedência do sensor no motor. Retorna o incidente afetado
+    ({id_alerta, id_falha, nivel, status, novo}) ou None se nada foi disparado.
+    Não faz commit (quem chama commita junto com a leitura).
+    """
+    cfg = current_app.config
+    threshold = threshold_for(sensor.tipo_sensor)
+    if require_streak and (valor is None or valor < threshold):
+        return None
+
+    ts = naive_utc(ts)
+    cooldown = timedelta(seconds=int(cfg["ALERT_COOLDOWN_SECONDS"]))
+    aberto = _incidente_aberto(sensor.id_sensor)
+
+    if aberto is not None:
+        id_falha, ultima, id_alerta, nivel_atual = aberto
+        if ultima is None or ts - ultima <= cooldown:
+            # coalesce: UPDATE atômico (sem read-modify-write entre workers)
+            pico = Falha.valor_pico if valor is None else case(
+                (Falha.valor_pico.is_(None), valor),
+                (Falha.valor_pico < valor, valor),
+                else_=Falha.valor_pico,
+            )
+            db.session.execute(
+                update(Falha)
+                .where(Falha.id_falha == id_falha)
+                .values(
+                    qtd_excedencias=Falha.qtd_excedencias + 1,
+                    valor_pico=pico,
+                    ultima_ocorrencia=case(
+                        (Falha.ultima_ocorrencia < ts, ts), else_=Falha.ultima_ocorrencia
+                    ),
+                    status=EM_ANDAMENTO,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            return {"id_alerta": id_alerta, "id_falha": id_falha, "nivel": nivel_atual,
+                    "status": EM_ANDAMENTO, "novo": False}
+
+        # silêncio maior que o cooldown: encerra o incidente anterior
+        db.session.execute(
+            update(Falha)
+            .where(Falha.id_falha == id_falha)
+            .values(status=RESOLVIDA, data_fim=Falha.ultima_ocorrencia)
+            .execution_options(synchronize_session=False)
+        )
+
+    streak = int(cfg["ALERT_MIN_STREAK"])
+    window = int(cfg["ALERT_WINDOW_SECONDS"])
+    valores = [valor]
+    if require_streak:
+        valores = _streak_values(sensor.id_sensor, ts, threshold, streak, window)
+        if valores is None:
+            return None
+        descricao = (f"Excedido limiar ({threshold}) em {streak} leituras para o sensor "
+                     f"{sensor.id_sensor} ({sensor.tipo_sensor}). Valor atual={valor}")
+    else:
+        descricao = f"Alerta externo ({origem}) para o sensor {sensor.id_sensor} ({sensor.tipo_sensor}). Valor={valor}"
+    falha = Falha(
+        id_peca=sensor.id_peca,
+        id_sensor=sensor.id_sensor,
+        descricao=descricao[:255],
+        data=ts,
+        status=ABERTA,
+        qtd_excedencias=len(valores),
+        valor_pico=max((v for v in valores if v is not None), default=None),
+        ultima_ocorrencia=ts,
+        origem=origem,
+    )
+    db.session.add(falha)
+    db.session.flush()  # obtém id_falha
+
+    alerta = Alerta(id_falha=falha.id_falha, nivel_risco=nivel)
+    db.session.add(alerta)
+    db.session.flush()
+
+    return {"id_alerta": alerta.id_alerta, "id_falha": falha.id_falha, "nivel": nivel,
+            "status": ABERTA, "novo": True}
+
+
+def resolve_expired(now: datetime = None) -> int:
+    """Resolve (UPDATE único) os incidentes sem excedência há mais de ALERT_COOLDOWN_SECONDS."""
+    now = now or datetime.utcnow()
+    limite = now - timedelta(seconds=int(current_app.config["ALERT_COOLDOWN_SECONDS"]))
+    res = db.session.execute(
+        update(Falha)
+        .where(Falha.status.in_(ATIVOS), Falha.ultima_ocorrencia < limite)
+        .values(status=RESOLVIDA, data_fim=Falha.ultima_ocorrencia)
+        .execution_options(synchronize_session=False)
+    )
+    return res.rowcount
+
+
+def main():
+    from .factory import create_cli_app
+    app = create_cli_app()
+    with app.app_context():
+        n = resolve_expired()
+        db.session.commit()
+    print(f"[alerting] incidentes resolvidos: {n}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,13 @@
 # app/api/alerts.py
+import base64
 from flask import Blueprint, request, jsonify
 from datetime import datetime
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import aliased
 from ..extensions import db
 from ..models import Alerta, Falha, Sensor, Peca
+from ..alerting import register_exceedance
+from ..ingest import naive_utc
 
 bp_alerts = Blueprint("alerts", __name__, url_prefix="/api")
 
@@ -17,8 +22,122 @@ def create_alert():
     valor = data.get("valor")
     ts = parse_ts(data["ts"])
 
-    # Criado para adicionar alertas nos registros de falhas
-    alert = Alerta(id_falha=None, nivel_risco=nivel_risco)
-    db.session.add(alert)
+    sensor = db.session.get(Sensor, id_sensor)
+    if not sensor:
+        return jsonify({"error": "id_sensor inexistente"}), 400
+
+    # Mesmo motor das leituras: coalesce no incidente aberto do sensor (ou abre um novo)
+    info = register_exceedance(
+        sensor, float(valor) if valor is not None else None, ts,
+        nivel=nivel_risco, origem="api", require_streak=False,
+    )
     db.session.commit()
-    return jsonify({"ok": True, "id_alerta": alert.id_alerta})
+    return jsonify({"ok": True, **info})
+
+# ---------------- leitura paginada (keyset) ----------------
+MAX_LIMIT = 1000
+
+def _iso(dt):
+    return dt.isoformat() if dt else None
+
+def _encode_cursor(data, id_):
+    raw = f"{data.isoformat()}|{id_}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    data, id_ = raw.rsplit("|", 1)
+    return datetime.fromisoformat(data), int(id_)
+
+def _filtros_comuns(q):
+    """Filtros aceitos por /alerts e /failures (todos opcionais). ValueError: desde/ate inválidos."""
+    args = request.args
+    if args.get("id_peca", type=int) is not None:
+        q = q.filter(Falha.id_peca == args.get("id_peca", type=int))
+    if args.get("id_sensor", type=int) is not None:
+        q = q.filter(Falha.id_sensor == args.get("id_sensor", type=int))
+    if args.get("nivel_risco"):
+        q = q.filter(Alerta.nivel_risco == args["nivel_risco"])
+    if args.get("status"):
+        q = q.filter(Falha.status == args["status"])
+    if args.get("desde"):
+        q = q.filter(Falha.data >= naive_utc(parse_ts(args["desde"])))
+    if args.get("ate"):
+        q = q.filter(Falha.data < naive_utc(parse_ts(args["ate"])))
+    return q.filter(Falha.data.is_not(None))
+
+def _pagina(q, id_col, serialize):
+    """
+    Keyset em (FALHAS.data, id) decrescente: sem OFFSET e sem COUNT.
+    Busca limit+1 linhas só para saber se há próxima página.
+    """
+    limit = max(1, min(request.args.get("limit", default=100, type=int), MAX_LIMIT))
+    cursor = request.args.get("cursor")
+    if cursor:
+        try:
+            c_data, c_id = _decode_cursor(cursor)
+        except (ValueError, UnicodeDecodeError):
+            return jsonify({"error": "cursor inválido"}), 400
+        q = q.filter(or_(Falha.data < c_data, and_(Falha.data == c_data, id_col < c_id)))
+
+    rows = q.order_by(Falha.data.desc(), id_col.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = _encode_cursor(last.data, getattr(last, id_col.key))
+    return jsonify({"items": [serialize(r) for r in rows], "next_cursor": next_cursor})
+
+def _colunas_falha():
+    return (
+        Falha.id_falha, Falha.id_peca, Peca.tipo.label("peca_tipo"),
+        Falha.id_sensor, Sensor.tipo_sensor, Falha.descricao, Falha.data, Falha.status,
+        Falha.qtd_excedencias, Falha.valor_pico, Falha.ultima_ocorrencia, Falha.data_fim,
+        Falha.origem,
+    )
+
+def _serialize(r):
+    out = dict(r._mapping)
+    for k in ("data", "ultima_ocorrencia", "data_fim"):
+        out[k] = _iso(out[k])
+    return out
+
+@bp_alerts.get("/alerts")
+def list_alerts():
+    """Alertas + incidente (FALHAS) + peça/sensor numa única consulta, paginada por keyset."""
+    q = (
+        db.session.query(Alerta.id_alerta, Alerta.nivel_risco, *_colunas_falha())
+        .join(Falha, Falha.id_falha == Alerta.id_falha)
+        .outerjoin(Peca, Peca.id_peca == Falha.id_peca)
+        .outerjoin(Sensor, Sensor.id_sensor == Falha.id_sensor)
+    )
+    try:
+        q = _filtros_comuns(q)
+    except ValueError as e:
+        return jsonify({"error": f"parâmetro inválido: {e}"}), 400
+    return _pagina(q, Alerta.id_alerta, _serialize)
+
+@bp_alerts.get("/failures")
+def list_failures():
+    """Falhas/incidentes (com o alerta mais recente, se houver) + peça/sensor, paginados por keyset."""
+    # um alerta por falha (falhas anteriores à coalescência podem ter vários): id_falha
+    # fica único por linha e o keyset não pula nem repete
+    outro = aliased(Alerta)
+    ultimo = (
+        select(func.max(outro.id_alerta))
+        .where(outro.id_falha == Falha.id_falha)
+        .correlate(Falha)
+        .scalar_subquery()
+    )
+    q = (
+        db.session.query(*_colunas_falha(), Alerta.id_alerta, Alerta.nivel_risco)
+        .select_from(Falha)
+        .outerjoin(Alerta, Alerta.id_alerta == ultimo)
+        .outerjoin(Peca, Peca.id_peca == Falha.id_peca)
+        .outerjoin(Sensor, Sensor.id_sensor == Falha.id_sensor)
+    )
+    try:
+        q = _filtros_comuns(q)
+    except ValueError as e:
+        return jsonify({"error": f"parâmetro inválido: {e}"}), 400
+    return _pagina(q, Falha.id_falha, _serialize)
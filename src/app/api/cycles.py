@@ -1,36 +1,133 @@
 # app/api/cycles.py
 from flask import Blueprint, request, jsonify
 from datetime import datetime
+from sqlalchemy import bindparam, func, insert, select, update
 from ..extensions import db
-from ..models import Peca, Ciclo, Sensor
+from ..models import Peca, Ciclo
+from ..sqlutils import minutes_between
 
 bp_cycles = Blueprint("cycles", __name__, url_prefix="/api")
 
 def parse_ts(ts):
     return datetime.fromisoformat(ts.replace("Z","+00:00"))
 
+# evento -> (ação, escopo)
+EVENTOS = {
+    "start_all": ("start", "all"),     "end_all": ("end", "all"),
+    "start_piece": ("start", "piece"), "end_piece": ("end", "piece"),
+    "start_group": ("start", "group"), "end_group": ("end", "group"),
+}
+
+def _filtro_pecas(escopo, data):
+    """
+    Devolve uma função col -> cláusula que restringe id_peca ao escopo do evento:
+      - all:   sem filtro (None)
+      - piece: {"id_peca": 3}
+      - group: {"pecas": [1, 2, 3]} ou {"tipo": "Conjunto A"}
+    """
+    if escopo == "all":
+        return None
+    if escopo == "piece":
+        if data.get("id_peca") is None:
+            raise ValueError("id_peca obrigatório")
+        id_peca = int(data["id_peca"])
+        return lambda col: col == id_peca
+    if data.get("pecas"):
+        ids = [int(x) for x in data["pecas"]]
+        return lambda col: col.in_(ids)
+    if data.get("tipo"):
+        tipo = data["tipo"]
+        # em UPDATE PECAS o MySQL não aceita subquery na própria tabela (erro 1093)
+        return lambda col: (Peca.tipo == tipo) if col is Peca.id_peca else \
+            col.in_(select(Peca.id_peca).where(Peca.tipo == tipo))
+    raise ValueError("informe 'pecas' ou 'tipo' para eventos de grupo")
+
+def start_cycles(ts, filtro=None) -> int:
+    """
+    INSERT…SELECT: abre um ciclo por peça que NÃO esteja com ciclo aberto
+    e aponta PECAS.id_ciclo_aberto para ele (mesma transação).
+    """
+    aberto = (
+        select(Ciclo.id_ciclo)
+        .where(Ciclo.id_peca == Peca.id_peca, Ciclo.data_fim.is_(None))
+        .exists()
+    )
+    sel = select(Peca.id_peca, bindparam("ts", ts, type_=db.DateTime)).where(~aberto)
+    if filtro is not None:
+        sel = sel.where(filtro(Peca.id_peca))
+    created = db.session.execute(insert(Ciclo).from_select(["id_peca", "data_inicio"], sel)).rowcount
+
+    novo = (
+        select(func.max(Ciclo.id_ciclo))
+        .where(Ciclo.id_peca == Peca.id_peca, Ciclo.data_fim.is_(None))
+        .scalar_subquery()
+    )
+    ponteiro = (
+        update(Peca)
+        .where(Peca.id_ciclo_aberto.is_(None))
+        .values(id_ciclo_aberto=novo)
+        .execution_options(synchronize_session=False)
+    )
+    if filtro is not None:
+        ponteiro = ponteiro.where(filtro(Peca.id_peca))
+    db.session.execute(ponteiro)
+    return created
+
+def end_cycles(ts, filtro=None) -> int:
+    """
+    UPDATE único: fecha os ciclos abertos e calcula a duração (minutos) no banco.
+    Em seguida acumula duração/contagem em PECAS e limpa o ponteiro de ciclo aberto.
+    """
+    ts_param = bindparam("ts", ts, type_=db.DateTime)
+    stmt = (
+        update(Ciclo)
+        .where(Ciclo.data_fim.is_(None))
+        .values(data_fim=ts_param, duracao=minutes_between(Ciclo.data_inicio, ts_param))
+        .execution_options(synchronize_session=False)
+    )
+    if filtro is not None:
+        stmt = stmt.where(filtro(Ciclo.id_peca))
+    closed = db.session.execute(stmt).rowcount
+
+    duracao = (
+        select(Ciclo.duracao)
+        .where(Ciclo.id_ciclo == Peca.id_ciclo_aberto, Ciclo.data_fim.is_not(None))
+        .scalar_subquery()
+    )
+    # MySQL avalia o SET da esquerda p/ direita: o ponteiro precisa ser zerado por último
+    totais = (
+        update(Peca)
+        .where(Peca.id_ciclo_aberto.is_not(None))
+        .ordered_values(
+            (Peca.tempo_uso_total, func.coalesce(Peca.tempo_uso_total, 0) + func.coalesce(duracao, 0)),
+            (Peca.qtd_ciclos, func.coalesce(Peca.qtd_ciclos, 0) + 1),
+            (Peca.id_ciclo_aberto, None),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if filtro is not None:
+        totais = totais.where(filtro(Peca.id_peca))
+    db.session.execute(totais)
+    return closed
+
 @bp_cycles.post("/cycle-events")
 def cycle_events():
     data = request.get_json() or {}
     event = data.get("event")
+    if event not in EVENTOS:
+        return jsonify({"error":"evento inválido"}), 400
     ts = parse_ts(data.get("ts"))
-    if event == "start_all":
-        # cria um ciclo por peça que NÃO esteja com ciclo aberto
-        pecas = db.session.query(Peca).all()
-        for p in pecas:
-            c = Ciclo(id_peca=p.id_peca, data_inicio=ts, data_fim=None, duracao=None)
-            db.session.add(c)
-        db.session.commit()
-        return jsonify({"ok": True, "created": len(pecas)})
-
-    if event == "end_all":
-        # fecha todos os ciclos abertos e calcula duração (minutos)
-        abertos = db.session.query(Ciclo).filter(Ciclo.data_fim.is_(None)).all()
-        for c in abertos:
-            c.data_fim = ts
-            if c.data_inicio and c.data_fim:
-                c.duracao = int((c.data_fim - c.data_inicio).total_seconds() // 60)
-        db.session.commit()
-        return jsonify({"ok": True, "closed": len(abertos)})
+    acao, escopo = EVENTOS[event]
 
-    return jsonify({"error":"evento inválido"}), 400
+    try:
+        if acao == "start":
+            created = start_cycles(ts, _filtro_pecas(escopo, data))
+            db.session.commit()
+            return jsonify({"ok": True, "created": created})
+
+        closed = end_cycles(ts, _filtro_pecas(escopo, data))
+        db.session.commit()
+        return jsonify({"ok": True, "closed": closed})
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
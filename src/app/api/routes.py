@@ -3,10 +3,14 @@ from marshmallow import ValidationError
 from .schemas import ReadingInSchema, PredictStateIn
 from ..extensions import db
 from sqlalchemy import and_
-from sqlalchemy import func
 from ..models import Peca, Sensor, Ciclo, Leitura, Falha, Alerta  # já deve ter, garanta Peca e Ciclo também
 from datetime import datetime, timedelta
-from ..ml import predict
+from ..ml import predict, serving
+from ..hotstate import get_hotstate
+from ..ingest import ingest_batch, naive_utc, reading_row
+from ..stats import latest_by_piece, latest_by_sensor
+from .. import bulk, drift, quantiles, scoring
+from ..dbrouting import read_replica
 
 bp = Blueprint("api", __name__, url_prefix="/api")
 
@@ -17,96 +21,69 @@ def handle_validation_error(err):
 def _parse_ts(ts: str) -> datetime:
     return datetime.fromisoformat(str(ts).replace("Z", "+00:00"))
 
-def _threshold_for(tipo_sensor: str) -> float:
-    cfg = current_app.config
-    tipo = (tipo_sensor or "").strip().lower()
-    if "temp" in tipo:         # temperatura
-        return cfg["ALERT_THRESH_TEMPERATURA"]
-    if "vibra" in tipo:        # vibração
-        return cfg["ALERT_THRESH_VIBRACAO"]
-    # default se vier outro tipo
-    return max(cfg["ALERT_THRESH_TEMPERATURA"], cfg["ALERT_THRESH_VIBRACAO"])
-
-def _check_and_create_alert(sensor: Sensor, leitura: Leitura):
-    """Dispara alerta + falha se houver 'streak' leituras >= threshold dentro da janela."""
-    cfg = current_app.config
-    threshold = _threshold_for(sensor.tipo_sensor)
-    streak = int(cfg["ALERT_MIN_STREAK"])
-    window = int(cfg["ALERT_WINDOW_SECONDS"])
-
-    # Só vale a pena checar se a leitura atual já excede o limiar
-    if leitura.leitura_valor < threshold:
-        return None
-
-    # Pega as N leituras mais recentes (incluindo a atual)
-    recentes = (
-        db.session.query(Leitura)
-        .filter(Leitura.id_sensor == sensor.id_sensor)
-        .order_by(Leitura.leitura_data_hora.desc())
-        .limit(streak)
-        .all()
-    )
-    if len(recentes) < streak:
-        return None
-
-    # Todas precisam estar >= threshold e dentro da janela (do 1º ao N-ésimo)
-    if not all(r.leitura_valor >= threshold for r in recentes):
-        return None
-
-    intervalo = (recentes[0].leitura_data_hora - recentes[-1].leitura_data_hora).total_seconds()
-    if intervalo > window:
-        return None
-
-    # Dispara: cria FALHA descritiva + ALERTA (nivel ALTO)
-    falha = Falha(
-        id_peca=sensor.id_peca,
-        descricao=f"Excedido limiar ({threshold}) em {streak} leituras para o sensor {sensor.id_sensor} ({sensor.tipo_sensor}). Valor atual={leitura.leitura_valor}",
-        data=leitura.leitura_data_hora,
-    )
-    db.session.add(falha)
-    db.session.flush()  # obtém id_falha
-
-    alerta = Alerta(id_falha=falha.id_falha, nivel_risco="ALTO")
-    db.session.add(alerta)
-    # não commitamos aqui; quem chama commit já
-
-    return {"id_alerta": alerta.id_alerta, "id_falha": falha.id_falha, "nivel": "ALTO"}
-
 @bp.post("/readings")
 def ingest_reading():
+    """Uma leitura (objeto) ou um lote (lista de objetos) no mesmo formato."""
     data = request.get_json() or {}
-    payload = ReadingInSchema().load(data)
-
-    sensor = Sensor.query.get(payload["id_sensor"])
-    if not sensor:
-        return jsonify({"error": "id_sensor inexistente"}), 400
-
-    leitura = Leitura(
-        id_sensor=payload["id_sensor"],
-        leitura_valor=payload["leitura_valor"],
-        leitura_data_hora=payload["leitura_data_hora"],
-    )
-    db.session.add(leitura)
-    db.session.flush()  # garante que a leitura já está visível para as consultas de checagem
-
-    alerta_info = _check_and_create_alert(sensor, leitura)
-
-    db.session.commit()
-    resp = {"ok": True, "id_leitura": leitura.id_leitura}
-    if alerta_info:
-        resp["alerta"] = alerta_info
+    many = isinstance(data, list)
+    payloads = ReadingInSchema(many=many).load(data)
+    payloads = payloads if many else [payloads]
+
+    ids = {p["id_sensor"] for p in payloads}
+    existentes = {i for (i,) in db.session.query(Sensor.id_sensor).filter(Sensor.id_sensor.in_(ids))}
+    if ids - existentes:
+        return jsonify({"error": "id_sensor inexistente", "id_sensor": sorted(ids - existentes)}), 400
+
+    id_leitura, alertas = ingest_batch([reading_row(p) for p in payloads])
+
+    if many:
+        resp = {"ok": True, "inseridas": len(payloads)}
+        if alertas:
+            resp["alertas"] = alertas
+        return jsonify(resp), 201
+    resp = {"ok": True, "id_leitura": id_leitura}
+    if alertas:
+        resp["alerta"] = alertas[0]
     return jsonify(resp), 201
 
 @bp.post("/predict/state")
 def predict_state():
     data = PredictStateIn().load(request.get_json() or {})
-    return jsonify(predict.predict_state(data))
+    try:
+        return jsonify(serving.predict_state(data))          # micro-batching (app/ml/serving.py)
+    except serving.InferenceTimeout as e:
+        return jsonify({"error": str(e)}), 503
 
 @bp.post("/predict/failure24h")
 def predict_failure():
     data = PredictStateIn().load(request.get_json() or {})
     th = float(request.args.get("threshold", 0.5))
-    return jsonify(predict.predict_failure_24h(data, threshold=th))
+    try:
+        return jsonify(serving.predict_failure_24h(data, threshold=th))
+    except serving.InferenceTimeout as e:
+        return jsonify({"error": str(e)}), 503
+
+@bp.post("/predict/failure")
+def predict_failure_horizons():
+    """?horizons=1,6,24 (default: todos os do bundle) -> probabilidade de falha por horizonte."""
+    data = PredictStateIn().load(request.get_json() or {})
+    th = float(request.args.get("threshold", 0.5))
+    try:
+        disponiveis = predict.failure_horizons()
+    except FileNotFoundError:
+        return jsonify({"error": "modelo multi-horizonte não treinado: rode "
+                                 "`python -m app.ml.failure_predict_24_hours` (ou app.ml.pipeline)"}), 503
+    try:
+        horizons = [int(h) for h in request.args.get("horizons", "").split(",") if h.strip()] or disponiveis
+    except ValueError:
+        return jsonify({"error": "horizons deve ser uma lista de horas inteiras, ex.: 1,6,24"}), 400
+    invalidos = sorted(set(horizons) - set(disponiveis))
+    if invalidos:
+        return jsonify({"error": "horizonte sem modelo", "horizons": invalidos, "disponiveis": disponiveis}), 400
+    try:
+        return jsonify(serving.predict_failure_horizons(data, horizons, threshold=th))
+    except serving.InferenceTimeout as e:
+        return jsonify({"error": str(e)}), 503
 
 @bp.get("/sensors")
 def sensors_list():
@@ -116,8 +93,77 @@ def sensors_list():
         for s in sensors
     ])
 
+# Carga em massa (backfill): corpo NDJSON/CSV em streaming, lotes comitados, sem alertas.
+# ?formato=ndjson|csv (ou Content-Type), ?desde_linha=N para retomar; ver app/bulk.py
+@bp.post("/readings/bulk")
+def readings_bulk():
+    try:
+        formato = bulk.detect_format(request.args.get("formato"), request.content_type)
+    except bulk.BulkFormatError as e:
+        return jsonify({"error": str(e)}), 415
+    try:
+        res = bulk.load_stream(request.stream, formato,
+                               desde_linha=request.args.get("desde_linha", default=0, type=int),
+                               gzipped=request.headers.get("Content-Encoding", "").lower() == "gzip")
+    except bulk.BulkFormatError as e:
+        erro = {"error": str(e)}
+        if e.ultima_linha is not None:
+            erro["ultima_linha"] = e.ultima_linha
+        return jsonify(erro), 400
+    return jsonify(res), 200
+
+# Estado quente (memória compartilhada do nó): último valor, streak e agregados por sensor
+@bp.get("/sensors/hot")
+def sensors_hot():
+    hot = get_hotstate(current_app)
+    if hot is None:
+        return jsonify({"error": "HOTSTATE_ENABLED desligado"}), 404
+    return jsonify(hot.snapshot())
+
+# Última leitura e contagem por sensor (ou agrupado por peça) a partir de ESTATISTICAS_SENSOR
+@bp.get("/sensors/latest")
+@read_replica
+def sensors_latest():
+    id_peca = request.args.get("id_peca", type=int)
+    if request.args.get("agrupar") == "peca":
+        return jsonify(latest_by_piece(id_peca))
+    return jsonify(latest_by_sensor(id_peca))
+
+# Drift/qualidade por feature: última avaliação agendada (python -m app.drift);
+# ?feature=&limit= histórico; ?ao_vivo=1 calcula agora a partir dos histogramas (sem gravar)
+@bp.get("/drift")
+def drift_status():
+    if request.args.get("ao_vivo") == "1":
+        janela_h = request.args.get("janela_h", default=drift.JANELA_H, type=int)
+        return jsonify(drift.evaluate(janela_h))
+    limit = min(request.args.get("limit", default=1, type=int), 500)
+    return jsonify(drift.latest(request.args.get("feature"), max(1, limit)))
+
+# Quantis aproximados (sketches por sensor/hora, erro relativo <= QUANTILE_ALPHA)
+# ?id_sensor= | ?id_peca= [&agrupar=peca]  ?inicio=&fim= (ISO) ou ?minutes=  ?q=0.5,0.95,0.99
+@bp.get("/readings/quantiles")
+@read_replica
+def readings_quantiles():
+    try:
+        fim = _parse_ts(request.args["fim"]) if request.args.get("fim") else datetime.utcnow()
+        inicio = (_parse_ts(request.args["inicio"]) if request.args.get("inicio")
+                  else fim - timedelta(minutes=request.args.get("minutes", default=1440, type=int)))
+        qs = [float(x) for x in request.args.get("q", "0.5,0.95,0.99").split(",") if x.strip()]
+    except ValueError as e:
+        return jsonify({"error": f"parâmetro inválido: {e}"}), 400
+    if not qs or any(not 0 <= q <= 1 for q in qs):
+        return jsonify({"error": "q deve estar em [0, 1]"}), 400
+    inicio, fim = naive_utc(inicio), naive_utc(fim)
+    res = quantiles.quantiles(inicio, fim, qs,
+                              id_sensor=request.args.get("id_sensor", type=int),
+                              id_peca=request.args.get("id_peca", type=int),
+                              por_peca=request.args.get("agrupar") == "peca")
+    return jsonify({"inicio": inicio.isoformat(), "fim": fim.isoformat(),
+                    "erro_relativo": quantiles.ALPHA, "resultados": res})
+
 # SÉRIE TEMPORAL (x=timestamp, y=valor) do sensor escolhido
 @bp.get("/readings/series")
+@read_replica
 def readings_series():
     sensor_id = request.args.get("sensor_id", type=int)
     minutes = request.args.get("minutes", default=60, type=int)
@@ -144,53 +190,8 @@ def readings_series():
 
     return jsonify({"sensor_id": sensor_id, "x": x, "y": y})
 
-# helpers internos
-def _now_utc():
-    return datetime.utcnow()
-
-def _avg_for(peca_id: int, tipo_like: str, minutes: int) -> float:
-    """Média das últimas N min para sensores da peça (tipo LIKE 'temper%' ou 'vibra%')."""
-    since = _now_utc() - timedelta(minutes=minutes)
-    q = (
-        db.session.query(func.avg(Leitura.leitura_valor))
-        .join(Sensor, Sensor.id_sensor == Leitura.id_sensor)
-        .filter(Sensor.id_peca == peca_id)
-        .filter(Sensor.tipo_sensor.ilike(tipo_like))
-        .filter(Leitura.leitura_data_hora >= since)
-    ).scalar()
-    if q is None:
-        # cai para último valor disponível
-        q = (
-            db.session.query(Leitura.leitura_valor)
-            .join(Sensor, Sensor.id_sensor == Leitura.id_sensor)
-            .filter(Sensor.id_peca == peca_id)
-            .filter(Sensor.tipo_sensor.ilike(tipo_like))
-            .order_by(Leitura.leitura_data_hora.desc())
-            .limit(1).scalar()
-        )
-    return float(q) if q is not None else 0.0
-
-def _tempo_uso_minutos(peca_id: int) -> float:
-    """Soma dos minutos dos ciclos; inclui ciclo aberto."""
-    total = (
-        db.session.query(func.coalesce(func.sum(Ciclo.duracao), 0))
-        .filter(Ciclo.id_peca == peca_id).scalar()
-    ) or 0
-    # ciclo aberto
-    aberto = (
-        db.session.query(Ciclo)
-        .filter(Ciclo.id_peca == peca_id, Ciclo.data_fim.is_(None))
-        .order_by(Ciclo.data_inicio.desc())
-        .first()
-    )
-    if aberto and aberto.data_inicio:
-        total += int((_now_utc() - aberto.data_inicio).total_seconds() // 60)
-    return float(total)
-
-def _ciclos_count(peca_id: int) -> float:
-    return float(db.session.query(func.count(Ciclo.id_ciclo)).filter(Ciclo.id_peca == peca_id).scalar() or 0)
-
 @bp.get("/predict/snapshot")
+@read_replica
 def predict_snapshot():
     """
     Calcula features por peça e retorna:
@@ -202,24 +203,16 @@ def predict_snapshot():
     vib_min  = int(request.args.get("vib_minutes", 5))     # janela p/ vibração
     threshold = float(request.args.get("threshold", 0.5))  # p/ falha24
 
-    pecas = db.session.query(Peca).order_by(Peca.id_peca).all()
-    out = []
-    for p in pecas:
-        temperatura = _avg_for(p.id_peca, "%temper%", temp_min)
-        vibracao    = _avg_for(p.id_peca, "%vibra%",  vib_min)
-        tempo_uso   = _tempo_uso_minutos(p.id_peca)
-        ciclos      = _ciclos_count(p.id_peca)
-
-        payload = {
-            "tempo_uso": tempo_uso,
-            "ciclos": ciclos,
-            "temperatura": temperatura,
-            "vibracao": vibracao
-        }
-
-        estado = predict.predict_state(payload)["estado"]
-        falha  = predict.predict_failure_24h(payload, threshold=threshold)
+    # features de todas as peças set-based (as mesmas do scorer periódico, app/scoring.py)
+    pecas = scoring.piece_features(temp_min=temp_min, vib_min=vib_min)
+    payloads = [payload for _, payload in pecas]
 
+    # todas as peças numa chamada por modelo
+    estados = predict.predict_state_batch(payloads)
+    falhas = predict.predict_failure_24h_batch(payloads, threshold)
+    out = []
+    for (p, payload), est, falha in zip(pecas, estados, falhas):
+        estado = est["estado"]
         out.append({
             "id_peca": p.id_peca,
             "tipo": p.tipo,
@@ -231,3 +224,23 @@ def predict_snapshot():
     return jsonify(out)
 
 
+
+# Histórico de previsões (scorer periódico: python -m app.scoring --loop 300)
+# ?id_peca= (obrigatório)  ?inicio=&fim= (ISO) ou ?minutes=  ?pontos=200 baldes
+@bp.get("/predictions/history")
+@read_replica
+def predictions_history():
+    id_peca = request.args.get("id_peca", type=int)
+    if id_peca is None:
+        return jsonify({"error": "id_peca é obrigatório"}), 400
+    try:
+        fim = _parse_ts(request.args["fim"]) if request.args.get("fim") else datetime.utcnow()
+        inicio = (_parse_ts(request.args["inicio"]) if request.args.get("inicio")
+                  else fim - timedelta(minutes=request.args.get("minutes", default=1440, type=int)))
+    except ValueError as e:
+        return jsonify({"error": f"parâmetro inválido: {e}"}), 400
+    inicio, fim = naive_utc(inicio), naive_utc(fim)
+    if inicio >= fim:
+        return jsonify({"error": "inicio deve ser anterior a fim"}), 400
+    pontos = request.args.get("pontos", default=200, type=int)
+    return jsonify(scoring.history(id_peca, inicio, fim, pontos))
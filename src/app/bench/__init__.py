@@ -0,0 +1 @@
+# benchmarks: python -m app.bench.<nome>
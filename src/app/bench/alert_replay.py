@@ -0,0 +1,88 @@
+# app/bench/alert_replay.py
+"""
+Kernel vetorizado de app/alert_replay.py vs. replay leitura a leitura da regra online.
+
+Como rodar:
+    python -m app.bench.alert_replay [--leituras 1000000] [--sensores 50] [--seed 0]
+
+Gera séries aleatórias com rajadas acima do limiar (intervalos irregulares, empates de
+timestamp, NaN), roda o replay de referência (mesma lógica de register_exceedance, em
+Python puro) e o find_incidents, confere que os incidentes são idênticos e mede leituras/s.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from ..alert_replay import US, find_incidents
+
+LIMIAR, STREAK, WINDOW, COOLDOWN = 70.0, 3, 60, 120
+
+
+def gerar(n: int, sensores: int, seed: int) -> tuple:
+    rnd = np.random.default_rng(seed)
+    sensor = np.sort(rnd.integers(1, sensores + 1, n))
+    passo = rnd.choice([0, 5, 10, 30, 90, 300], size=n, p=[0.02, 0.4, 0.3, 0.15, 0.1, 0.03])
+    ts = np.cumsum(passo * US).astype(np.int64)
+    rajada = np.repeat(rnd.random(n // 20 + 1) < 0.3, 20)[:n]       # trechos quentes
+    valores = rnd.normal(np.where(rajada, 72.0, 55.0), 6.0)
+    valores[rnd.random(n) < 0.001] = np.nan
+    return sensor, ts, valores
+
+
+def referencia(sensor, ts, valores) -> list:
+    """Uma leitura por vez, como o motor online (estado por sensor em vez de FALHAS)."""
+    out, hist, aberto = [], {}, {}
+    for s, t, v in zip(sensor.tolist(), ts.tolist(), valores.tolist()):
+        h = hist.setdefault(s, [])
+        h.append((t, v))
+        if not v >= LIMIAR:
+            continue
+        inc = aberto.get(s)
+        if inc is not None:
+            if t - inc["ultima"] <= COOLDOWN * US:
+                inc["qtd"] += 1
+                inc["pico"] = max(inc["pico"], v)
+                inc["ultima"] = t
+                continue
+            del aberto[s]
+        ult = h[-STREAK:]
+        if len(ult) < STREAK or not all(x >= LIMIAR for _, x in ult) or ult[-1][0] - ult[0][0] > WINDOW * US:
+            continue
+        inc = {"id_sensor": s, "data": t, "ultima": t, "qtd": STREAK, "pico": max(x for _, x in ult), "valor": v}
+        aberto[s] = inc
+        out.append(inc)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--leituras", type=int, default=1_000_000)
+    ap.add_argument("--sensores", type=int, default=50)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    sensor, ts, valores = gerar(args.leituras, args.sensores, args.seed)
+    limiar = np.full(len(ts), LIMIAR)
+
+    t0 = time.perf_counter()
+    ref = referencia(sensor, ts, valores)
+    t_ref = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    inc = find_incidents(sensor, ts, valores, limiar, STREAK, WINDOW, COOLDOWN)
+    t_vet = time.perf_counter() - t0
+
+    vet = [dict(zip(("id_sensor", "data", "ultima", "qtd", "pico", "valor"), linha))
+           for linha in zip(*(inc[k].tolist() for k in ("id_sensor", "data", "ultima", "qtd", "pico", "valor")))]
+    assert vet == ref, f"divergência: {len(vet)} incidentes vetorizados vs {len(ref)} de referência"
+
+    n = len(ts)
+    print(f"== {n} leituras, {args.sensores} sensores: {len(ref)} incidentes (idênticos) ==")
+    print(f"{'':<14}{'segundos':>10}{'leituras/s':>14}")
+    print(f"{'referência':<14}{t_ref:>10.2f}{n / t_ref:>14,.0f}")
+    print(f"{'vetorizado':<14}{t_vet:>10.2f}{n / t_vet:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+# app/bench/build_dataset.py
+"""
+build_dataset (app/generate_csv.py): versão vetorizada vs. a anterior (loops por peça),
+com dados sintéticos no formato de load_data.
+
+Como rodar:
+    python -m app.bench.build_dataset [--leituras 1000000 10000000] [--pecas 500] [--ciclos 0]
+
+Para cada tamanho:
+1) Igualdade: as duas versões têm de produzir o MESMO DataFrame (valores, dtypes, índice
+   e ordem das linhas; pd.testing.assert_frame_equal)
+2) Tempo de parede e pico de memória alocada (tracemalloc, só durante build_dataset)
+
+--ciclos N gera N ciclos por peça; o cálculo de tempo_uso/ciclos é o mesmo nas duas
+versões (loop por peça) e, com muitos ciclos, domina o tempo — por isso o default é 0.
+--sem-legado mede só a versão nova (tamanhos em que a antiga não cabe no tempo/memória).
+
+Empates exatos de timestamp entre leituras do MESMO tipo e peça: a versão anterior ordenava
+cada peça com quicksort (instável) e o valor escolhido dependia disso; a nova fica com a
+última na ordem de entrada (id_leitura). Os dados sintéticos não têm esses empates.
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from ..generate_csv import build_dataset, compute_usage_and_cycles_for_piece
+
+TIPOS = ("Temperatura", "Vibração")
+
+
+def synthetic(n: int, pecas: int, ciclos: int = 0, seed: int = 7):
+    """(df, cdf, fdf) como load_data: 2 sensores por peça (temperatura/vibração), ~n leituras."""
+    rng = np.random.default_rng(seed)
+    sensores = pecas * 2
+    por_sensor = max(1, n // sensores)
+    inicio = np.datetime64("2025-01-01T00:00:00", "s")
+    id_sensor = np.repeat(np.arange(1, sensores + 1), por_sensor)
+    # passos de 1..60 s por sensor; repetições de timestamp entre sensores da mesma peça
+    passos = rng.integers(1, 61, size=id_sensor.size).astype("timedelta64[s]")
+    ts = inicio + passos.reshape(sensores, por_sensor).cumsum(axis=1).ravel()
+    df = pd.DataFrame({
+        "id_sensor": id_sensor,
+        "id_peca": (id_sensor + 1) // 2,
+        "sensor_tipo": np.array(TIPOS, dtype=object)[(id_sensor + 1) % 2],
+        "leitura_data_hora": ts.astype("datetime64[ns]"),
+        "leitura_valor": rng.normal(70, 12, id_sensor.size).round(4),
+    })
+    df = df.sort_values(["id_peca", "leitura_data_hora", "id_sensor"], kind="stable", ignore_index=True)
+    df.insert(0, "id_leitura", np.arange(1, len(df) + 1))
+
+    # ~5 falhas por peça: metade colada em uma leitura (dentro dos 60 s), metade aleatória
+    amostra = df.sample(n=min(len(df), pecas * 5), random_state=seed)
+    desvio = rng.integers(-90, 91, size=len(amostra)).astype("timedelta64[s]")
+    fdf = pd.DataFrame({
+        "id_falha": np.arange(1, len(amostra) + 1),
+        "id_peca": amostra["id_peca"].to_numpy(),
+        "data": amostra["leitura_data_hora"].to_numpy() + desvio,
+    }).sort_values(["id_peca", "data"], ignore_index=True)
+
+    cdf = pd.DataFrame(columns=["id_ciclo", "id_peca", "data_inicio", "data_fim", "duracao"])
+    if ciclos:
+        fim_dados = ts.max()
+        cid = np.repeat(np.arange(1, pecas + 1), ciclos)
+        span = (fim_dados - inicio).astype(np.int64)
+        st = inicio + np.sort(rng.integers(0, span, size=cid.size)).astype("timedelta64[s]")
+        dur = rng.integers(60, 3600, size=cid.size)
+        fi = st + dur.astype("timedelta64[s]")
+        cdf = pd.DataFrame({"id_ciclo": np.arange(1, cid.size + 1), "id_peca": cid,
+                            "data_inicio": st.astype("datetime64[ns]"), "data_fim": fi.astype("datetime64[ns]"),
+                            "duracao": dur // 60})
+    return df, cdf, fdf
+
+
+# ---------------- versão anterior (referência) ----------------
+def legacy_asof_fill(base_df, right_df, value_col, by_key="id_peca", time_col="leitura_data_hora"):
+    """
+    Faz merge_asof por peça para pegar o último valor <= timestamp.
+    - Garante sort adequado.
+    - Preserva a ordem original do base_df.
+    - Fallback por peça se houver qualquer problema de ordenação.
+    """
+    import pandas as pd
+
+    base = base_df[[by_key, time_col]].copy()
+    right = right_df[[by_key, time_col, value_col]].copy()
+
+    base[time_col] = pd.to_datetime(base[time_col], utc=True, errors="coerce")
+    right[time_col] = pd.to_datetime(right[time_col], utc=True, errors="coerce")
+
+    base = base.dropna(subset=[time_col])
+    right = right.dropna(subset=[time_col])
+
+    base_sorted = base.sort_values([by_key, time_col]).reset_index()  # guarda índice original
+    right_sorted = right.sort_values([by_key, time_col])
+
+    try:
+        merged = pd.merge_asof(
+            base_sorted,
+            right_sorted,
+            by=by_key,
+            on=time_col,
+            direction="backward",
+        )
+        out = merged.set_index("index")[value_col].reindex(base_df.index)
+        return out
+    except Exception:
+        out = pd.Series(index=base_df.index, dtype=float)
+        for pid, g in base.groupby(by_key):
+            g2 = g.sort_values(time_col).reset_index()  # "index" -> índice original
+            r2 = right[right[by_key] == pid].sort_values(time_col)
+            if r2.empty:
+                continue
+            m = pd.merge_asof(g2, r2, on=time_col, direction="backward")
+            out.loc[m["index"]] = m[value_col].values
+        return out.reindex(base_df.index)
+
+
+def legacy_build_dataset(df: pd.DataFrame, cdf: pd.DataFrame, fdf: pd.DataFrame) -> pd.DataFrame:
+    """Versão anterior (loops por peça), referência de igualdade linha a linha."""
+    df["sensor_tipo_norm"] = df["sensor_tipo"].str.lower()
+
+    # Base: linhas de temperatura (se não houver, usa vibração)
+    base = df[df["sensor_tipo_norm"].str.contains("temper", na=False)].copy()
+    if base.empty:
+        base = df[df["sensor_tipo_norm"].str.contains("vibra", na=False)].copy()
+
+    # Séries por tipo para preencher colunas de features
+    temp = df[df["sensor_tipo_norm"].str.contains("temper", na=False)][
+        ["id_peca", "leitura_data_hora", "leitura_valor"]
+    ].rename(columns={"leitura_valor": "temperatura"})
+    vib = df[df["sensor_tipo_norm"].str.contains("vibra", na=False)][
+        ["id_peca", "leitura_data_hora", "leitura_valor"]
+    ].rename(columns={"leitura_valor": "vibracao"})
+
+    base["temperatura"] = legacy_asof_fill(base, temp, "temperatura")
+    base["vibracao"]    = legacy_asof_fill(base, vib,  "vibracao")
+
+    base = base.sort_values(["id_peca", "leitura_data_hora"]).copy()
+    base["tempo_uso"] = 0.0
+    base["ciclos"]    = 0
+
+    if not cdf.empty:
+        for peca_id, grp in base.groupby("id_peca"):
+            ciclos_piece = cdf[cdf["id_peca"] == peca_id].copy()
+            tuso, cc = compute_usage_and_cycles_for_piece(grp, ciclos_piece)
+            base.loc[grp.index, "tempo_uso"] = tuso
+            base.loc[grp.index, "ciclos"]    = cc
+
+    out = base[
+        ["id_leitura","id_sensor","id_peca","sensor_tipo","leitura_data_hora",
+         "tempo_uso","ciclos","temperatura","vibracao"]
+    ].sort_values(["id_peca","leitura_data_hora","id_leitura"])
+
+    out["tempo_uso"]   = out["tempo_uso"].round(2)
+    out["temperatura"] = out["temperatura"].astype(float).round(2)
+    out["vibracao"]    = out["vibracao"].astype(float).round(2)
+
+    # ---- falha_evento (1 se há falha real próximo ao timestamp) ----
+    out["falha_evento"] = 0
+    if fdf is not None and not fdf.empty:
+        tol = pd.Timedelta("60s")  # tolerância para casar exatamente o timestamp
+        for peca_id, grp in out.groupby("id_peca"):
+            eventos = fdf[fdf["id_peca"] == peca_id][["data"]].sort_values("data")
+            if eventos.empty:
+                continue
+            m = pd.merge_asof(
+                grp[["leitura_data_hora"]].sort_values("leitura_data_hora").reset_index(),
+                eventos.rename(columns={"data": "falha_data"}).sort_values("falha_data"),
+                left_on="leitura_data_hora",
+                right_on="falha_data",
+                direction="nearest",
+                tolerance=tol,
+            )
+            idx_hit = m.loc[m["falha_data"].notna(), "index"]
+            out.loc[idx_hit, "falha_evento"] = 1
+
+    return out
+
+
+def _measure(fn, df, cdf, fdf):
+    entrada = df.copy()                    # a versão anterior altera o df de entrada
+    gc.collect()
+    t0 = time.perf_counter()
+    out = fn(entrada, cdf, fdf)
+    elapsed = time.perf_counter() - t0
+    del out, entrada
+    entrada = df.copy()
+    gc.collect()
+    tracemalloc.start()
+    out = fn(entrada, cdf, fdf)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, elapsed, pico
+
+
+def run(n: int, pecas: int, ciclos: int, legado: bool = True):
+    df, cdf, fdf = synthetic(n, pecas, ciclos)
+    print(f"\n== {len(df):,} leituras, {pecas} peças, {len(fdf)} falhas, {len(cdf)} ciclos ==")
+    novo, t_novo, m_novo = _measure(build_dataset, df, cdf, fdf)
+    linhas = [("vetorizada", t_novo, m_novo)]
+    if legado:
+        antigo, t_antigo, m_antigo = _measure(legacy_build_dataset, df, cdf, fdf)
+        pd.testing.assert_frame_equal(novo, antigo)
+        print(f"[ok] saídas idênticas: {len(novo):,} linhas, {int(novo['falha_evento'].sum())} com falha_evento=1")
+        linhas.insert(0, ("anterior", t_antigo, m_antigo))
+        del antigo
+    print(f"{'versão':<12}{'tempo':>10}{'pico alocado':>16}")
+    for nome, t, m in linhas:
+        print(f"{nome:<12}{t:>9.2f}s{m / 2**20:>13.0f} MiB")
+    if legado:
+        print(f"{'ganho':<12}{t_antigo / t_novo:>9.1f}x{m_antigo / m_novo:>13.1f}x")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--leituras", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    ap.add_argument("--pecas", type=int, default=500)
+    ap.add_argument("--ciclos", type=int, default=0, help="ciclos por peça (default: 0)")
+    ap.add_argument("--sem-legado", action="store_true", help="não roda a versão anterior")
+    args = ap.parse_args()
+    for n in args.leituras:
+        run(n, args.pecas, args.ciclos, legado=not args.sem_legado)
+
+
+if __name__ == "__main__":
+    main()
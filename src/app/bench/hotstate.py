@@ -0,0 +1,67 @@
+# app/bench/hotstate.py
+"""
+Estado quente compartilhado (app/hotstate.py): latência contra o banco.
+
+Como rodar:
+    python -m app.bench.hotstate [--updates 20000] [--sensors 16]
+
+Update + read no segmento vs. INSERT + SELECT do último valor no SQLite. A correção com
+writers concorrentes fica nos testes: python -m pytest tests/test_hotstate.py
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from ..hotstate import HotState
+
+NAME = f"bench_hotstate_{os.getpid()}"
+
+
+def bench_latency(n=20000, sensors=16):
+    hs = HotState(NAME + "_lat", 1024)
+    t0 = time.perf_counter()
+    for i in range(n):
+        hs.update(1 + i % sensors, 50.0 + i % 7, time.time(), threshold=80.0)
+    t_upd = (time.perf_counter() - t0) / n
+    t0 = time.perf_counter()
+    for i in range(n):
+        hs.read(1 + i % sensors)
+    t_read = (time.perf_counter() - t0) / n
+    hs.close()
+    hs.unlink()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    con = sqlite3.connect(path)
+    con.execute("CREATE TABLE LEITURAS_SENSOR (id_leitura INTEGER PRIMARY KEY, id_sensor INT, "
+                "leitura_valor REAL, leitura_data_hora REAL)")
+    con.execute("CREATE INDEX IX ON LEITURAS_SENSOR(id_sensor, leitura_data_hora)")
+    t0 = time.perf_counter()
+    for i in range(n):
+        con.execute("INSERT INTO LEITURAS_SENSOR (id_sensor, leitura_valor, leitura_data_hora) VALUES (?,?,?)",
+                    (1 + i % sensors, 50.0 + i % 7, time.time()))
+        con.commit()
+    t_ins = (time.perf_counter() - t0) / n
+    t0 = time.perf_counter()
+    for i in range(n):
+        con.execute("SELECT leitura_valor, leitura_data_hora FROM LEITURAS_SENSOR WHERE id_sensor=? "
+                    "ORDER BY leitura_data_hora DESC LIMIT 1", (1 + i % sensors,)).fetchone()
+    t_sel = (time.perf_counter() - t0) / n
+    con.close()
+
+    print(f"{'operação':<28}{'shared memory':>16}{'sqlite':>14}")
+    print(f"{'escrita (update/insert)':<28}{t_upd * 1e6:>13.1f} µs{t_ins * 1e6:>11.1f} µs")
+    print(f"{'último valor do sensor':<28}{t_read * 1e6:>13.1f} µs{t_sel * 1e6:>11.1f} µs")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--updates", type=int, default=20000)
+    ap.add_argument("--sensors", type=int, default=16)
+    args = ap.parse_args()
+    bench_latency(args.updates, args.sensors)
+
+
+if __name__ == "__main__":
+    main()
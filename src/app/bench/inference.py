@@ -0,0 +1,91 @@
+# app/bench/inference.py
+"""
+Inferência 1 linha por chamada (direto no sklearn) vs. micro-batching (app/ml/serving.py)
+em concorrência crescente — o que N threads de um worker do gunicorn fariam.
+
+Como rodar:
+    python -m app.bench.inference [--concorrencia 1 4 16 64] [--segundos 3] [--modelo estado|falha24]
+
+Cada thread repete a chamada com payloads aleatórios por --segundos. Mede requisições/s,
+latência p50/p99 e o tamanho médio do lote; confere que o resultado de cada requisição no
+modo em lote é o mesmo da chamada direta.
+"""
+import argparse
+import random
+import threading
+import time
+import warnings
+
+from ..ml import predict
+from ..ml.serving import INFER_MAX_BATCH, INFER_MAX_WAIT_MS, MicroBatcher
+
+
+def _payload(rnd: random.Random) -> dict:
+    return {"tempo_uso": rnd.uniform(0, 5000), "ciclos": rnd.randint(0, 300),
+            "temperatura": rnd.uniform(20, 110), "vibracao": rnd.uniform(0, 20)}
+
+
+def rodar(chamar, concorrencia: int, segundos: float) -> dict:
+    lat, erros = [], []
+    fim = time.perf_counter() + segundos
+
+    def cliente(seed):
+        rnd = random.Random(seed)
+        local = []
+        while time.perf_counter() < fim:
+            p = _payload(rnd)
+            t0 = time.perf_counter()
+            try:
+                chamar(p)
+            except Exception as e:          # noqa: BLE001 — contabiliza e segue
+                erros.append(e)
+            local.append(time.perf_counter() - t0)
+        lat.extend(local)
+
+    threads = [threading.Thread(target=cliente, args=(i,)) for i in range(concorrencia)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    total = time.perf_counter() - t0
+    lat.sort()
+    return {"req_s": len(lat) / total, "p50_ms": lat[len(lat) // 2] * 1e3,
+            "p99_ms": lat[int(len(lat) * 0.99)] * 1e3, "erros": len(erros)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--concorrencia", type=int, nargs="+", default=[1, 4, 16, 64])
+    ap.add_argument("--segundos", type=float, default=3)
+    ap.add_argument("--modelo", choices=("estado", "falha24"), default="estado")
+    args = ap.parse_args()
+    warnings.filterwarnings("ignore")      # feature names do sklearn (X sem colunas nomeadas)
+
+    if args.modelo == "estado":
+        direto, lote_fn = predict.predict_state, predict.predict_state_batch
+    else:
+        direto = predict.predict_failure_24h
+        lote_fn = lambda ps: predict.predict_failure_24h_batch(ps, 0.5)   # noqa: E731
+    direto(_payload(random.Random(0)))      # carrega o modelo fora da medição
+
+    # mesma resposta com e sem lote
+    rnd = random.Random(1)
+    amostra = [_payload(rnd) for _ in range(50)]
+    conf = MicroBatcher("conferencia", lote_fn)
+    futs = [conf.submit(p) for p in amostra]
+    assert [f.result() for f in futs] == [direto(p) for p in amostra], "lote diverge da chamada direta"
+
+    print(f"== modelo {args.modelo}: lote até {INFER_MAX_BATCH} / {INFER_MAX_WAIT_MS:g} ms, {args.segundos:g}s por ponto ==")
+    print(f"{'threads':>7}{'modo':>8}{'req/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'lote médio':>12}")
+    for c in args.concorrencia:
+        r = rodar(direto, c, args.segundos)
+        print(f"{c:>7}{'direto':>8}{r['req_s']:>10.0f}{r['p50_ms']:>9.1f}{r['p99_ms']:>9.1f}{'1':>12}")
+        mb = MicroBatcher(args.modelo, lote_fn)
+        r = rodar(mb, c, args.segundos)
+        medio = mb.stats["itens"] / max(mb.stats["lotes"], 1)
+        print(f"{c:>7}{'lote':>8}{r['req_s']:>10.0f}{r['p50_ms']:>9.1f}{r['p99_ms']:>9.1f}{medio:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# app/bench/sqlite_ingest.py
+"""
+Ingestão sustentada em SQLite com vários processos: padrão do pysqlite (journal de
+rollback, BEGIN adiado, espera de 5s do driver) vs. perfil de borda (app/sqlite_edge.py).
+
+Como rodar:
+    python -m app.bench.sqlite_ingest [--workers 4] [--segundos 10] [--lote 1] [--leitores 1]
+
+Cada worker repete o formato de um POST /api/readings: lê os sensores, grava o lote
+(insert_readings: leituras + estatísticas + histogramas + sketches) e consulta as últimas
+leituras do sensor (streak de alerta), tudo numa transação. Leitores consultam a série
+do gráfico em loop (no perfil de borda, pela URL somente leitura). Mede leituras/s
+comitadas, p99 da transação e erros ("database is locked"); ao final confere que a
+contagem em LEITURAS_SENSOR bate com os commits.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+SENSORES = 12
+
+
+def _engine(path: str, edge: bool, readonly: bool = False):
+    from sqlalchemy import create_engine
+    from ..sqlite_edge import apply_sqlite_profile
+
+    # perfil de borda: leitores no mesmo arquivo em modo ro (fora da fila de writer)
+    url = f"sqlite:///file:{path}?mode=ro&uri=true" if edge and readonly else f"sqlite:///{path}"
+    engine = create_engine(url)
+    if edge:
+        apply_sqlite_profile(engine)
+    return engine
+
+
+def _setup(path: str, edge: bool):
+    from ..extensions import db
+    from ..models import Peca, Sensor
+
+    engine = _engine(path, edge)
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for p in range(1, SENSORES // 2 + 1):
+            conn.execute(Peca.__table__.insert(), {"id_peca": p, "tipo": f"P{p}"})
+        conn.execute(Sensor.__table__.insert(), [
+            {"id_sensor": s, "id_peca": (s + 1) // 2, "tipo_sensor": "Temperatura" if s % 2 else "Vibração"}
+            for s in range(1, SENSORES + 1)])
+    engine.dispose()
+
+
+def _writer(path, edge, segundos, lote, wid, out):
+    from sqlalchemy import select
+    from sqlalchemy.exc import OperationalError
+    from ..ingest import insert_readings
+    from ..models import Leitura, Sensor
+
+    engine = _engine(path, edge)
+    rnd = random.Random(wid)
+    base = datetime(2026, 1, 1) + timedelta(hours=wid)
+    ok = erros = 0
+    lat = []
+    fim = time.perf_counter() + segundos
+    while time.perf_counter() < fim:
+        sid = rnd.randint(1, SENSORES)
+        rows = [{"id_sensor": sid, "leitura_valor": rnd.uniform(20, 100),
+                 "leitura_data_hora": base + timedelta(seconds=ok * lote + i)} for i in range(lote)]
+        t0 = time.perf_counter()
+        try:
+            with engine.begin() as conn:
+                conn.execute(select(Sensor.id_sensor).where(Sensor.id_sensor == sid)).all()
+                insert_readings(conn, rows)
+                conn.execute(select(Leitura.leitura_valor).where(Leitura.id_sensor == sid)
+                             .order_by(Leitura.leitura_data_hora.desc()).limit(3)).all()
+        except OperationalError:
+            erros += 1
+            continue
+        lat.append(time.perf_counter() - t0)
+        ok += 1
+    out.put(("w", ok * lote, erros, lat))
+
+
+def _reader(path, edge, segundos, out):
+    from sqlalchemy import select
+    from sqlalchemy.exc import OperationalError
+    from ..models import Leitura
+
+    engine = _engine(path, edge, readonly=True)
+    n = erros = 0
+    fim = time.perf_counter() + segundos
+    while time.perf_counter() < fim:
+        try:
+            with engine.connect() as conn:
+                conn.execute(select(Leitura.leitura_data_hora, Leitura.leitura_valor)
+                             .where(Leitura.id_sensor == 1).order_by(Leitura.leitura_data_hora).limit(500)).all()
+            n += 1
+        except OperationalError:
+            erros += 1
+    out.put(("r", n, erros, []))
+
+
+def run(edge: bool, workers: int, segundos: float, lote: int, leitores: int) -> dict:
+    from sqlalchemy import func, select
+    from ..models import Leitura
+
+    tmp = tempfile.mkdtemp(prefix="bench_sqlite_")
+    path = os.path.join(tmp, "ingest.db")
+    _setup(path, edge)
+    out = mp.Queue()
+    procs = [mp.Process(target=_writer, args=(path, edge, segundos, lote, w, out)) for w in range(workers)]
+    procs += [mp.Process(target=_reader, args=(path, edge, segundos, out)) for _ in range(leitores)]
+    for p in procs:
+        p.start()
+    res = [out.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    gravadas = sum(r[1] for r in res if r[0] == "w")
+    lat = sorted(x for r in res if r[0] == "w" for x in r[3])
+    engine = _engine(path, edge)
+    with engine.connect() as conn:
+        no_banco = conn.execute(select(func.count()).select_from(Leitura)).scalar()
+    engine.dispose()
+    assert no_banco == gravadas, f"commits={gravadas} mas LEITURAS_SENSOR={no_banco}"
+    return {
+        "leituras_s": gravadas / segundos,
+        "erros_escrita": sum(r[2] for r in res if r[0] == "w"),
+        "p99_ms": lat[int(len(lat) * 0.99)] * 1e3 if lat else float("nan"),
+        "consultas_s": sum(r[1] for r in res if r[0] == "r") / segundos,
+        "erros_leitura": sum(r[2] for r in res if r[0] == "r"),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=4, help="processos escrevendo")
+    ap.add_argument("--segundos", type=float, default=10)
+    ap.add_argument("--lote", type=int, default=1, help="leituras por transação (1 = POST unitário)")
+    ap.add_argument("--leitores", type=int, default=1, help="processos consultando a série")
+    args = ap.parse_args()
+
+    print(f"== {args.workers} writers + {args.leitores} leitor(es), lote {args.lote}, {args.segundos:g}s ==")
+    print(f"{'perfil':<10}{'leituras/s':>12}{'p99 (ms)':>10}{'erros escr.':>13}{'consultas/s':>13}{'erros leit.':>13}")
+    for nome, edge in (("padrão", False), ("borda", True)):
+        r = run(edge, args.workers, args.segundos, args.lote, args.leitores)
+        print(f"{nome:<10}{r['leituras_s']:>12.0f}{r['p99_ms']:>10.1f}{r['erros_escrita']:>13}"
+              f"{r['consultas_s']:>13.0f}{r['erros_leitura']:>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# app/bench/startup.py
+"""
+Tempo de partida (interpretador + imports + criação do app) por entry point, com orçamento.
+
+Como rodar:
+    python -m app.bench.startup [--vezes 7] [--perfil seed]
+
+Cada entry point roda em processo novo --vezes vezes (mediana), até o ponto em que o
+trabalho de verdade começaria: web = import de app.wsgi (o que o gunicorn faz por worker);
+CLIs = import do módulo + create_cli_app(). Acima do orçamento -> código de saída 1 (CI).
+--perfil NOME mostra os imports mais caros daquele entry point (python -X importtime).
+
+Sem DATABASE_URL no ambiente usa um SQLite temporário (criar o app não conecta no banco).
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+CLI = "from app.factory import create_cli_app; create_cli_app()"
+
+# nome -> (código executado no processo novo, orçamento em ms)
+ENTRY_POINTS = {
+    "web": ("import app.wsgi", 1500),
+    "web (ADMIN_ENABLED=0)": ("import os; os.environ['ADMIN_ENABLED'] = '0'; import app.wsgi", 1000),
+    "seed": ("import app.seed", 1000),
+    "alerting": (f"import app.alerting; {CLI}", 1000),
+    "stats": (f"import app.stats; {CLI}", 1000),
+    "usage": (f"import app.usage; {CLI}", 1000),
+    "drift": (f"import app.drift; {CLI}", 1000),
+    "quantiles": (f"import app.quantiles; {CLI}", 1000),
+    "alert_replay": (f"import app.alert_replay; {CLI}", 1000),
+    "scoring": (f"import app.scoring; {CLI}", 1000),
+    "udp_ingest": (f"import app.udp_ingest; {CLI}", 1000),
+    "gateway": ("import app.gateway", 1000),
+}
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_startup.db')}")
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (os.getcwd(), env.get("PYTHONPATH")) if p)
+    return env
+
+
+def medir(codigo: str, vezes: int) -> float:
+    env, tempos = _env(), []
+    for _ in range(vezes):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", codigo], env=env, check=True)
+        tempos.append(time.perf_counter() - t0)
+    return statistics.median(tempos) * 1e3
+
+
+def perfil(codigo: str, top: int = 15) -> list:
+    """[(ms cumulativo, módulo)] dos imports mais caros, pelo -X importtime."""
+    r = subprocess.run([sys.executable, "-X", "importtime", "-c", codigo], env=_env(),
+                       capture_output=True, text=True, check=True)
+    linhas = []
+    for linha in r.stderr.splitlines():
+        if not linha.startswith("import time:") or "cumulative" in linha:
+            continue
+        _, cumul, modulo = linha[len("import time:"):].split("|")
+        nivel = (len(modulo) - len(modulo.lstrip()) - 1) // 2
+        if nivel <= 1:                           # entry point e o que ele importa diretamente
+            linhas.append((int(cumul) / 1e3, modulo.strip()))
+    return sorted(linhas, reverse=True)[:top]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--vezes", type=int, default=7, help="execuções por entry point (mediana)")
+    ap.add_argument("--perfil", choices=sorted(ENTRY_POINTS), help="imports mais caros deste entry point")
+    args = ap.parse_args()
+
+    if args.perfil:
+        print(f"== imports de {args.perfil} (ms cumulativo) ==")
+        for ms, modulo in perfil(ENTRY_POINTS[args.perfil][0]):
+            print(f"{ms:>9.1f}  {modulo}")
+        return
+
+    base = medir("pass", args.vezes)
+    print(f"== partida por entry point (mediana de {args.vezes}; interpretador vazio: {base:.0f} ms) ==")
+    print(f"{'entry point':<24}{'ms':>8}{'orçamento':>11}")
+    estourou = []
+    for nome, (codigo, orcamento) in ENTRY_POINTS.items():
+        ms = medir(codigo, args.vezes)
+        if ms > orcamento:
+            estourou.append(nome)
+        print(f"{nome:<24}{ms:>8.0f}{orcamento:>11}{'  ESTOUROU' if ms > orcamento else ''}")
+    if estourou:
+        sys.exit(f"[startup] acima do orçamento: {', '.join(estourou)}")
+
+
+if __name__ == "__main__":
+    main()
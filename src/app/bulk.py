@@ -0,0 +1,209 @@
+# app/bulk.py
+"""
+Carga em massa de leituras (backfill após queda do gateway, implantação de planta).
+
+POST /api/readings/bulk com o corpo em NDJSON (um objeto por linha, mesmos campos de
+/api/readings) ou CSV com cabeçalho (id_sensor,leitura_valor,leitura_data_hora):
+
+- Corpo lido em blocos de BULK_CHUNK bytes direto do stream (chunked ou Content-Length,
+  opcionalmente Content-Encoding: gzip) -> memória limitada ao lote, não ao arquivo
+- Validação colunar por lote de BULK_BATCH linhas (pandas to_numeric/to_datetime sobre
+  as colunas, sensores conferidos contra o conjunto carregado uma vez) com as mesmas regras
+  de ReadingInSchema; linhas inválidas viram rejeições com número da linha e motivo
+- Cada lote válido: insert_readings (executemany + estatísticas/drift/sketches) e COMMIT.
+  Sem motor de alertas nem estado quente (histórico; reavalie alertas offline se preciso)
+- Progresso no log a cada BULK_LOG_S; resposta final com totais, taxa, rejeições
+  (até BULK_MAX_REJECTS) e `ultima_linha` comitada. Se a conexão cair, os lotes já comitados
+  ficam: reenvie o arquivo com ?desde_linha=<ultima_linha> para continuar de onde parou
+
+Formato: ?formato=ndjson|csv ou Content-Type (application/x-ndjson, application/jsonl,
+text/csv). Exemplos:
+    curl -T leituras.ndjson -H "Content-Type: application/x-ndjson" localhost:5001/api/readings/bulk
+    gzip -c leituras.csv | curl --data-binary @- -H "Content-Type: text/csv" \\
+        -H "Content-Encoding: gzip" "localhost:5001/api/readings/bulk?desde_linha=2000000"
+
+Uploads de milhões de linhas levam minutos: aumente o --timeout do gunicorn no serviço web.
+"""
+import csv
+import gzip
+import json
+import os
+import time
+import zlib
+
+import numpy as np
+
+from .extensions import db
+from .ingest import insert_readings
+from .models import Sensor
+
+BULK_BATCH = int(os.getenv("BULK_BATCH", "10000"))
+BULK_CHUNK = int(os.getenv("BULK_CHUNK", str(1 << 16)))
+BULK_MAX_REJECTS = int(os.getenv("BULK_MAX_REJECTS", "1000"))
+BULK_LOG_S = float(os.getenv("BULK_LOG_S", "5"))
+CAMPOS = ("id_sensor", "leitura_valor", "leitura_data_hora")
+TIPOS = {
+    "application/x-ndjson": "ndjson", "application/jsonl": "ndjson", "application/ndjson": "ndjson",
+    "text/csv": "csv", "application/csv": "csv",
+}
+INT_MAX = 2**31 - 1
+
+
+class BulkFormatError(ValueError):
+    """Corpo que não dá para ler (formato desconhecido, CSV sem as colunas, gzip inválido)."""
+
+    def __init__(self, msg: str, ultima_linha: int = None):
+        super().__init__(msg)
+        self.ultima_linha = ultima_linha      # última linha já comitada (retomar com ?desde_linha=)
+
+
+def detect_format(formato: str, content_type: str) -> str:
+    formato = (formato or TIPOS.get((content_type or "").split(";")[0].strip().lower(), "")).lower()
+    if formato not in ("ndjson", "csv"):
+        raise BulkFormatError("formato não suportado: use NDJSON ou CSV (?formato= ou Content-Type)")
+    return formato
+
+
+def iter_lines(stream, chunk: int = BULK_CHUNK):
+    """(nº da linha, bytes) lendo o stream em blocos; nunca o corpo inteiro em memória."""
+    resto, n = b"", 0
+    while True:
+        bloco = stream.read(chunk)
+        if not bloco:
+            break
+        partes = (resto + bloco).split(b"\n")
+        resto = partes.pop()
+        for linha in partes:
+            n += 1
+            yield n, linha
+    if resto:
+        yield n + 1, resto
+
+
+def iter_records(linhas, formato: str):
+    """(nº da linha, (id_sensor, valor, data) brutos ou None, motivo se a linha não parseia)."""
+    colunas = None
+    for n, raw in linhas:
+        raw = raw.strip()
+        if not raw:
+            continue
+        if formato == "ndjson":
+            try:
+                obj = json.loads(raw)
+            except ValueError:
+                yield n, None, "JSON inválido"
+                continue
+            if not isinstance(obj, dict):
+                yield n, None, "linha não é um objeto JSON"
+                continue
+            yield n, tuple(obj.get(c) for c in CAMPOS), None
+            continue
+        campos = next(csv.reader([raw.decode("utf-8", "replace")]))
+        if colunas is None:           # primeira linha não vazia = cabeçalho
+            nomes = [c.strip().lower() for c in campos]
+            faltando = [c for c in CAMPOS if c not in nomes]
+            if faltando:
+                raise BulkFormatError(f"CSV sem coluna(s) {faltando} no cabeçalho")
+            colunas = [nomes.index(c) for c in CAMPOS]
+            continue
+        if len(campos) <= max(colunas):
+            yield n, None, "colunas a menos que o cabeçalho"
+            continue
+        yield n, tuple(campos[i] for i in colunas), None
+
+
+def validate(ids: list, valores: list, datas: list, sensores: set) -> tuple:
+    """
+    Validação colunar de um lote -> (linhas prontas para insert_readings, [(posição, motivo)]).
+    Mesmas regras de ReadingInSchema: id inteiro, valor finito, data ISO 8601 (com fuso ->
+    UTC sem tzinfo, como naive_utc); além disso o sensor tem de existir.
+    """
+    import pandas as pd     # adiado: só quem faz carga em massa paga o import do pandas
+
+    id_num = pd.to_numeric(pd.Series(ids, dtype=object), errors="coerce").to_numpy(dtype=float)
+    val = pd.to_numeric(pd.Series(valores, dtype=object), errors="coerce").to_numpy(dtype=float)
+    ts = pd.to_datetime(pd.Series(datas, dtype=object), utc=True, format="ISO8601", errors="coerce")
+    ts_ok = ts.notna().to_numpy() & np.fromiter((isinstance(d, str) for d in datas), bool, len(datas))
+
+    with np.errstate(invalid="ignore"):
+        id_ok = np.isfinite(id_num) & (id_num == np.floor(id_num)) & (np.abs(id_num) <= INT_MAX)
+    id_int = np.where(id_ok, id_num, 0).astype(np.int64)
+    motivos = np.select(
+        [~id_ok, ~np.isin(id_int, list(sensores)), ~np.isfinite(val), ~ts_ok],
+        ["id_sensor inválido", "id_sensor inexistente", "leitura_valor inválido", "leitura_data_hora inválida"],
+        default="",
+    )
+    ok = motivos == ""
+    datas_ok = ts[ok].dt.tz_convert(None).to_numpy().astype("datetime64[us]").tolist()
+    rows = [
+        {"id_sensor": i, "leitura_valor": v, "leitura_data_hora": d}
+        for i, v, d in zip(id_int[ok].tolist(), val[ok].tolist(), datas_ok)
+    ]
+    rejeitadas = [(int(p), str(motivos[p])) for p in np.flatnonzero(~ok)]
+    return rows, rejeitadas
+
+
+def load_stream(stream, formato: str, *, desde_linha: int = 0, batch: int = BULK_BATCH,
+                gzipped: bool = False) -> dict:
+    """Lê, valida e grava o corpo inteiro em lotes comitados. Retorna o resumo da carga."""
+    if gzipped:
+        stream = gzip.GzipFile(fileobj=stream, mode="rb")
+    sensores = {i for (i,) in db.session.query(Sensor.id_sensor)}
+    res = {"formato": formato, "linhas": 0, "inseridas": 0, "rejeitadas": 0, "lotes": 0,
+           "ultima_linha": desde_linha, "rejeicoes": []}
+    t0 = ultimo_log = time.perf_counter()
+
+    def rejeitar(linha, motivo):
+        res["rejeitadas"] += 1
+        if len(res["rejeicoes"]) < BULK_MAX_REJECTS:
+            res["rejeicoes"].append({"linha": linha, "motivo": motivo})
+
+    def gravar(lote):
+        nonlocal ultimo_log
+        linhas, ids, valores, datas = zip(*lote)
+        rows, rejeitadas = validate(ids, valores, datas, sensores)
+        for pos, motivo in rejeitadas:
+            rejeitar(linhas[pos], motivo)
+        if rows:
+            insert_readings(db.session.connection(), rows)
+            db.session.commit()
+        res["inseridas"] += len(rows)
+        res["lotes"] += 1
+        res["ultima_linha"] = linhas[-1]
+        agora = time.perf_counter()
+        if agora - ultimo_log >= BULK_LOG_S:
+            ultimo_log = agora
+            print(f"[bulk] linha {res['ultima_linha']}: {res['inseridas']} inseridas, "
+                  f"{res['rejeitadas']} rejeitadas ({res['inseridas'] / (agora - t0):.0f}/s)")
+
+    lote, n = [], desde_linha
+    try:
+        for n, campos, erro in iter_records(iter_lines(stream), formato):
+            if n <= desde_linha:
+                continue
+            res["linhas"] += 1
+            if erro:
+                rejeitar(n, erro)
+                continue
+            lote.append((n, *campos))
+            if len(lote) >= batch:
+                gravar(lote)
+                lote = []
+        if lote:
+            gravar(lote)
+        res["ultima_linha"] = max(n, desde_linha)     # corpo inteiro processado
+    except BaseException as e:
+        db.session.rollback()
+        print(f"[bulk] interrompido após a linha {res['ultima_linha']} "
+              f"({res['inseridas']} já comitadas; retome com ?desde_linha={res['ultima_linha']})")
+        if isinstance(e, (gzip.BadGzipFile, EOFError, zlib.error)):
+            raise BulkFormatError(f"corpo gzip inválido ou truncado: {e}", res["ultima_linha"]) from e
+        if isinstance(e, BulkFormatError):
+            e.ultima_linha = res["ultima_linha"]
+        raise
+    seg = time.perf_counter() - t0
+    res["segundos"] = round(seg, 3)
+    res["leituras_s"] = round(res["inseridas"] / seg, 1) if seg else None
+    res["rejeicoes_truncadas"] = res["rejeitadas"] > len(res["rejeicoes"])
+    print(f"[bulk] fim: {res['inseridas']} inseridas, {res['rejeitadas']} rejeitadas em {seg:.1f}s")
+    return res
@@ -1,7 +1,36 @@
 import os
+
+
+def engine_options(url: str) -> dict:
+    """Pool/conexão do engine (DB_POOL_*); em SQLite só vale o que não depende de pool por servidor."""
+    opts = {
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1") == "1",    # descarta conexão morta antes de usar
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),     # < wait_timeout do MySQL/proxy
+    }
+    if not url.startswith("sqlite"):
+        opts.update(
+            pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+            pool_timeout=int(os.getenv("DB_POOL_TIMEOUT", "30")),
+        )
+    return opts
+
+
+def _binds() -> dict:
+    replica = os.getenv("DATABASE_REPLICA_URL")
+    return {"replica": {"url": replica, **engine_options(replica)}} if replica else {}
+
+
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", "sqlite:///local.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+
+    # >>> BANCO: réplica de leitura e timeout de statement (ver app/dbrouting.py)
+    SQLALCHEMY_BINDS = _binds()                       # DATABASE_REPLICA_URL -> bind "replica"
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))   # 0 = sem limite
+    DB_REPLICA_MAX_LAG_S = float(os.getenv("DB_REPLICA_MAX_LAG_S", "5"))
+    DB_REPLICA_CHECK_S = float(os.getenv("DB_REPLICA_CHECK_S", "2"))
     SECRET_KEY = os.getenv("SECRET_KEY", "dev")
 
     # >>> ALERTAS
@@ -9,3 +38,20 @@ class Config:
     ALERT_THRESH_VIBRACAO = float(os.getenv("ALERT_THRESH_VIBRACAO", "80"))
     ALERT_MIN_STREAK = int(os.getenv("ALERT_MIN_STREAK", "3"))
     ALERT_WINDOW_SECONDS = int(os.getenv("ALERT_WINDOW_SECONDS", "120"))
+    ALERT_COOLDOWN_SECONDS = int(os.getenv("ALERT_COOLDOWN_SECONDS", "300"))  # coalescência de incidentes
+
+    # >>> PROFILING sob demanda (ver app/profiling.py)
+    PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "0") == "1"
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/profiles")
+    PROFILE_ALLOWED_IPS = os.getenv("PROFILE_ALLOWED_IPS", "127.0.0.1")
+    PROFILE_MODE = os.getenv("PROFILE_MODE", "sample")
+    PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "2"))
+
+    # >>> ESTADO QUENTE compartilhado entre workers (ver app/hotstate.py)
+    HOTSTATE_ENABLED = os.getenv("HOTSTATE_ENABLED", "0") == "1"
+    HOTSTATE_NAME = os.getenv("HOTSTATE_NAME", "fiap_hotstate")
+    HOTSTATE_SLOTS = int(os.getenv("HOTSTATE_SLOTS", "4096"))
+    HOTSTATE_EWMA_ALPHA = float(os.getenv("HOTSTATE_EWMA_ALPHA", "0.1"))
+
+    # >>> ADMIN (/admin, Flask-Admin): 0 em workers só de API poupa o import na partida
+    ADMIN_ENABLED = os.getenv("ADMIN_ENABLED", "1") == "1"
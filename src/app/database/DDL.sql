@@ -11,9 +11,13 @@ CREATE TABLE IF NOT EXISTS PECAS (
     id_peca INT AUTO_INCREMENT PRIMARY KEY,
     tipo VARCHAR(100) NOT NULL,
     fabricante VARCHAR(100),
-    tempo_uso_total INT
+    tempo_uso_total INT,                   -- minutos de ciclos fechados (acumulado)
+    qtd_ciclos INT NOT NULL DEFAULT 0,     -- ciclos fechados
+    id_ciclo_aberto INT NULL               -- ciclo em andamento (ponteiro p/ CICLOS_OPERACAO)
 );
 
+CREATE INDEX IX_PECAS_CICLO_ABERTO ON PECAS(id_ciclo_aberto);
+
 -- Tabela: SENSORES
 CREATE TABLE IF NOT EXISTS SENSORES (
     id_sensor INT AUTO_INCREMENT PRIMARY KEY,
@@ -39,6 +43,8 @@ CREATE TABLE IF NOT EXISTS CICLOS_OPERACAO (
 );
 
 CREATE INDEX IX_CICLOS_ID_PECA ON CICLOS_OPERACAO(id_peca);
+-- ciclo aberto por peça (eventos start/end set-based)
+CREATE INDEX IX_CICLOS_PECA_FIM ON CICLOS_OPERACAO(id_peca, data_fim);
 
 -- Tabela: LEITURAS_SENSOR
 CREATE TABLE IF NOT EXISTS LEITURAS_SENSOR (
@@ -51,20 +57,99 @@ CREATE TABLE IF NOT EXISTS LEITURAS_SENSOR (
         ON DELETE CASCADE
 );
 
-CREATE INDEX IX_LEITURAS_ID_SENSOR ON LEITURAS_SENSOR(id_sensor);
+-- (id_sensor, data) + valor: série do gráfico, streak de alerta e médias do snapshot saem só
+-- do índice; também atende a FK (prefixo id_sensor), por isso não há índice só de id_sensor
+CREATE INDEX IX_LEITURAS_SENSOR_DATA ON LEITURAS_SENSOR(id_sensor, leitura_data_hora, leitura_valor);
+
+-- janela de tempo sem sensor (admin /admin/leitura, export CSV): keyset em (data, id) —
+-- no InnoDB o índice secundário já carrega a PK, então (leitura_data_hora) basta
+CREATE INDEX IX_LEITURAS_DATA ON LEITURAS_SENSOR(leitura_data_hora);
+
+-- Tabela: ESTATISTICAS_SENSOR
+-- contagem e última leitura por sensor, mantidas na ingestão (app/stats.py);
+-- o dashboard e /api/sensors/latest leem daqui em vez de varrer LEITURAS_SENSOR
+CREATE TABLE IF NOT EXISTS ESTATISTICAS_SENSOR (
+    id_sensor INT PRIMARY KEY,
+    qtd_leituras BIGINT NOT NULL DEFAULT 0,
+    ultimo_valor DECIMAL(12,4),
+    ultima_data_hora DATETIME,
+    CONSTRAINT FK_ESTATISTICAS_SENSORES
+        FOREIGN KEY (id_sensor) REFERENCES SENSORES(id_sensor)
+        ON DELETE CASCADE
+);
+
+-- Tabela: HISTOGRAMAS_LEITURA
+-- histogramas de faixas fixas por (feature, hora), mantidos na ingestão (app/drift.py):
+-- bin 0 = abaixo da faixa, 1..DRIFT_BINS = faixa, DRIFT_BINS+1 = acima, DRIFT_BINS+2 = nulo
+CREATE TABLE IF NOT EXISTS HISTOGRAMAS_LEITURA (
+    feature VARCHAR(50) NOT NULL,
+    hora DATETIME NOT NULL,
+    bin SMALLINT NOT NULL,
+    qtd BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (feature, hora, bin)
+);
+
+-- Tabela: SKETCHES_LEITURA
+-- quantis aproximados por (sensor, hora): contagem por balde logarítmico (app/quantiles.py);
+-- /api/readings/quantiles soma os baldes da janela em vez de ordenar LEITURAS_SENSOR
+CREATE TABLE IF NOT EXISTS SKETCHES_LEITURA (
+    id_sensor INT NOT NULL,
+    hora DATETIME NOT NULL,
+    bucket SMALLINT NOT NULL,
+    qtd BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (id_sensor, hora, bucket),
+    CONSTRAINT FK_SKETCHES_SENSORES
+        FOREIGN KEY (id_sensor) REFERENCES SENSORES(id_sensor)
+        ON DELETE CASCADE
+);
+
+-- Tabela: DRIFT_AVALIACOES
+-- PSI/KS contra a referência do treino e taxas de nulos/fora de faixa (python -m app.drift)
+CREATE TABLE IF NOT EXISTS DRIFT_AVALIACOES (
+    id_avaliacao INT AUTO_INCREMENT PRIMARY KEY,
+    avaliado_em DATETIME NOT NULL,
+    feature VARCHAR(50) NOT NULL,
+    janela_inicio DATETIME,
+    janela_fim DATETIME,
+    qtd_leituras BIGINT,
+    psi DOUBLE,
+    ks DOUBLE,
+    taxa_nulos DOUBLE,
+    taxa_fora_faixa DOUBLE,
+    taxa_fora_ref DOUBLE,
+    status VARCHAR(20)                     -- ok | atencao | drift | sem_dados | sem_ref
+);
+
+CREATE INDEX IX_DRIFT_FEATURE_DATA ON DRIFT_AVALIACOES(feature, avaliado_em);
 
 -- Tabela: FALHAS
 CREATE TABLE IF NOT EXISTS FALHAS (
     id_falha INT AUTO_INCREMENT PRIMARY KEY,
     id_peca INT,
     descricao VARCHAR(255),
-    data DATETIME,
+    data DATETIME,                         -- abertura do incidente
+    id_sensor INT,
+    status VARCHAR(20),                    -- aberta | em_andamento | resolvida
+    qtd_excedencias INT NOT NULL DEFAULT 1,
+    valor_pico DECIMAL(12,4),
+    ultima_ocorrencia DATETIME,
+    data_fim DATETIME,                     -- resolução
+    origem VARCHAR(20),                    -- leitura | api
     CONSTRAINT FK_FALHAS_PECAS
         FOREIGN KEY (id_peca) REFERENCES PECAS(id_peca)
-        ON DELETE CASCADE
+        ON DELETE CASCADE,
+    CONSTRAINT FK_FALHAS_SENSORES
+        FOREIGN KEY (id_sensor) REFERENCES SENSORES(id_sensor)
+        ON DELETE SET NULL
 );
 
-CREATE INDEX IX_FALHAS_ID_PECA ON FALHAS(id_peca);
+-- incidente ativo por sensor (motor de alertas)
+CREATE INDEX IX_FALHAS_SENSOR_STATUS ON FALHAS(id_sensor, status);
+-- listagens paginadas por (data, id): /api/failures e /api/alerts
+-- (IX_FALHAS_PECA_DATA também atende a FK de id_peca, antes coberta por IX_FALHAS_ID_PECA)
+CREATE INDEX IX_FALHAS_DATA ON FALHAS(data, id_falha);
+CREATE INDEX IX_FALHAS_PECA_DATA ON FALHAS(id_peca, data, id_falha);
+CREATE INDEX IX_FALHAS_SENSOR_DATA ON FALHAS(id_sensor, data, id_falha);
 
 -- Tabela: ALERTAS
 CREATE TABLE IF NOT EXISTS ALERTAS (
@@ -77,3 +162,22 @@ CREATE TABLE IF NOT EXISTS ALERTAS (
 );
 
 CREATE INDEX IX_ALERTAS_ID_FALHA ON ALERTAS(id_falha);
+CREATE INDEX IX_ALERTAS_NIVEL ON ALERTAS(nivel_risco, id_falha);
+
+-- Tabela: PREDICOES
+-- histórico das previsões por peça gravado pelo scorer periódico (python -m app.scoring);
+-- só entra linha quando estado/versão mudam, a probabilidade anda >= PRED_DELTA_PROB
+-- ou passou PRED_HEARTBEAT_MIN desde a última linha da peça
+CREATE TABLE IF NOT EXISTS PREDICOES (
+    id_predicao INT AUTO_INCREMENT PRIMARY KEY,
+    id_peca INT NOT NULL,
+    data DATETIME NOT NULL,                -- instante avaliado
+    estado VARCHAR(20),                    -- Saudável | Desgastada | Crítica
+    prob_falha DOUBLE,                     -- falha nas próximas 24h
+    versao_modelo VARCHAR(16),
+    CONSTRAINT FK_PREDICOES_PECAS
+        FOREIGN KEY (id_peca) REFERENCES PECAS(id_peca)
+        ON DELETE CASCADE
+);
+
+CREATE INDEX IX_PREDICOES_PECA_DATA ON PREDICOES(id_peca, data);
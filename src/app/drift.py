@@ -0,0 +1,320 @@
+# app/drift.py
+"""
+Monitor de drift e qualidade dos dados na ingestão.
+
+- Histogramas de faixas FIXAS por feature (tipo de sensor: temperatura, vibracao, ...) e
+  por hora, em HISTOGRAMAS_LEITURA. bump_histograms (chamada por app.ingest, junto com
+  bump_stats) calcula a faixa de cada leitura com aritmética O(1) e soma o lote num
+  upsert por (feature, hora, bin): memória constante, sem guardar valores.
+      bin 0 = abaixo da faixa | 1..DRIFT_BINS = faixa | DRIFT_BINS+1 = acima | DRIFT_BINS+2 = nulo
+- Referência: os mesmos histogramas calculados sobre o dataset de treino e gravados em
+  MODEL_DIR/referencia_drift.json pelos scripts de treino (write_reference).
+- Avaliação (agendada: `python -m app.drift --loop 900`): soma as últimas DRIFT_JANELA_H
+  horas, calcula PSI e KS (sobre as faixas) contra a referência e as taxas de nulos,
+  fora da faixa e fora do suporte da referência; grava em DRIFT_AVALIACOES.
+  GET /api/drift devolve a última avaliação por feature (?ao_vivo=1 calcula na hora).
+
+Ambiente (opcional):
+    DRIFT_ENABLED=1
+    DRIFT_BINS=40
+    DRIFT_RANGE_TEMPERATURA=-20,180   DRIFT_RANGE_VIBRACAO=0,200   DRIFT_RANGE_DEFAULT=-1000,1000
+    DRIFT_JANELA_H=24    DRIFT_MIN_LEITURAS=100    DRIFT_RETENCAO_D=30
+    DRIFT_PSI_ATENCAO=0.1   DRIFT_PSI_ALERTA=0.25
+    DRIFT_SENSOR_TTL_S=300            (cache id_sensor -> feature na ingestão)
+    MODEL_DIR (onde fica referencia_drift.json)
+"""
+import argparse
+import json
+import math
+import os
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import delete, func, select
+
+from .extensions import db
+from .models import DriftAvaliacao, HistogramaLeitura, Sensor
+from .sqlutils import dialect_insert
+
+DRIFT_ENABLED = os.getenv("DRIFT_ENABLED", "1") == "1"
+BINS = int(os.getenv("DRIFT_BINS", "40"))
+JANELA_H = int(os.getenv("DRIFT_JANELA_H", "24"))
+MIN_LEITURAS = int(os.getenv("DRIFT_MIN_LEITURAS", "100"))
+RETENCAO_D = int(os.getenv("DRIFT_RETENCAO_D", "30"))
+PSI_ATENCAO = float(os.getenv("DRIFT_PSI_ATENCAO", "0.1"))
+PSI_ALERTA = float(os.getenv("DRIFT_PSI_ALERTA", "0.25"))
+SENSOR_TTL_S = float(os.getenv("DRIFT_SENSOR_TTL_S", "300"))
+REFERENCE_FILE = "referencia_drift.json"
+FEATURES = ("temperatura", "vibracao")    # colunas do dataset de treino com histograma de referência
+EPS = 1e-4                                # evita log(0) no PSI
+
+HISTS = HistogramaLeitura.__table__
+ABAIXO, ACIMA, NULO = 0, BINS + 1, BINS + 2
+
+
+def _range(feature: str) -> tuple:
+    raw = os.getenv(f"DRIFT_RANGE_{feature.upper()}") or {
+        "temperatura": "-20,180", "vibracao": "0,200",
+    }.get(feature) or os.getenv("DRIFT_RANGE_DEFAULT", "-1000,1000")
+    lo, hi = (float(x) for x in raw.split(","))
+    return lo, hi
+
+
+def feature_for(tipo_sensor: str) -> str:
+    """Tipo do sensor -> nome da feature (mesma regra de alerting.threshold_for)."""
+    tipo = (tipo_sensor or "").strip().lower()
+    if "temp" in tipo:
+        return "temperatura"
+    if "vibra" in tipo:
+        return "vibracao"
+    return tipo or "desconhecido"
+
+
+_SPECS = {}   # feature -> (lo, largura)
+
+
+def _spec(feature: str) -> tuple:
+    spec = _SPECS.get(feature)
+    if spec is None:
+        lo, hi = _range(feature)
+        spec = _SPECS[feature] = (lo, (hi - lo) / BINS)
+    return spec
+
+
+def bin_index(feature: str, valor) -> int:
+    if valor is None or valor != valor:       # None / NaN
+        return NULO
+    lo, largura = _spec(feature)
+    if valor < lo:
+        return ABAIXO
+    i = int((valor - lo) / largura) + 1
+    return i if i <= BINS else ACIMA
+
+
+def bin_counts(feature: str, valores) -> np.ndarray:
+    """Versão vetorizada de bin_index: array de valores -> contagens (BINS + 3)."""
+    v = np.asarray(valores, dtype=float)
+    lo, largura = _spec(feature)
+    idx = np.full(v.shape, NULO, dtype=np.int64)
+    ok = ~np.isnan(v)
+    with np.errstate(invalid="ignore"):
+        idx[ok] = np.clip(np.floor((v[ok] - lo) / largura).astype(np.int64) + 1, ABAIXO, ACIMA)
+    return np.bincount(idx, minlength=BINS + 3)
+
+
+# ---------------- ingestão ----------------
+_FEATURES_SENSOR = {}   # id_sensor -> feature; relido a cada SENSOR_TTL_S (tipo trocado)
+_features_desde = 0.0
+
+
+def _features(conn, ids) -> dict:
+    """Sensores desconhecidos são buscados na hora; o cache inteiro expira em SENSOR_TTL_S."""
+    global _features_desde
+    agora = time.monotonic()
+    if agora - _features_desde > SENSOR_TTL_S:
+        _FEATURES_SENSOR.clear()
+        _features_desde = agora
+    faltando = [i for i in ids if i not in _FEATURES_SENSOR]
+    if faltando:
+        for id_sensor, tipo in conn.execute(
+                select(Sensor.id_sensor, Sensor.tipo_sensor).where(Sensor.id_sensor.in_(faltando))):
+            _FEATURES_SENSOR[id_sensor] = feature_for(tipo)
+    return _FEATURES_SENSOR
+
+
+def _hora(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def bump_histograms(conn, rows: list) -> None:
+    """Soma o lote aos histogramas horários (um upsert executemany por (feature, hora, bin))."""
+    if not DRIFT_ENABLED or not rows:
+        return
+    features = _features(conn, {r["id_sensor"] for r in rows})
+    cont = Counter()
+    for r in rows:
+        feature = features.get(r["id_sensor"])
+        if feature is None or r["leitura_data_hora"] is None:
+            continue
+        cont[(feature, _hora(r["leitura_data_hora"]), bin_index(feature, r["leitura_valor"]))] += 1
+    if not cont:
+        return
+    # ordem fixa de chave: writers concorrentes travam as linhas na mesma sequência
+    params = [{"feature": f, "hora": h, "bin": b, "qtd": cont[(f, h, b)]} for f, h, b in sorted(cont)]
+    ins, novo = dialect_insert(conn, HISTS)
+    soma = HISTS.c.qtd + novo.qtd
+    if conn.dialect.name == "mysql":
+        stmt = ins.on_duplicate_key_update(qtd=soma)
+    else:
+        stmt = ins.on_conflict_do_update(index_elements=[HISTS.c.feature, HISTS.c.hora, HISTS.c.bin],
+                                         set_={"qtd": soma})
+    conn.execute(stmt, params)
+
+
+# ---------------- referência (treino) ----------------
+def model_dir() -> Path:
+    return Path(os.getenv("MODEL_DIR", Path(__file__).parent / "ml"))
+
+
+def write_reference(df, out_dir=None) -> Path:
+    """Histogramas das colunas FEATURES de `df` (dataset de treino) -> referencia_drift.json."""
+    out_dir = Path(out_dir or model_dir())
+    features = {}
+    for feature in FEATURES:
+        if feature in df.columns:
+            lo, hi = _range(feature)
+            features[feature] = {"lo": lo, "hi": hi, "counts": bin_counts(feature, df[feature]).tolist()}
+    ref = {"versao": 1, "gerado_em": datetime.utcnow().isoformat(timespec="seconds"),
+           "bins": BINS, "linhas": int(len(df)), "features": features}
+    path = out_dir / REFERENCE_FILE
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(ref), encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+def load_reference() -> dict:
+    path = model_dir() / REFERENCE_FILE
+    return json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+
+
+# ---------------- métricas ----------------
+def psi(atual: np.ndarray, ref: np.ndarray) -> float:
+    p = atual / atual.sum() + EPS
+    q = ref / ref.sum() + EPS
+    return float(np.sum((p - q) * np.log(p / q)))
+
+
+def ks(atual: np.ndarray, ref: np.ndarray) -> float:
+    """Distância KS entre as distribuições agrupadas (máx. diferença das CDFs por faixa)."""
+    return float(np.max(np.abs(np.cumsum(atual) / atual.sum() - np.cumsum(ref) / ref.sum())))
+
+
+def _status(n: int, valor_psi) -> str:
+    if n < MIN_LEITURAS:
+        return "sem_dados"
+    if valor_psi is None:
+        return "sem_ref"
+    if valor_psi >= PSI_ALERTA:
+        return "drift"
+    return "atencao" if valor_psi >= PSI_ATENCAO else "ok"
+
+
+def _round(x):
+    return None if x is None or math.isnan(x) else round(x, 6)
+
+
+def evaluate(janela_h: int = JANELA_H, agora: datetime = None) -> list:
+    """Compara as últimas `janela_h` horas com a referência. Não grava (ver run)."""
+    agora = agora or datetime.utcnow()
+    inicio = _hora(agora - timedelta(hours=janela_h))
+    rows = (
+        db.session.query(HistogramaLeitura.feature, HistogramaLeitura.bin, func.sum(HistogramaLeitura.qtd))
+        .filter(HistogramaLeitura.hora >= inicio)
+        .group_by(HistogramaLeitura.feature, HistogramaLeitura.bin)
+        .all()
+    )
+    atuais = {}
+    for feature, b, qtd in rows:
+        if 0 <= b <= NULO:
+            atuais.setdefault(feature, np.zeros(BINS + 3))[b] += int(qtd)
+
+    ref = load_reference()
+    compat = ref.get("bins") == BINS
+    ref_features = ref.get("features", {}) if compat else {}
+    resultado = []
+    for feature in sorted(set(atuais) | set(ref_features)):
+        cont = atuais.get(feature, np.zeros(BINS + 3))
+        total = int(cont.sum())
+        validos = cont[:NULO]                  # sem o bin de nulos
+        n = int(validos.sum())
+        r = ref_features.get(feature)
+        valor_psi = valor_ks = fora_ref = None
+        if r is not None and (r["lo"], r["hi"]) == _range(feature) and n:
+            rc = np.asarray(r["counts"], dtype=float)[:NULO]
+            if rc.sum():
+                valor_psi, valor_ks = psi(validos, rc), ks(validos, rc)
+                fora_ref = float(validos[rc == 0].sum() / n)
+        resultado.append({
+            "feature": feature,
+            "janela_inicio": inicio.isoformat(),
+            "janela_fim": agora.isoformat(timespec="seconds"),
+            "qtd_leituras": total,
+            "psi": _round(valor_psi),
+            "ks": _round(valor_ks),
+            "taxa_nulos": _round(cont[NULO] / total) if total else None,
+            "taxa_fora_faixa": _round((cont[ABAIXO] + cont[ACIMA]) / n) if n else None,
+            "taxa_fora_ref": _round(fora_ref),
+            "status": _status(n, valor_psi),
+        })
+    return resultado
+
+
+def run(janela_h: int = JANELA_H) -> list:
+    """Avalia, grava em DRIFT_AVALIACOES e descarta histogramas além da retenção."""
+    agora = datetime.utcnow()
+    resultado = evaluate(janela_h, agora)
+    for r in resultado:
+        db.session.add(DriftAvaliacao(
+            avaliado_em=agora,
+            feature=r["feature"],
+            janela_inicio=datetime.fromisoformat(r["janela_inicio"]),
+            janela_fim=agora,
+            qtd_leituras=r["qtd_leituras"],
+            psi=r["psi"], ks=r["ks"],
+            taxa_nulos=r["taxa_nulos"], taxa_fora_faixa=r["taxa_fora_faixa"], taxa_fora_ref=r["taxa_fora_ref"],
+            status=r["status"],
+        ))
+    db.session.execute(delete(HistogramaLeitura).where(HistogramaLeitura.hora < agora - timedelta(days=RETENCAO_D)))
+    db.session.commit()
+    return resultado
+
+
+def _serialize(a: DriftAvaliacao) -> dict:
+    return {
+        "feature": a.feature,
+        "avaliado_em": a.avaliado_em.isoformat(),
+        "janela_inicio": a.janela_inicio.isoformat() if a.janela_inicio else None,
+        "janela_fim": a.janela_fim.isoformat() if a.janela_fim else None,
+        "qtd_leituras": a.qtd_leituras,
+        "psi": a.psi, "ks": a.ks,
+        "taxa_nulos": a.taxa_nulos, "taxa_fora_faixa": a.taxa_fora_faixa, "taxa_fora_ref": a.taxa_fora_ref,
+        "status": a.status,
+    }
+
+
+def latest(feature: str = None, limit: int = 1) -> list:
+    """Últimas `limit` avaliações por feature (ou só de `feature`), mais recentes primeiro."""
+    features = [feature] if feature else [
+        f for (f,) in db.session.query(DriftAvaliacao.feature).distinct().order_by(DriftAvaliacao.feature)]
+    out = []
+    for f in features:
+        q = (db.session.query(DriftAvaliacao).filter(DriftAvaliacao.feature == f)
+             .order_by(DriftAvaliacao.avaliado_em.desc(), DriftAvaliacao.id_avaliacao.desc()).limit(limit))
+        out.extend(_serialize(a) for a in q)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Avalia drift e qualidade das leituras contra a referência do treino.")
+    ap.add_argument("--janela-h", type=int, default=JANELA_H, help=f"horas avaliadas (default: {JANELA_H})")
+    ap.add_argument("--loop", type=float, default=0, help="repete a cada N segundos (0 = uma vez)")
+    args = ap.parse_args()
+
+    from .factory import create_cli_app
+    app = create_cli_app()
+    while True:
+        with app.app_context():
+            for r in run(args.janela_h):
+                print(f"[drift] {r['feature']:<12} {r['status']:<9} n={r['qtd_leituras']} "
+                      f"psi={r['psi']} ks={r['ks']} nulos={r['taxa_nulos']} fora_faixa={r['taxa_fora_faixa']}")
+        if not args.loop:
+            break
+        time.sleep(args.loop)
+
+
+if __name__ == "__main__":
+    main()
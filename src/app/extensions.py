@@ -1,9 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
-from flask_admin import Admin
-from flask_cors import CORS
+from .dbrouting import RoutingSession
 
-db = SQLAlchemy()
-migrate = Migrate()
-admin = Admin(name="Admin", template_mode="bootstrap4")
-cors = CORS()
+# Admin, CORS e Migrate são criados em app/wsgi.py: CLIs importam models/db sem carregá-los
+db = SQLAlchemy(session_options={"class_": RoutingSession})
@@ -0,0 +1,33 @@
+# app/factory.py
+"""
+App mínimo para CLIs e jobs (seed, alerting, stats, usage, drift, quantiles, udp_ingest...).
+
+Só Config + SQLAlchemy + roteamento/perfil de banco (app/dbrouting.py): sem Flask-Admin,
+CORS, Flask-Migrate, blueprints nem ML, que pesam no import e não são usados fora do web.
+O app completo (app/wsgi.py) parte deste mesmo núcleo.
+
+Tempo de partida por entry point: python -m app.bench.startup
+"""
+from flask import Flask
+
+from .config import Config
+from .dbrouting import init_db_routing
+from .extensions import db
+
+_cli_app = None
+
+
+def create_base_app() -> Flask:
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+    init_db_routing(app)
+    return app
+
+
+def create_cli_app() -> Flask:
+    """App mínimo, um por processo (CLIs chamam várias funções com app_context)."""
+    global _cli_app
+    if _cli_app is None:
+        _cli_app = create_base_app()
+    return _cli_app
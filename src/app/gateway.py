@@ -0,0 +1,321 @@
+# app/gateway.py
+"""
+Gateway de ingestão assíncrono (processo separado do Flask/gunicorn).
+
+- HTTP/1.1 com keep-alive sobre asyncio (uvloop se instalado), sem worker bloqueado por conexão.
+- POST /api/readings com o mesmo JSON de /api/readings (objeto ou lista de objetos),
+  validado com ReadingInSchema.
+- Leituras acumuladas em lote e gravadas a cada GATEWAY_FLUSH_MS (ou GATEWAY_BATCH_MAX linhas)
+  via SQLAlchemy Core (executemany em LEITURAS_SENSOR) num pool pequeno de threads escritoras.
+- Resposta 201 após o commit do lote que contém a leitura; com ?async=1 responde 202 ao enfileirar.
+  Lote com linha inválida é regravado por requisição: só a requisição culpada recebe 500.
+- Checagem de alertas NÃO roda aqui (use /api/readings ou a reavaliação offline).
+
+Como rodar:
+    docker compose up gateway          (porta 5002)
+    python -m app.gateway              (DATABASE_URL=sqlite:///local.db funciona para testes)
+
+Ambiente:
+    GATEWAY_HOST (0.0.0.0)  GATEWAY_PORT (5002)
+    GATEWAY_FLUSH_MS (50)   GATEWAY_BATCH_MAX (5000)  GATEWAY_QUEUE_MAX (200000)
+    GATEWAY_WRITERS (2)     GATEWAY_IDLE_TIMEOUT (75)  GATEWAY_SENSOR_REFRESH (30)
+"""
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from marshmallow import ValidationError
+from sqlalchemy import create_engine, select
+
+from .config import Config, engine_options
+from .dbrouting import install_statement_timeout
+from .sqlite_edge import apply_sqlite_profile
+from .api.schemas import ReadingInSchema
+from .ingest import insert_readings, reading_row
+from .models import Sensor
+
+HOST = os.getenv("GATEWAY_HOST", "0.0.0.0")
+PORT = int(os.getenv("GATEWAY_PORT", "5002"))
+FLUSH_MS = float(os.getenv("GATEWAY_FLUSH_MS", "50"))
+BATCH_MAX = int(os.getenv("GATEWAY_BATCH_MAX", "5000"))
+QUEUE_MAX = int(os.getenv("GATEWAY_QUEUE_MAX", "200000"))
+WRITERS = int(os.getenv("GATEWAY_WRITERS", "2"))
+IDLE_TIMEOUT = float(os.getenv("GATEWAY_IDLE_TIMEOUT", "75"))
+SENSOR_REFRESH = float(os.getenv("GATEWAY_SENSOR_REFRESH", "30"))
+MAX_BODY = 1 << 20
+
+REASONS = {200: "OK", 201: "Created", 202: "Accepted", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 411: "Length Required", 413: "Payload Too Large",
+           500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class Batcher:
+    """
+    Acumula as linhas das requisições e grava em lote. Cada requisição tem seu Future,
+    resolvido após o commit do lote. Se o lote falha (ex.: FK de um sensor removido
+    depois do último refresh), ele é regravado uma requisição por transação: só quem
+    trouxe a linha ruim recebe o erro.
+    """
+
+    def __init__(self, engine, loop):
+        self.engine = engine
+        self.loop = loop
+        self.pool = ThreadPoolExecutor(max_workers=WRITERS, thread_name_prefix="gw-writer")
+        self.slots = asyncio.Semaphore(WRITERS)     # no máx. WRITERS lotes em voo
+        self.reqs = []                              # [(linhas, Future)] por requisição
+        self.nrows = 0
+        self.pending = 0                            # linhas aceitas e ainda não gravadas
+        self.wake = asyncio.Event()
+        self.stats = {"rows": 0, "batches": 0, "errors": 0, "fallbacks": 0, "last_batch_ms": 0.0}
+
+    def add(self, rows):
+        fut = self.loop.create_future()
+        self.reqs.append((rows, fut))
+        self.nrows += len(rows)
+        self.pending += len(rows)
+        if self.nrows >= BATCH_MAX:
+            self.wake.set()
+        return fut
+
+    def _insert(self, rows):
+        with self.engine.begin() as conn:
+            insert_readings(conn, rows)
+
+    def _write(self, grupos):
+        """Grava o lote; em falha, uma transação por requisição. -> (ms, [erro ou None])."""
+        t0 = time.perf_counter()
+        try:
+            self._insert([r for g in grupos for r in g])
+            erros = [None] * len(grupos)
+        except Exception as e:  # noqa: BLE001
+            if len(grupos) == 1:
+                erros = [e]
+            else:
+                self.stats["fallbacks"] += 1
+                erros = []
+                for g in grupos:
+                    try:
+                        self._insert(g)
+                        erros.append(None)
+                    except Exception as e:  # noqa: BLE001
+                        erros.append(e)
+        return (time.perf_counter() - t0) * 1000, erros
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wake.wait(), FLUSH_MS / 1000.0)
+            except asyncio.TimeoutError:
+                pass
+            self.wake.clear()
+            if not self.reqs:
+                continue
+            reqs = self.reqs
+            self.reqs, self.nrows = [], 0
+            await self.slots.acquire()
+            asyncio.ensure_future(self._flush(reqs))
+
+    @staticmethod
+    def _chunks(reqs):
+        """Fatias de requisições inteiras com ~BATCH_MAX linhas cada."""
+        fatia, n = [], 0
+        for req in reqs:
+            fatia.append(req)
+            n += len(req[0])
+            if n >= BATCH_MAX:
+                yield fatia
+                fatia, n = [], 0
+        if fatia:
+            yield fatia
+
+    async def _flush(self, reqs):
+        try:
+            for fatia in self._chunks(reqs):
+                try:
+                    ms, erros = await self.loop.run_in_executor(
+                        self.pool, self._write, [rows for rows, _ in fatia])
+                except Exception as e:  # noqa: BLE001 — executor encerrado etc.
+                    erros = [e] * len(fatia)
+                else:
+                    self.stats["batches"] += 1
+                    self.stats["last_batch_ms"] = round(ms, 2)
+                for (rows, fut), erro in zip(fatia, erros):
+                    if erro is None:
+                        self.stats["rows"] += len(rows)
+                        fut.set_result(len(rows))
+                        continue
+                    # o erro vai para quem esperava a requisição
+                    self.stats["errors"] += 1
+                    print(f"[gateway] falha ao gravar requisição de {len(rows)} linhas: {erro}")
+                    fut.set_exception(erro)
+                    fut.exception()  # marca como observada quando ninguém aguardava (async=1)
+        finally:
+            self.pending -= sum(len(rows) for rows, _ in reqs)
+            self.slots.release()
+
+
+class Gateway:
+    def __init__(self, engine):
+        self.engine = engine
+        self.schema = ReadingInSchema()
+        self.sensors = set()
+        self.batcher = None
+        self.connections = 0
+
+    def _load_sensors(self):
+        with self.engine.connect() as conn:
+            return {r[0] for r in conn.execute(select(Sensor.__table__.c.id_sensor))}
+
+    async def _refresh_sensors(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                self.sensors = await loop.run_in_executor(self.batcher.pool, self._load_sensors)
+            except Exception as e:  # noqa: BLE001
+                print(f"[gateway] falha ao atualizar sensores: {e}")
+            await asyncio.sleep(SENSOR_REFRESH)
+
+    # ---------------- HTTP ----------------
+    @staticmethod
+    def _response(status: int, body: dict, keep_alive: bool) -> bytes:
+        payload = json.dumps(body, separators=(",", ":")).encode()
+        head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        return head.encode("latin-1") + payload
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                except ValueError:       # linha acima do limite do StreamReader
+                    writer.write(self._response(413, {"error": "request line muito longa"}, False))
+                    break
+                if not line:
+                    break
+                try:
+                    method, target, version = line.decode("latin-1").split()
+                except ValueError:
+                    writer.write(self._response(400, {"error": "request line inválida"}, False))
+                    break
+
+                headers = {}
+                try:
+                    while True:
+                        h = await reader.readline()
+                        if h in (b"\r\n", b"\n", b""):
+                            break
+                        k, _, v = h.decode("latin-1").partition(":")
+                        headers[k.strip().lower()] = v.strip()
+                except ValueError:
+                    writer.write(self._response(413, {"error": "cabeçalho muito longo"}, False))
+                    break
+
+                conn_hdr = headers.get("connection", "").lower()
+                keep_alive = conn_hdr != "close" if version == "HTTP/1.1" else conn_hdr == "keep-alive"
+
+                body = b""
+                if "content-length" in headers:
+                    if not headers["content-length"].isdigit():
+                        writer.write(self._response(400, {"error": "Content-Length inválido"}, False))
+                        break
+                    n = int(headers["content-length"])
+                    if n > MAX_BODY:
+                        writer.write(self._response(413, {"error": "corpo muito grande"}, False))
+                        break
+                    body = await reader.readexactly(n)
+                elif headers.get("transfer-encoding"):
+                    writer.write(self._response(411, {"error": "use Content-Length"}, False))
+                    break
+
+                status, resp = await self.dispatch(method, target, body)
+                writer.write(self._response(status, resp, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def dispatch(self, method, target, body):
+        path, _, query = target.partition("?")
+        if path == "/health":
+            return 200, {"status": "ok", "connections": self.connections,
+                         "pending": self.batcher.pending, **self.batcher.stats}
+        if path != "/api/readings":
+            return 404, {"error": "not found"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            return 400, {"error": "JSON inválido"}
+        many = isinstance(data, list)
+        try:
+            payloads = self.schema.load(data, many=many)
+        except ValidationError as err:
+            return 400, {"error": "validation_error", "messages": err.messages}
+        payloads = payloads if many else [payloads]
+
+        unknown = sorted({p["id_sensor"] for p in payloads} - self.sensors)
+        if unknown:
+            return 400, {"error": "id_sensor inexistente", "id_sensor": unknown}
+        if self.batcher.pending + len(payloads) > QUEUE_MAX:
+            return 503, {"error": "fila cheia, tente novamente"}
+
+        fut = self.batcher.add([reading_row(p) for p in payloads])
+        if "async=1" in query.split("&"):
+            return 202, {"ok": True, "accepted": len(payloads)}
+        try:
+            await asyncio.shield(fut)
+        except Exception:  # noqa: BLE001
+            return 500, {"error": "falha ao gravar lote"}
+        return 201, {"ok": True, "accepted": len(payloads)}
+
+    async def serve(self, host=HOST, port=PORT):
+        loop = asyncio.get_running_loop()
+        self.batcher = Batcher(self.engine, loop)
+        self.sensors = await loop.run_in_executor(self.batcher.pool, self._load_sensors)
+        tasks = [asyncio.ensure_future(self.batcher.run()), asyncio.ensure_future(self._refresh_sensors())]
+        server = await asyncio.start_server(self.handle, host, port, backlog=4096)
+        print(f"[gateway] ouvindo em {host}:{port} (flush={FLUSH_MS}ms, lote<={BATCH_MAX}, writers={WRITERS})")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for t in tasks:
+                t.cancel()
+
+
+def make_engine():
+    url = Config.SQLALCHEMY_DATABASE_URI
+    opts = engine_options(url)
+    if "pool_size" in opts:
+        opts["pool_size"] = max(opts["pool_size"], WRITERS + 1)
+    engine = create_engine(url, **opts)
+    install_statement_timeout(engine, Config.DB_STATEMENT_TIMEOUT_MS)
+    apply_sqlite_profile(engine)
+    return engine
+
+
+def main():
+    try:
+        import uvloop  # opcional: ~2x mais conexões/s por núcleo
+        uvloop.install()
+    except ImportError:
+        pass
+    asyncio.run(Gateway(make_engine()).serve())
+
+
+if __name__ == "__main__":
+    main()
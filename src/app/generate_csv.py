@@ -20,6 +20,7 @@ Ambiente:
 
 import os
 from pathlib import Path
+import numpy as np
 import pandas as pd
 from sqlalchemy import create_engine
 
@@ -47,6 +48,7 @@ RISK_THRESH_MED  = float(os.getenv("RISK_THRESH_MED", "0.4"))
 # --- Import do modelo ---
 # (execute em modo módulo: `python -m app.generate_csv`)
 from app.ml import predict as ml_predict
+from app.ml.dataset import write_columnar
 
 
 def load_data(engine):
@@ -91,47 +93,83 @@ def load_data(engine):
     return df, cdf, fdf
 
 
-def asof_fill(base_df, right_df, value_col, by_key="id_peca", time_col="leitura_data_hora"):
-    """
-    Faz merge_asof por peça para pegar o último valor <= timestamp.
-    - Garante sort adequado.
-    - Preserva a ordem original do base_df.
-    - Fallback por peça se houver qualquer problema de ordenação.
-    """
-    import pandas as pd
+def _as_datetime(ts: pd.Series) -> pd.Series:
+    """datetime64 sem fuso como veio; qualquer outra coisa -> UTC (NaT no que não converter)."""
+    if pd.api.types.is_datetime64_dtype(ts.dtype) and getattr(ts.dt, "tz", None) is None:
+        return ts
+    return pd.to_datetime(ts, utc=True, errors="coerce")
 
-    base = base_df[[by_key, time_col]].copy()
-    right = right_df[[by_key, time_col, value_col]].copy()
 
-    base[time_col] = pd.to_datetime(base[time_col], utc=True, errors="coerce")
-    right[time_col] = pd.to_datetime(right[time_col], utc=True, errors="coerce")
+def _time_order(by: pd.Series, ts: pd.Series) -> np.ndarray:
+    """Posições das linhas com peça e timestamp válidos em ordem de tempo (estável: empates na ordem de entrada)."""
+    pos = np.flatnonzero((by.notna() & ts.notna()).to_numpy())
+    return pos[np.argsort(ts.to_numpy()[pos], kind="stable")]
 
-    base = base.dropna(subset=[time_col])
-    right = right.dropna(subset=[time_col])
 
-    base_sorted = base.sort_values([by_key, time_col]).reset_index()  # guarda índice original
-    right_sorted = right.sort_values([by_key, time_col])
+def _asof_keys(order, by, ts, mask=None, by_key="id_peca", time_col="leitura_data_hora") -> pd.DataFrame:
+    """Chaves (peça, tempo, posição) do subconjunto `mask`, já em ordem de tempo (filtra `order`, sem reordenar)."""
+    sel = order if mask is None else order[mask[order]]
+    return pd.DataFrame({
+        by_key: by.to_numpy()[sel].astype("int64"),
+        time_col: ts.to_numpy()[sel],
+        "_pos": sel,
+    })
 
-    try:
-        merged = pd.merge_asof(
-            base_sorted,
-            right_sorted,
-            by=by_key,
-            on=time_col,
-            direction="backward",
-        )
-        out = merged.set_index("index")[value_col].reindex(base_df.index)
-        return out
-    except Exception:
-        out = pd.Series(index=base_df.index, dtype=float)
-        for pid, g in base.groupby(by_key):
-            g2 = g.sort_values(time_col).reset_index()  # "index" -> índice original
-            r2 = right[right[by_key] == pid].sort_values(time_col)
-            if r2.empty:
-                continue
-            m = pd.merge_asof(g2, r2, on=time_col, direction="backward")
-            out.loc[m["index"]] = m[value_col].values
-        return out.reindex(base_df.index)
+
+def _asof_values(left: pd.DataFrame, right: pd.DataFrame, values: np.ndarray, n: int,
+                 by_key="id_peca", time_col="leitura_data_hora") -> np.ndarray:
+    """values[linha de `right`] do último `right` <= cada `left` na mesma peça; NaN nas demais posições (0..n-1)."""
+    out = np.full(n, np.nan)
+    if len(left) and len(right):
+        r = right[[by_key, time_col]].assign(_v=values[right["_pos"].to_numpy()])
+        merged = pd.merge_asof(left, r, on=time_col, by=by_key, direction="backward")
+        out[merged["_pos"].to_numpy()] = merged["_v"].to_numpy()
+    return out
+
+
+def asof_fill(base_df, right_df, value_col, by_key="id_peca", time_col="leitura_data_hora"):
+    """
+    Último valor de `right_df` com timestamp <= o de cada linha de `base_df`, na mesma peça.
+    Um merge_asof sobre o frame inteiro (by=by_key); empates de timestamp no lado direito
+    ficam com a última linha na ordem de entrada. Retorna Série alinhada ao índice de base_df
+    (NaN sem valor anterior, sem peça ou sem timestamp).
+    """
+    t_base, t_right = _as_datetime(base_df[time_col]), _as_datetime(right_df[time_col])
+    if t_right.dtype != t_base.dtype:
+        t_base, t_right = (pd.to_datetime(t, utc=True, errors="coerce") for t in (t_base, t_right))
+        t_right = t_right.astype(t_base.dtype)
+    keys = lambda f, t: _asof_keys(_time_order(f[by_key], t), f[by_key], t, by_key=by_key, time_col=time_col)
+    vals = _asof_values(keys(base_df, t_base), keys(right_df, t_right),
+                        right_df[value_col].to_numpy(dtype=float), len(base_df), by_key, time_col)
+    return pd.Series(vals, index=base_df.index)
+
+
+def _is_sorted(frame: pd.DataFrame, cols) -> bool:
+    """`frame` já está em ordem lexicográfica de `cols` (sem nulos)? Checagem O(n), sem ordenar."""
+    arrs = [frame[c].to_numpy() for c in cols]
+    if len(frame) < 2:
+        return True
+    if any(pd.isna(a).any() for a in arrs):
+        return False            # posição dos nulos: deixa para o sort_values
+    ok = arrs[-1][1:] >= arrs[-1][:-1]
+    for a in reversed(arrs[:-1]):
+        ok = (a[1:] > a[:-1]) | ((a[1:] == a[:-1]) & ok)
+    return bool(ok.all())
+
+
+def sensor_type_masks(tipos: pd.Series):
+    """
+    Máscaras (temperatura, vibração) por linha: lower/contains só nas categorias distintas
+    do tipo de sensor, expandidas pelos códigos categóricos (sem varrer strings por linha).
+    """
+    cat = tipos.astype("category")
+    codes = cat.cat.codes.to_numpy()
+    norm = pd.Series(cat.cat.categories, dtype=object).str.lower()
+    masks = []
+    for termo in ("temper", "vibra"):
+        por_categoria = np.append(norm.str.contains(termo, na=False).to_numpy(dtype=bool), False)
+        masks.append(por_categoria[codes])      # código -1 (nulo) -> último elemento (False)
+    return masks
 
 
 def compute_usage_and_cycles_for_piece(base_piece: pd.DataFrame, cycles_piece: pd.DataFrame):
@@ -168,65 +206,77 @@ def compute_usage_and_cycles_for_piece(base_piece: pd.DataFrame, cycles_piece: p
     return pd.Series(tempo_uso, index=base_piece.index), pd.Series(ciclos, index=base_piece.index)
 
 
-def build_dataset(df: pd.DataFrame, cdf: pd.DataFrame, fdf: pd.DataFrame) -> pd.DataFrame:
-    """Monta dataset base e acrescenta falha_evento a partir da tabela FALHAS."""
-    df["sensor_tipo_norm"] = df["sensor_tipo"].str.lower()
-
-    # Base: linhas de temperatura (se não houver, usa vibração)
-    base = df[df["sensor_tipo_norm"].str.contains("temper", na=False)].copy()
-    if base.empty:
-        base = df[df["sensor_tipo_norm"].str.contains("vibra", na=False)].copy()
+def tag_failure_events(left: pd.DataFrame, fdf: pd.DataFrame, n: int, tol=pd.Timedelta("60s")) -> np.ndarray:
+    """
+    1 nas posições de `left` (chaves de _asof_keys) com evento de FALHAS da mesma peça a até
+    `tol` do timestamp: um merge_asof nearest sobre o frame inteiro.
+    """
+    hit = np.zeros(n, dtype=np.int64)
+    if fdf is None or fdf.empty or left.empty:
+        return hit
+    t_ev = _as_datetime(fdf["data"])
+    t_left = left["leitura_data_hora"]
+    if t_ev.dtype != t_left.dtype:
+        if getattr(t_ev.dt, "tz", None) is not None and getattr(t_left.dt, "tz", None) is None:
+            t_left = t_left.dt.tz_localize("UTC")
+            left = left.assign(leitura_data_hora=t_left)
+        t_ev = t_ev.astype(t_left.dtype)
+    eventos = _asof_keys(_time_order(fdf["id_peca"], t_ev), fdf["id_peca"], t_ev, time_col="falha_data")
+    m = pd.merge_asof(left, eventos.drop(columns="_pos"), left_on="leitura_data_hora", right_on="falha_data",
+                      by="id_peca", direction="nearest", tolerance=tol)
+    hit[m.loc[m["falha_data"].notna(), "_pos"].to_numpy()] = 1
+    return hit
 
-    # Séries por tipo para preencher colunas de features
-    temp = df[df["sensor_tipo_norm"].str.contains("temper", na=False)][
-        ["id_peca", "leitura_data_hora", "leitura_valor"]
-    ].rename(columns={"leitura_valor": "temperatura"})
-    vib = df[df["sensor_tipo_norm"].str.contains("vibra", na=False)][
-        ["id_peca", "leitura_data_hora", "leitura_valor"]
-    ].rename(columns={"leitura_valor": "vibracao"})
 
-    base["temperatura"] = asof_fill(base, temp, "temperatura")
-    base["vibracao"]    = asof_fill(base, vib,  "vibracao")
+def build_dataset(df: pd.DataFrame, cdf: pd.DataFrame, fdf: pd.DataFrame) -> pd.DataFrame:
+    """
+    Monta dataset base e acrescenta falha_evento a partir da tabela FALHAS.
+    Tipos de sensor como códigos categóricos; as junções as-of (temperatura, vibração,
+    falha mais próxima) são merge_asof únicos sobre o frame inteiro (by="id_peca"), todos
+    a partir de UMA ordenação por tempo das leituras.
+    """
+    is_temp, is_vib = sensor_type_masks(df["sensor_tipo"])
+    n = len(df)
 
-    base = base.sort_values(["id_peca", "leitura_data_hora"]).copy()
-    base["tempo_uso"] = 0.0
-    base["ciclos"]    = 0
+    # Base: linhas de temperatura (se não houver, usa vibração)
+    base_mask = is_temp if is_temp.any() else is_vib
+
+    # ordem temporal calculada uma vez; cada subconjunto só filtra essa ordem
+    by, ts = df["id_peca"], _as_datetime(df["leitura_data_hora"])
+    order = _time_order(by, ts)
+    left = _asof_keys(order, by, ts, base_mask)
+    temp = left if base_mask is is_temp else _asof_keys(order, by, ts, is_temp)
+    vib  = left if base_mask is is_vib else _asof_keys(order, by, ts, is_vib)
+    valores = df["leitura_valor"].to_numpy(dtype=float)
+
+    base = df.loc[base_mask, ["id_leitura", "id_sensor", "id_peca", "sensor_tipo", "leitura_data_hora"]]
+    base["temperatura"]  = _asof_values(left, temp, valores, n)[base_mask]
+    base["vibracao"]     = _asof_values(left, vib, valores, n)[base_mask]
+    # ---- falha_evento (1 se há falha real próximo ao timestamp; tolerância de 60s) ----
+    base["falha_evento"] = tag_failure_events(left, fdf, n)[base_mask]
+    del left, temp, vib
+
+    # load_data já entrega em (id_peca, data, id_leitura): só ordena se não estiver
+    ordem = ["id_peca", "leitura_data_hora", "id_leitura"]
+    out = base if _is_sorted(base, ordem) else base.sort_values(ordem)
+    out["tempo_uso"] = 0.0
+    out["ciclos"]    = 0
 
     if not cdf.empty:
-        for peca_id, grp in base.groupby("id_peca"):
-            ciclos_piece = cdf[cdf["id_peca"] == peca_id].copy()
+        for peca_id, grp in out.groupby("id_peca"):
+            ciclos_piece = cdf[cdf["id_peca"] == peca_id]
             tuso, cc = compute_usage_and_cycles_for_piece(grp, ciclos_piece)
-            base.loc[grp.index, "tempo_uso"] = tuso
-            base.loc[grp.index, "ciclos"]    = cc
+            out.loc[grp.index, "tempo_uso"] = tuso
+            out.loc[grp.index, "ciclos"]    = cc
 
-    out = base[
+    out = out[
         ["id_leitura","id_sensor","id_peca","sensor_tipo","leitura_data_hora",
-         "tempo_uso","ciclos","temperatura","vibracao"]
-    ].sort_values(["id_peca","leitura_data_hora","id_leitura"])
+         "tempo_uso","ciclos","temperatura","vibracao","falha_evento"]
+    ]
 
     out["tempo_uso"]   = out["tempo_uso"].round(2)
     out["temperatura"] = out["temperatura"].astype(float).round(2)
     out["vibracao"]    = out["vibracao"].astype(float).round(2)
-
-    # ---- falha_evento (1 se há falha real próximo ao timestamp) ----
-    out["falha_evento"] = 0
-    if fdf is not None and not fdf.empty:
-        tol = pd.Timedelta("60s")  # tolerância para casar exatamente o timestamp
-        for peca_id, grp in out.groupby("id_peca"):
-            eventos = fdf[fdf["id_peca"] == peca_id][["data"]].sort_values("data")
-            if eventos.empty:
-                continue
-            m = pd.merge_asof(
-                grp[["leitura_data_hora"]].sort_values("leitura_data_hora").reset_index(),
-                eventos.rename(columns={"data": "falha_data"}).sort_values("falha_data"),
-                left_on="leitura_data_hora",
-                right_on="falha_data",
-                direction="nearest",
-                tolerance=tol,
-            )
-            idx_hit = m.loc[m["falha_data"].notna(), "index"]
-            out.loc[idx_hit, "falha_evento"] = 1
-
     return out
 
 
@@ -291,6 +341,9 @@ def main():
     Path(os.path.dirname(OUTPUT_CSV)).mkdir(parents=True, exist_ok=True)
     out.to_csv(OUTPUT_CSV, index=False, encoding="utf-8")
     print(f"✅ CSV gerado em {OUTPUT_CSV} com {len(out)} linhas.")
+    # cópia colunar tipada (lida por app/ml via mmap, sem reparsear o CSV)
+    cols = write_columnar(out, OUTPUT_CSV)
+    print(f"   Cache colunar em {cols}")
     print("   Colunas:", ", ".join(out.columns))
 
 
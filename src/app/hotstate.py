@@ -0,0 +1,234 @@
+# app/hotstate.py
+"""
+Estado "quente" por sensor compartilhado entre os workers do gunicorn do mesmo nó.
+
+Um segmento multiprocessing.shared_memory guarda um array de registros de layout fixo,
+indexado pelo id do sensor (slot = id_sensor, 1..HOTSTATE_SLOTS-1):
+
+    seq        u8   seqlock (ímpar = escrita em andamento)
+    id_sensor  i8   0 = slot vazio
+    last_value f8   último valor
+    last_ts    f8   timestamp do último valor (epoch s)
+    streak     i8   leituras consecutivas >= limiar
+    count      i8   leituras vistas desde que o segmento foi criado
+    sum/sumsq  f8   agregados p/ média e desvio
+    min/max    f8
+    ewma       f8   média móvel exponencial (HOTSTATE_EWMA_ALPHA)
+
+Escrita: lock de faixa de bytes (fcntl.lockf) POR SLOT num arquivo de lock — writers de
+sensores diferentes nunca se bloqueiam. Leitura: sem lock, via seqlock (relê se o
+contador mudou ou está ímpar durante a cópia). O acesso por slot usa struct sobre o
+buffer compartilhado; a visão numpy (self.data) serve para varreduras vetorizadas.
+
+O segmento é criado pelo primeiro worker que subir; os demais apenas anexam.
+Vive até o reboot do nó ou até `python -m app.hotstate --unlink`.
+"""
+import fcntl
+import math
+import os
+import struct
+import tempfile
+import threading
+from datetime import timezone
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+
+MAGIC = 0x484F5453  # "HOTS"
+VERSION = 1
+HEADER = np.dtype([("magic", "<u4"), ("version", "<u4"), ("slots", "<u8"), ("_pad", "V48")])
+SLOT = np.dtype([
+    ("seq", "<u8"),
+    ("id_sensor", "<i8"),
+    ("last_value", "<f8"),
+    ("last_ts", "<f8"),
+    ("streak", "<i8"),
+    ("count", "<i8"),
+    ("sum", "<f8"),
+    ("sumsq", "<f8"),
+    ("min", "<f8"),
+    ("max", "<f8"),
+    ("ewma", "<f8"),
+])
+FIELDS = [n for n in SLOT.names if n != "seq"]
+# mesmo layout em struct: acesso por slot sem o overhead de campos numpy
+_REC = struct.Struct("<Qqddqqddddd")
+_SEQ = struct.Struct("<Q")
+_BODY = struct.Struct("<qddqqddddd")
+assert _REC.size == SLOT.itemsize
+
+
+class HotState:
+    def __init__(self, name: str, slots: int, ewma_alpha: float = 0.1, lock_dir: str = None):
+        self.name = name
+        self.slots = int(slots)
+        self.alpha = float(ewma_alpha)
+        size = HEADER.itemsize + SLOT.itemsize * self.slots
+
+        lock_dir = lock_dir or ("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir())
+        self._lock_fd = os.open(os.path.join(lock_dir, f"{name}.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+        # lockf é por processo: threads do mesmo worker precisam de um lock local também
+        self._tlocks = [threading.Lock() for _ in range(64)]
+
+        # criação/anexo serializados por um lock no byte logo após os slots
+        with self._locked(self.slots):
+            try:
+                self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+                created = True
+            except FileExistsError:
+                self._shm = shared_memory.SharedMemory(name=name, create=False)
+                created = False
+            # Python < 3.13 registra o segmento no resource_tracker de cada processo
+            # e o remove quando o processo sai; o segmento é do nó, não do worker.
+            try:
+                resource_tracker.unregister(self._shm._name, "shared_memory")
+            except Exception:
+                pass
+
+            self._header = np.ndarray((1,), dtype=HEADER, buffer=self._shm.buf)
+            if created:
+                self._header["magic"] = MAGIC
+                self._header["version"] = VERSION
+                self._header["slots"] = self.slots
+            elif (int(self._header["magic"][0]) != MAGIC or int(self._header["version"][0]) != VERSION
+                  or int(self._header["slots"][0]) != self.slots):
+                raise RuntimeError(
+                    f"segmento {name} com layout diferente (slots={int(self._header['slots'][0])}); "
+                    f"remova com `python -m app.hotstate --unlink`"
+                )
+        self.data = np.ndarray((self.slots,), dtype=SLOT, buffer=self._shm.buf, offset=HEADER.itemsize)
+
+    # ---------------- locks ----------------
+    class _Lock:
+        def __init__(self, fd, tlock, idx):
+            self.fd, self.tlock, self.idx = fd, tlock, idx
+
+        def __enter__(self):
+            self.tlock.acquire()
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, 1, self.idx, os.SEEK_SET)
+
+        def __exit__(self, *exc):
+            fcntl.lockf(self.fd, fcntl.LOCK_UN, 1, self.idx, os.SEEK_SET)
+            self.tlock.release()
+
+    def _locked(self, idx: int):
+        return HotState._Lock(self._lock_fd, self._tlocks[idx % len(self._tlocks)], idx)
+
+    def slot_for(self, id_sensor: int):
+        id_sensor = int(id_sensor)
+        return id_sensor if 0 < id_sensor < self.slots else None
+
+    # ---------------- escrita ----------------
+    def update(self, id_sensor: int, value: float, ts: float, threshold: float = math.inf) -> bool:
+        """Registra uma leitura. Retorna False se o sensor não cabe no segmento."""
+        idx = self.slot_for(id_sensor)
+        if idx is None:
+            return False
+        value = float(value)
+        buf, off = self._shm.buf, HEADER.itemsize + idx * SLOT.itemsize
+        with self._locked(idx):
+            (seq, sid, last_v, last_ts, streak, count, sm, sq, mn, mx, ewma) = _REC.unpack_from(buf, off)
+            _SEQ.pack_into(buf, off, seq + 1)        # ímpar: leitores esperam
+            if sid != id_sensor:
+                sid, last_v, last_ts, streak, count = id_sensor, value, -math.inf, 0, 0
+                sm = sq = 0.0
+                mn, mx, ewma = math.inf, -math.inf, value
+            if ts >= last_ts:
+                last_v, last_ts = value, ts
+            streak = streak + 1 if value >= threshold else 0
+            count += 1
+            sm += value
+            sq += value * value
+            mn = min(mn, value)
+            mx = max(mx, value)
+            ewma = self.alpha * value + (1.0 - self.alpha) * ewma
+            # campos primeiro, seq (par) por último: consistente para os leitores
+            _BODY.pack_into(buf, off + _SEQ.size, sid, last_v, last_ts, streak, count, sm, sq, mn, mx, ewma)
+            _SEQ.pack_into(buf, off, seq + 2)
+        return True
+
+    # ---------------- leitura ----------------
+    def read(self, id_sensor: int, retries: int = 100):
+        """Cópia consistente do slot (seqlock) ou None se vazio/fora da faixa."""
+        idx = self.slot_for(id_sensor)
+        if idx is None:
+            return None
+        buf, off = self._shm.buf, HEADER.itemsize + idx * SLOT.itemsize
+        for _ in range(retries):
+            rec = _REC.unpack_from(buf, off)
+            if not rec[0] & 1 and _SEQ.unpack_from(buf, off)[0] == rec[0]:
+                break
+        else:
+            with self._locked(idx):
+                rec = _REC.unpack_from(buf, off)
+        if rec[1] != int(id_sensor):
+            return None
+        return self._as_dict(rec)
+
+    def snapshot(self) -> list:
+        """Todos os slots ocupados (varredura vetorizada dos ids + leitura validada por slot)."""
+        ocupados = np.nonzero(self.data["id_sensor"] > 0)[0]
+        out = []
+        for idx in ocupados:
+            d = self.read(int(self.data["id_sensor"][idx]))
+            if d is not None:
+                out.append(d)
+        return out
+
+    @staticmethod
+    def _as_dict(rec) -> dict:
+        d = dict(zip(FIELDS, rec[1:]))
+        n = d["count"]
+        d["mean"] = d["sum"] / n if n else None
+        d["std"] = math.sqrt(max(0.0, d["sumsq"] / n - d["mean"] ** 2)) if n else None
+        return d
+
+    def close(self):
+        self._shm.close()
+        os.close(self._lock_fd)
+
+    def unlink(self):
+        # o registro no resource_tracker foi desfeito no __init__; unlink() espera encontrá-lo
+        resource_tracker.register(self._shm._name, "shared_memory")
+        self._shm.unlink()
+
+
+# ---------------- integração com o Flask ----------------
+_instance = None
+
+
+def get_hotstate(app):
+    """Anexa (lazy, 1x por processo) ao segmento configurado. None se desligado."""
+    global _instance
+    cfg = app.config
+    if not cfg.get("HOTSTATE_ENABLED"):
+        return None
+    if _instance is None:
+        _instance = HotState(cfg["HOTSTATE_NAME"], cfg["HOTSTATE_SLOTS"], cfg["HOTSTATE_EWMA_ALPHA"])
+    return _instance
+
+
+def epoch(dt) -> float:
+    """DATETIME sem fuso é tratado como UTC (mesma convenção do banco)."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def main():
+    import argparse
+    from .config import Config
+    ap = argparse.ArgumentParser(description="Inspeciona/remove o segmento de estado quente.")
+    ap.add_argument("--unlink", action="store_true", help="remove o segmento do nó")
+    args = ap.parse_args()
+    hs = HotState(Config.HOTSTATE_NAME, Config.HOTSTATE_SLOTS, Config.HOTSTATE_EWMA_ALPHA)
+    if args.unlink:
+        hs.unlink()
+        print(f"[hotstate] segmento {hs.name} removido.")
+        return
+    for d in hs.snapshot():
+        print(d)
+
+
+if __name__ == "__main__":
+    main()
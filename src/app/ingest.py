@@ -0,0 +1,92 @@
+# app/ingest.py
+"""
+Escrita em lote de leituras via SQLAlchemy Core (compartilhada pelos caminhos de ingestão).
+
+- insert_readings: executemany + estatísticas por sensor + histogramas de drift +
+                   sketches de quantis (gateway assíncrono, cargas em massa)
+- ingest_batch:    insert_readings + motor de alertas + estado quente, dentro do app Flask
+                   (/api/readings, listener UDP/TCP)
+"""
+from datetime import timezone
+from flask import current_app
+from sqlalchemy import insert
+from .extensions import db
+from .models import Leitura, Sensor
+from .drift import bump_histograms
+from .quantiles import bump_sketches
+from .stats import bump_stats
+
+LEITURAS = Leitura.__table__
+
+
+def naive_utc(ts):
+    """DATETIME do banco é sem fuso: converte para UTC e remove o tzinfo."""
+    if ts is not None and ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def reading_row(payload: dict) -> dict:
+    """Payload já validado (ReadingInSchema) -> linha de LEITURAS_SENSOR."""
+    return {
+        "id_sensor": payload["id_sensor"],
+        "leitura_valor": payload["leitura_valor"],
+        "leitura_data_hora": naive_utc(payload["leitura_data_hora"]),
+    }
+
+
+def insert_readings(conn, rows: list) -> int:
+    """executemany de um lote de linhas (dicts id_sensor/leitura_valor/leitura_data_hora)."""
+    if not rows:
+        return 0
+    conn.execute(insert(LEITURAS), rows)
+    _bookkeeping(conn, rows)
+    return len(rows)
+
+
+def _bookkeeping(conn, rows: list) -> None:
+    """Tabelas derivadas atualizadas na mesma transação das leituras."""
+    bump_stats(conn, rows)
+    bump_histograms(conn, rows)
+    bump_sketches(conn, rows)
+
+
+def ingest_batch(rows: list, *, alerts: bool = True) -> tuple:
+    """
+    Insere o lote na transação da sessão, passa as excedências pelo motor de alertas
+    (em ordem de timestamp) e comita. Depois do commit atualiza o estado quente.
+    Retorna (id_leitura do único registro ou None, [incidentes afetados]).
+    """
+    from .alerting import register_exceedance, threshold_for
+    from .hotstate import get_hotstate, epoch
+
+    if not rows:
+        return None, []
+    id_leitura = None
+    if len(rows) == 1:
+        id_leitura = db.session.execute(insert(LEITURAS), rows[0]).inserted_primary_key[0]
+        _bookkeeping(db.session.connection(), rows)
+    else:
+        insert_readings(db.session.connection(), rows)
+
+    ids = {r["id_sensor"] for r in rows}
+    sensores = {s.id_sensor: s for s in db.session.query(Sensor).filter(Sensor.id_sensor.in_(ids))}
+    alertas = []
+    if alerts:
+        for r in sorted(rows, key=lambda r: r["leitura_data_hora"]):
+            sensor = sensores.get(r["id_sensor"])
+            if sensor is None:
+                continue
+            info = register_exceedance(sensor, r["leitura_valor"], r["leitura_data_hora"])
+            if info:
+                alertas.append(info)
+    db.session.commit()
+
+    hot = get_hotstate(current_app)
+    if hot is not None:
+        for r in rows:
+            sensor = sensores.get(r["id_sensor"])
+            if sensor is not None:
+                hot.update(sensor.id_sensor, r["leitura_valor"], epoch(r["leitura_data_hora"]),
+                           threshold_for(sensor.tipo_sensor))
+    return id_leitura, alertas
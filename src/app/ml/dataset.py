@@ -0,0 +1,174 @@
+# app/ml/dataset.py
+"""
+Cache colunar do dataset de treino (sensores.csv -> sensores.cols/).
+
+    sensores.cols/
+        meta.json            linhas, tipos, categorias e a "impressão digital" do CSV de origem
+        <coluna>.npy         um array por coluna (np.save)
+
+- números: float64/int64/bool como vieram
+- datas: int64 (view do datetime64, unidade guardada no meta)
+- textos (sensor_tipo, risco_falha, ...): códigos int16/int32 + lista de categorias
+  (-1 = nulo) -> pd.Categorical na leitura, sem materializar strings
+
+write_columnar é chamado por app.generate_csv logo após gravar o CSV.
+load_table abre os .npy com mmap_mode="r" (só as colunas pedidas são lidas do disco)
+e volta ao pd.read_csv quando o cache está velho: tamanho/mtime do CSV diferentes E
+sha256 diferente (um `touch` ou cópia com o mesmo conteúdo não invalida o cache).
+Depois de um fallback o cache é regravado, então só a primeira execução paga o parse.
+
+Ambiente (opcional):
+    ML_COLUMNAR=0        ignora o cache (sempre CSV)
+"""
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+FORMAT_VERSION = 1
+META = "meta.json"
+DATE_COLS = ("leitura_data_hora",)
+
+
+def cache_dir(csv_path) -> Path:
+    p = Path(csv_path)
+    return p.with_suffix(".cols")
+
+
+def _fingerprint(csv_path, with_hash: bool = True) -> dict:
+    st = os.stat(csv_path)
+    fp = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    if with_hash:
+        fp["sha256"] = _sha256(csv_path)
+    return fp
+
+
+def _sha256(path, chunk: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _encode(s: pd.Series):
+    """Série -> (array para np.save, descrição da coluna no meta)."""
+    if pd.api.types.is_datetime64_any_dtype(s.dtype):
+        if getattr(s.dt, "tz", None) is not None:
+            s = s.dt.tz_convert("UTC").dt.tz_localize(None)
+        arr = s.to_numpy()
+        return arr.view("int64"), {"kind": "datetime", "dtype": str(arr.dtype)}
+    if pd.api.types.is_bool_dtype(s.dtype) and not pd.api.types.is_extension_array_dtype(s.dtype):
+        return s.to_numpy(), {"kind": "bool", "dtype": "bool"}
+    if pd.api.types.is_numeric_dtype(s.dtype):
+        if pd.api.types.is_extension_array_dtype(s.dtype):   # Int64/Float64 anuláveis
+            arr = s.to_numpy(dtype="float64", na_value=np.nan)
+        else:
+            arr = s.to_numpy()
+        return arr, {"kind": "number", "dtype": str(arr.dtype)}
+    cat = s.astype("category")
+    categories = [str(c) for c in cat.cat.categories]
+    codes = cat.cat.codes.to_numpy()
+    codes = codes.astype(np.int16 if len(categories) < 2 ** 15 else np.int32)
+    return codes, {"kind": "category", "dtype": str(codes.dtype), "categories": categories}
+
+
+def _decode(arr: np.ndarray, info: dict):
+    kind = info["kind"]
+    if kind == "datetime":
+        return arr.view(info["dtype"])
+    if kind == "category":
+        return pd.Categorical.from_codes(arr, categories=info["categories"])
+    return arr
+
+
+def write_columnar(df: pd.DataFrame, csv_path) -> Path:
+    """Grava o cache de `df` (o mesmo conteúdo que acabou de ir para `csv_path`)."""
+    out = cache_dir(csv_path)
+    tmp = out.with_name(out.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    columns = {}
+    for col in df.columns:
+        arr, info = _encode(df[col])
+        np.save(tmp / f"{col}.npy", np.ascontiguousarray(arr), allow_pickle=False)
+        columns[col] = info
+    meta = {
+        "version": FORMAT_VERSION,
+        "rows": int(len(df)),
+        "source": _fingerprint(csv_path),
+        "columns": columns,
+    }
+    (tmp / META).write_text(json.dumps(meta, ensure_ascii=False, indent=1), encoding="utf-8")
+
+    # troca o diretório de uma vez: leitores veem o cache antigo inteiro ou o novo inteiro
+    old = out.with_name(out.name + ".old")
+    shutil.rmtree(old, ignore_errors=True)
+    if out.exists():
+        os.replace(out, old)
+    os.replace(tmp, out)
+    shutil.rmtree(old, ignore_errors=True)
+    return out
+
+
+def _fresh_meta(csv_path):
+    """meta.json do cache se ele corresponde ao CSV atual; senão None."""
+    meta_path = cache_dir(csv_path) / META
+    if not meta_path.exists() or not os.path.exists(csv_path):
+        return None
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    except ValueError:
+        return None
+    if meta.get("version") != FORMAT_VERSION:
+        return None
+    src = meta.get("source", {})
+    cur = _fingerprint(csv_path, with_hash=False)
+    if src.get("size") == cur["size"] and src.get("mtime_ns") == cur["mtime_ns"]:
+        return meta
+    if src.get("size") != cur["size"]:
+        return None
+    # mesmo tamanho, mtime diferente: decide pelo conteúdo e registra o novo mtime
+    if src.get("sha256") != _sha256(csv_path):
+        return None
+    meta["source"]["mtime_ns"] = cur["mtime_ns"]
+    try:
+        meta_path.write_text(json.dumps(meta, ensure_ascii=False, indent=1), encoding="utf-8")
+    except OSError:
+        pass
+    return meta
+
+
+def load_table(csv_path, columns=None, parse_dates=DATE_COLS, tag: str = "dados") -> pd.DataFrame:
+    """
+    DataFrame com `columns` (todas se None; as ausentes são ignoradas, como no CSV).
+    Usa o cache colunar mapeado em memória quando ele está em dia com o CSV.
+    """
+    use_cache = os.getenv("ML_COLUMNAR", "1") != "0"
+    meta = _fresh_meta(csv_path) if use_cache else None
+    if meta is not None:
+        base = cache_dir(csv_path)
+        wanted = [c for c in (columns or meta["columns"]) if c in meta["columns"]]
+        data = {}
+        for col in wanted:
+            arr = np.load(base / f"{col}.npy", mmap_mode="r", allow_pickle=False)
+            data[col] = _decode(arr, meta["columns"][col])
+        print(f"[{tag}] cache colunar {base} ({meta['rows']} linhas, {len(wanted)} colunas)")
+        return pd.DataFrame(data, columns=wanted)
+
+    header = pd.read_csv(csv_path, nrows=0).columns
+    df = pd.read_csv(csv_path, parse_dates=[c for c in parse_dates if c in header])
+    if use_cache:
+        try:
+            write_columnar(df, csv_path)
+            print(f"[{tag}] cache colunar regravado em {cache_dir(csv_path)}")
+        except OSError as e:
+            print(f"[{tag}] não foi possível gravar o cache colunar: {e}")
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    return df
@@ -1,116 +1,121 @@
 """
-Previsão de falha em horizonte fixo (próximas 24h)
-- Lê app/app/database/sensores.csv (ou caminho em CSV_PATH)
+Previsão de falha em horizonte fixo (próximas 24h) e em vários horizontes de uma vez
+- Lê app/app/database/sensores.csv (ou caminho em CSV_PATH), via cache colunar
+  sensores.cols/ quando ele está em dia (ver app/ml/dataset.py)
 - Usa eventos reais de FALHAS (coluna falha_evento) como rótulo base
-- Cria rótulo binário: há falha nos próximos HORIZON_H?
-- Gera features de janelas, treina GradientBoosting, avalia e salva o modelo
+- Cria rótulos binários: há falha nas próximas h horas? — todos os HORIZONS numa passada
+  vetorizada sobre as falhas ordenadas (label_horizons)
+- Gera features de janelas (uma vez), treina um GradientBoosting por horizonte, avalia e salva
+  o modelo de HORIZON_H (modelo_falha_24h.joblib) e o bundle de todos os horizontes
+  (modelo_falha_horizontes.joblib, servido por /api/predict/failure?horizons=...)
+- TRAIN_MODE=scalable: HistGradientBoosting com parada antecipada, busca de parâmetros
+  em dobras temporais num pool de processos e features float32 (ver app/ml/training.py)
 
 Como rodar (dentro do container):
-    docker compose exec web python -m app.ml.failure_predict_24_hours
+    docker compose exec web python -m app.ml.failure_predict_24_hours [--no-plots] [--mode scalable]
+
+Como biblioteca:
+    from app.ml.failure_predict_24_hours import train
+    artefatos = train(TrainConfig(plots=False))      # ou train(cfg, data=df já carregado)
 
 Ambiente (opcional):
     CSV_PATH=/app/app/database/sensores.csv
     MODEL_DIR=/app/app/ml
     ASSETS_DIR=/app/assets
     HORIZON_H=24
+    HORIZONS=1,6,24,72
+    TRAIN_MODE=classic|scalable, TRAIN_JOBS, CV_SPLITS, VAL_FRACTION
 """
 
-import os
-from pathlib import Path
+import argparse
 import numpy as np
 import pandas as pd
 import joblib
 
-# Matplotlib headless
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-
 from sklearn.metrics import (
     classification_report,
     confusion_matrix,
     roc_auc_score,
-    roc_curve,
 )
-from sklearn.ensemble import GradientBoostingClassifier
-
-# ---------------- Config ----------------
-def _resolve_csv() -> str:
-    env = os.getenv("CSV_PATH")
-    if env:
-        return env
-    here = Path(__file__).resolve()
-    candidates = [
-        Path("/app/app/database/sensores.csv"),                # container
-        here.parents[1] / "database" / "sensores.csv",         # app/database
-        Path.cwd() / "app" / "database" / "sensores.csv",      # se cwd=/app
-        Path.cwd() / "src" / "app" / "database" / "sensores.csv",
-    ]
-    for p in candidates:
-        if p.exists():
-            return str(p)
-    # fallback padrão no container
-    return "/app/app/database/sensores.csv"
-
-CSV_PATH  = Path(_resolve_csv())
-ASSETS_DIR = Path(os.getenv("ASSETS_DIR", "/app/assets"))
-MODEL_DIR  = Path(os.getenv("MODEL_DIR", "/app/app/ml"))
-
-ASSETS_DIR.mkdir(parents=True, exist_ok=True)
-MODEL_DIR.mkdir(parents=True, exist_ok=True)
-
-HORIZON_H   = int(os.getenv("HORIZON_H", "24"))
-RANDOM_SEED = 42
-
-# -------------- Load ---------------
-print(f"[train] Lendo CSV: {CSV_PATH}")
-df = pd.read_csv(CSV_PATH, parse_dates=["leitura_data_hora"])
-
-required_cols = {
+from sklearn.base import clone
+from sklearn.ensemble import GradientBoostingClassifier, HistGradientBoostingClassifier
+
+from .dataset import load_table
+from .training import (
+    StageTimer, TrainConfig, fit_with_early_stopping, parse_horizons, save_drift_reference, time_series_search,
+    write_meta,
+)
+
+TAG = "train"
+MODEL_FILE = "modelo_falha_24h.joblib"
+BUNDLE_FILE = "modelo_falha_horizontes.joblib"
+REQUIRED = {
     "id_peca", "leitura_data_hora",
     "tempo_uso", "ciclos", "temperatura", "vibracao",
     "falha_evento"
 }
-missing = required_cols - set(df.columns)
-if missing:
-    raise RuntimeError(
-        f"CSV sem colunas obrigatórias: {missing}. "
-        "Gere o CSV novamente com `docker compose exec web python -m app.generate_csv`."
+FEATURE_COLS = [
+    "tempo_uso","ciclos","temperatura","vibracao",
+    "temp_mean_3","vib_mean_3","temp_std_3","vib_std_3","ciclos_delta_3","uso_delta_3",
+    "temp_mean_6","vib_mean_6","temp_std_6","vib_std_6","ciclos_delta_6","uso_delta_6",
+    "temp_mean_12","vib_mean_12","temp_std_12","vib_std_12","ciclos_delta_12","uso_delta_12",
+]
+
+# modo escalável: grade pequena (cada combinação x CV_SPLITS dobras em paralelo)
+HGB_GRID = {
+    "learning_rate": [0.05, 0.1],
+    "max_leaf_nodes": [15, 31],
+    "l2_regularization": [0.0, 1.0],
+}
+
+
+def hgb_template(seed: int) -> HistGradientBoostingClassifier:
+    return HistGradientBoostingClassifier(
+        max_iter=500, early_stopping=True, n_iter_no_change=20, random_state=seed
+    )
+
+
+# -------------- Rótulos: falha nas próximas h horas, para vários h --------------
+def label_col(hours: int) -> str:
+    return f"fail_next_{hours}h"
+
+
+def horizons_of(cfg: TrainConfig) -> tuple:
+    """Horizontes treinados juntos: cfg.horizons + o principal (HORIZON_H), que vai primeiro."""
+    return (cfg.horizon_h,) + tuple(h for h in cfg.horizons if h != cfg.horizon_h)
+
+
+def label_horizons(df: pd.DataFrame, horizons) -> pd.DataFrame:
+    """
+    Rótulos de todos os `horizons` numa passada só, alinhados ao índice de `df`.
+
+    Regra (a mesma do laço original): falha da mesma peça com 0 < int(horas até ela) <= h,
+    i.e. no intervalo [t + 1h, t + (h+1)h). Um merge_asof "forward" por peça sobre as falhas
+    ordenadas acha, para cada leitura, a 1ª falha a partir de t + 1h; cada horizonte vira
+    só uma comparação com essa distância.
+    """
+    um = pd.Timedelta(hours=1)
+    t = df["leitura_data_hora"]
+    q = pd.DataFrame({"id_peca": df["id_peca"].to_numpy(), "alvo": (t + um).to_numpy(),
+                      "pos": np.arange(len(df))}).sort_values("alvo", kind="stable")
+    f = (df.loc[df["falha_evento"] == 1, ["id_peca", "leitura_data_hora"]]
+         .rename(columns={"leitura_data_hora": "falha"}).sort_values("falha", kind="stable"))
+    m = pd.merge_asof(q, f, left_on="alvo", right_on="falha", by="id_peca", direction="forward")
+
+    dt = np.empty(len(df), dtype="timedelta64[ns]")
+    dt[m["pos"].to_numpy()] = (m["falha"] - m["alvo"] + um).to_numpy(dtype="timedelta64[ns]")
+    has = ~np.isnat(dt)
+    return pd.DataFrame(
+        {label_col(h): (has & (dt < np.timedelta64(h + 1, "h"))).astype(int) for h in horizons},
+        index=df.index,
     )
 
-# ordenação canônica
-df = df.sort_values(["id_peca", "leitura_data_hora"]).reset_index(drop=True)
 
-# -------------- Rótulo: falha nas próximas HORIZON_H horas --------------
 def label_next_horizon(piece_df: pd.DataFrame, hours: int = 24) -> pd.DataFrame:
     g = piece_df.sort_values("leitura_data_hora").copy()
-    times = g["leitura_data_hora"].to_numpy()
-    fail_times = g.loc[g["falha_evento"] == 1, "leitura_data_hora"].to_numpy()
-
-    has_fail_next = np.zeros(len(g), dtype=int)
-    if len(fail_times) > 0:
-        j = 0
-        for i, t in enumerate(times):
-            while j < len(fail_times) and fail_times[j] < t:
-                j += 1
-            k = j
-            while k < len(fail_times):
-                # diferença em horas (inteiro)
-                dt_h = int(((fail_times[k] - t) / np.timedelta64(1, "h")))
-                if dt_h <= hours:
-                    if dt_h > 0:
-                        has_fail_next[i] = 1
-                        break
-                    k += 1
-                else:
-                    break
-    g["fail_next_h"] = has_fail_next
+    g["fail_next_h"] = label_horizons(g, [hours])[label_col(hours)]
     return g
 
-pieces = []
-for pid, g in df.groupby("id_peca", sort=False):
-    pieces.append(label_next_horizon(g, hours=HORIZON_H))
-df_labeled = pd.concat(pieces, ignore_index=True)
 
 # -------------- Features de janelas --------------
 def add_window_features(piece_df: pd.DataFrame) -> pd.DataFrame:
@@ -126,108 +131,247 @@ def add_window_features(piece_df: pd.DataFrame) -> pd.DataFrame:
         g[f"uso_delta_{w}"]    = g["tempo_uso"].diff(w).fillna(0)
     return g
 
-feat_pieces = []
-for pid, g in df_labeled.groupby("id_peca", sort=False):
-    feat_pieces.append(add_window_features(g))
-df_feat = pd.concat(feat_pieces, ignore_index=True)
 
-# -------------- Limpeza / imputação de segurança --------------
-feature_cols = [
-    "tempo_uso","ciclos","temperatura","vibracao",
-    "temp_mean_3","vib_mean_3","temp_std_3","vib_std_3","ciclos_delta_3","uso_delta_3",
-    "temp_mean_6","vib_mean_6","temp_std_6","vib_std_6","ciclos_delta_6","uso_delta_6",
-    "temp_mean_12","vib_mean_12","temp_std_12","vib_std_12","ciclos_delta_12","uso_delta_12",
-]
+def prepare(df: pd.DataFrame, cfg: TrainConfig, timer: StageTimer = None) -> pd.DataFrame:
+    """
+    Leituras ordenadas por (id_peca, data) -> rótulos (fail_next_<h>h de cada horizonte e
+    fail_next_h = HORIZON_H) + features limpas, em ordem temporal.
+    """
+    timer = timer or StageTimer(TAG)
+    df_labeled = df.join(label_horizons(df, horizons_of(cfg))).reset_index(drop=True)
+    df_labeled["fail_next_h"] = df_labeled[label_col(cfg.horizon_h)]
+    timer.lap("rótulo")
+
+    feat_pieces = []
+    for pid, g in df_labeled.groupby("id_peca", sort=False):
+        feat_pieces.append(add_window_features(g))
+    df_feat = pd.concat(feat_pieces, ignore_index=True)
+    timer.lap("features de janela")
+
+    # ffill/bfill por peça para temp/vib (se necessário)
+    df_feat["temperatura"] = df_feat.groupby("id_peca")["temperatura"].ffill().bfill()
+    df_feat["vibracao"]    = df_feat.groupby("id_peca")["vibracao"].ffill().bfill()
+
+    # fallback global e sanitização (float32 no modo escalável: metade da memória)
+    dtype = np.float32 if cfg.scalable else float
+    for col in FEATURE_COLS:
+        med = df_feat[col].median() if col in df_feat and not df_feat[col].dropna().empty else 0.0
+        df_feat[col] = df_feat[col].fillna(med).replace([np.inf, -np.inf], 0.0).astype(dtype)
+
+    return df_feat.sort_values("leitura_data_hora").reset_index(drop=True)
+
+
+def _plots(cfg: TrainConfig, h: int, y_test, y_pred, y_prob, auc) -> list:
+    # Matplotlib headless, importado só quando há gráficos a gerar
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from sklearn.metrics import roc_curve
+
+    saved = []
+    cm = confusion_matrix(y_test, y_pred, labels=[0, 1])
+    plt.figure(figsize=(5, 4))
+    plt.imshow(cm, interpolation="nearest")
+    plt.title(f"Matriz de Confusão - Falha próximas {h}h")
+    plt.colorbar()
+    plt.xticks([0, 1], ["Sem falha", "Falha"], rotation=45)
+    plt.yticks([0, 1], ["Sem falha", "Falha"])
+    plt.ylabel("Real")
+    plt.xlabel("Previsto")
+    plt.tight_layout()
+    path = cfg.assets_dir / f"matriz_confusao_falha_{h}h.png"
+    plt.savefig(path, dpi=140)
+    plt.close()
+    saved.append(path)
+
+    if auc is not None:
+        try:
+            fpr, tpr, _ = roc_curve(y_test, y_prob)
+            plt.figure(figsize=(5, 4))
+            plt.plot(fpr, tpr, label=f"AUC={auc:.3f}")
+            plt.plot([0, 1], [0, 1], linestyle="--")
+            plt.xlabel("FPR")
+            plt.ylabel("TPR")
+            plt.title(f"ROC - Falha próximas {h}h")
+            plt.legend(loc="lower right")
+            plt.tight_layout()
+            path = cfg.assets_dir / f"roc_falha_{h}h.png"
+            plt.savefig(path, dpi=140)
+            plt.close()
+            saved.append(path)
+        except Exception:
+            pass
+    return saved
+
+
+def _fit(cfg: TrainConfig, X_train, y_train, params=None, timer: StageTimer = None):
+    """Ajusta um classificador; no modo escalável só busca parâmetros se `params` for None."""
+    if not cfg.scalable:
+        return GradientBoostingClassifier(random_state=cfg.seed).fit(X_train, y_train), None
+    template = hgb_template(cfg.seed)
+    if params is None:
+        params, _ = time_series_search(template, HGB_GRID, X_train, y_train, scoring="roc_auc",
+                                       n_splits=cfg.cv_splits, n_jobs=cfg.jobs)
+        if timer:
+            timer.lap("busca (TimeSeriesSplit)")
+    clf = fit_with_early_stopping(clone(template).set_params(**params), X_train, y_train,
+                                  cfg.val_fraction)
+    print(f"[{TAG}] HGB: {params} | iterações={clf.n_iter_}")
+    return clf, params
+
+
+def _evaluate(cfg: TrainConfig, h: int, clf, X_test, y_test) -> dict:
+    has_proba = hasattr(clf, "predict_proba")
+    if has_proba and len(X_test) > 0:
+        y_prob = clf.predict_proba(X_test)[:, 1]
+    else:
+        # fallback via decisão -> sigmoid
+        raw = clf.decision_function(X_test) if hasattr(clf, "decision_function") else clf.predict(X_test)
+        y_prob = 1 / (1 + np.exp(-np.array(raw, dtype=float)))
+
+    y_pred = (y_prob >= 0.5).astype(int)
+
+    print("\n=== Classification Report (Falha próximas {}h) ===".format(h))
+    print(classification_report(y_test, y_pred, digits=4))
 
-# ffill/bfill por peça para temp/vib (se necessário)
-df_feat["temperatura"] = df_feat.groupby("id_peca")["temperatura"].ffill().bfill()
-df_feat["vibracao"]    = df_feat.groupby("id_peca")["vibracao"].ffill().bfill()
-
-# fallback global e sanitização
-for col in feature_cols:
-    med = df_feat[col].median() if col in df_feat and not df_feat[col].dropna().empty else 0.0
-    df_feat[col] = df_feat[col].fillna(med).replace([np.inf, -np.inf], 0.0).astype(float)
-
-df_feat = df_feat.sort_values("leitura_data_hora").reset_index(drop=True)
-
-# -------------- Split temporal --------------
-y = df_feat["fail_next_h"].astype(int)
-if y.nunique() < 2:
-    pos = int(y.sum())
-    neg = int((y == 0).sum())
-    print(f"  Dataset sem diversidade de classes (positivos={pos}, negativos={neg}).")
-    print("   Gere alguns eventos de FALHA (tabela FALHAS) e gere o CSV novamente (app.generate_csv).")
-    raise SystemExit(2)
-
-cut_idx = int(len(df_feat) * 0.7) if len(df_feat) > 2 else len(df_feat)
-train = df_feat.iloc[:cut_idx]
-test  = df_feat.iloc[cut_idx:] if cut_idx < len(df_feat) else df_feat.iloc[-1:]
-
-X_train, y_train = train[feature_cols], train["fail_next_h"].astype(int)
-X_test,  y_test  = test[feature_cols],  test["fail_next_h"].astype(int)
-
-if y_train.nunique() < 2:
-    pos = int(y_train.sum()); neg = int((y_train == 0).sum())
-    print(f"⚠️  Treino sem diversidade de classes (positivos={pos}, negativos={neg}).")
-    raise SystemExit(2)
-
-# -------------- Modelo --------------
-clf = GradientBoostingClassifier(random_state=RANDOM_SEED)
-clf.fit(X_train, y_train)
-
-# -------------- Avaliação --------------
-has_proba = hasattr(clf, "predict_proba")
-if has_proba and len(X_test) > 0:
-    y_prob = clf.predict_proba(X_test)[:, 1]
-else:
-    # fallback via decisão -> sigmoid
-    raw = clf.decision_function(X_test) if hasattr(clf, "decision_function") else clf.predict(X_test)
-    y_prob = 1 / (1 + np.exp(-np.array(raw, dtype=float)))
-
-y_pred = (y_prob >= 0.5).astype(int)
-
-print("\n=== Classification Report (Falha próximas {}h) ===".format(HORIZON_H))
-print(classification_report(y_test, y_pred, digits=4))
-
-try:
-    auc = roc_auc_score(y_test, y_prob)
-    print(f"ROC-AUC: {auc:.4f}")
-except Exception:
-    auc = None
-    print("ROC-AUC não pôde ser calculado (talvez apenas uma classe no conjunto de teste).")
-
-cm = confusion_matrix(y_test, y_pred, labels=[0, 1])
-plt.figure(figsize=(5, 4))
-plt.imshow(cm, interpolation="nearest")
-plt.title(f"Matriz de Confusão - Falha próximas {HORIZON_H}h")
-plt.colorbar()
-plt.xticks([0, 1], ["Sem falha", "Falha"], rotation=45)
-plt.yticks([0, 1], ["Sem falha", "Falha"])
-plt.ylabel("Real")
-plt.xlabel("Previsto")
-plt.tight_layout()
-plt.savefig(ASSETS_DIR / f"matriz_confusao_falha_{HORIZON_H}h.png", dpi=140)
-plt.close()
-
-if auc is not None:
     try:
-        fpr, tpr, _ = roc_curve(y_test, y_prob)
-        plt.figure(figsize=(5, 4))
-        plt.plot(fpr, tpr, label=f"AUC={auc:.3f}")
-        plt.plot([0, 1], [0, 1], linestyle="--")
-        plt.xlabel("FPR")
-        plt.ylabel("TPR")
-        plt.title(f"ROC - Falha próximas {HORIZON_H}h")
-        plt.legend(loc="lower right")
-        plt.tight_layout()
-        plt.savefig(ASSETS_DIR / f"roc_falha_{HORIZON_H}h.png", dpi=140)
-        plt.close()
+        auc = roc_auc_score(y_test, y_prob)
+        print(f"ROC-AUC: {auc:.4f}")
     except Exception:
-        pass
-
-# -------------- Salvar modelo --------------
-out_path = MODEL_DIR / "modelo_falha_24h.joblib"
-joblib.dump(clf, out_path)
-print(f"\n Modelo salvo em {out_path}")
-print(f" Gráficos salvos em {ASSETS_DIR}/matriz_confusao_falha_{HORIZON_H}h.png"
-      f"{' e ' + str(ASSETS_DIR / f'roc_falha_{HORIZON_H}h.png') if auc is not None else ''}")
+        auc = None
+        print("ROC-AUC não pôde ser calculado (talvez apenas uma classe no conjunto de teste).")
+
+    return {
+        "roc_auc": None if auc is None or np.isnan(auc) else float(auc),
+        "report": classification_report(y_test, y_pred, digits=4, output_dict=True, zero_division=0),
+        "confusion_matrix": confusion_matrix(y_test, y_pred, labels=[0, 1]).tolist(),
+        "n_test": int(len(X_test)),
+        "plots": _plots(cfg, h, y_test, y_pred, y_prob, auc) if cfg.plots else [],
+    }
+
+
+def train(cfg: TrainConfig = None, data: pd.DataFrame = None) -> dict:
+    """
+    Treina, avalia e salva os modelos de falha de todos os horizontes (horizons_of(cfg)).
+    Rótulos, features e split saem de uma única preparação; no modo escalável a busca de
+    parâmetros roda uma vez, no horizonte principal, e é reaproveitada nos demais.
+    Grava MODEL_FILE (horizonte principal, o que o incremental continua) e BUNDLE_FILE
+    ({"horizons", "feature_cols", "models": {h: modelo}}, servido por /api/predict/failure).
+    `data`: leituras já carregadas e ordenadas por (id_peca, leitura_data_hora) — usado pelo
+    pipeline combinado; se None, lê o CSV/cache. ValueError se faltar diversidade de classes
+    no horizonte principal; os demais horizontes sem diversidade ficam fora do bundle.
+    Retorna {model, model_path, bundle_path, watermark, metrics, horizons, plots, timings, params}.
+    """
+    cfg = cfg or TrainConfig()
+    cfg.ensure_dirs()
+    timer = StageTimer(TAG)
+
+    # -------------- Load ---------------
+    own_data = data is None
+    if own_data:
+        print(f"[{TAG}] Lendo CSV: {cfg.csv_path} (modo {cfg.mode})")
+        data = load_table(cfg.csv_path, columns=sorted(REQUIRED), tag=TAG)
+        missing = REQUIRED - set(data.columns)
+        if missing:
+            raise RuntimeError(
+                f"CSV sem colunas obrigatórias: {missing}. "
+                "Gere o CSV novamente com `docker compose exec web python -m app.generate_csv`."
+            )
+        # ordenação canônica
+        data = data.sort_values(["id_peca", "leitura_data_hora"]).reset_index(drop=True)
+        timer.lap("carga")
+
+    df_feat = prepare(data, cfg, timer)
+
+    # -------------- Split temporal --------------
+    y = df_feat["fail_next_h"].astype(int)
+    if y.nunique() < 2:
+        pos = int(y.sum())
+        neg = int((y == 0).sum())
+        raise ValueError(
+            f"Dataset sem diversidade de classes (positivos={pos}, negativos={neg}). "
+            "Gere alguns eventos de FALHA (tabela FALHAS) e gere o CSV novamente (app.generate_csv)."
+        )
+
+    cut_idx = int(len(df_feat) * 0.7) if len(df_feat) > 2 else len(df_feat)
+    train_df = df_feat.iloc[:cut_idx]
+    test_df  = df_feat.iloc[cut_idx:] if cut_idx < len(df_feat) else df_feat.iloc[-1:]
+    X_train, X_test = train_df[FEATURE_COLS], test_df[FEATURE_COLS]
+    timer.lap("limpeza + split")
+
+    # -------------- Modelos (um por horizonte, mesmas features) --------------
+    models, evals, params = {}, {}, None
+    for h in horizons_of(cfg):
+        y_train = train_df[label_col(h)].astype(int)
+        y_test = test_df[label_col(h)].astype(int)
+        if y_train.nunique() < 2:
+            pos = int(y_train.sum()); neg = int((y_train == 0).sum())
+            if h == cfg.horizon_h:
+                raise ValueError(f"Treino sem diversidade de classes (positivos={pos}, negativos={neg}).")
+            print(f"[{TAG}] {h}h: treino sem diversidade de classes (positivos={pos}); fora do bundle")
+            continue
+        models[h], params = _fit(cfg, X_train, y_train, params, timer)
+        timer.lap(f"treino {h}h")
+        evals[h] = _evaluate(cfg, h, models[h], X_test, y_test)
+        timer.lap(f"avaliação {h}h")
+
+    # -------------- Salvar modelos --------------
+    clf = models[cfg.horizon_h]
+    metrics = evals[cfg.horizon_h]
+    plots = metrics.pop("plots")
+    last = data["leitura_data_hora"].max()
+    out_path = cfg.model_dir / MODEL_FILE
+    joblib.dump(clf, out_path)
+    # rótulos das últimas HORIZON_H horas ainda podem mudar: o incremental as reconsome
+    watermark = last - pd.Timedelta(hours=cfg.horizon_h)
+    write_meta(out_path, watermark=watermark, horizon_h=cfg.horizon_h, mode=cfg.mode,
+               kind="full", n_train=int(len(X_train)), roc_auc=metrics["roc_auc"])
+
+    hs = sorted(models)
+    bundle_path = cfg.model_dir / BUNDLE_FILE
+    joblib.dump({"horizons": hs, "feature_cols": list(FEATURE_COLS), "models": models}, bundle_path)
+    write_meta(bundle_path, watermark=last - pd.Timedelta(hours=hs[-1]), horizons=hs, mode=cfg.mode,
+               kind="full", n_train=int(len(X_train)), roc_auc={str(h): evals[h]["roc_auc"] for h in hs})
+    if own_data:   # no pipeline combinado a referência é gravada uma vez, por ele
+        save_drift_reference(data, cfg.model_dir, TAG)
+    timer.lap("salvar modelos")
+    timings = timer.report()
+    print(f"\n Modelo salvo em {out_path}")
+    print(f" Bundle ({', '.join(f'{h}h' for h in hs)}) salvo em {bundle_path}")
+    plots += [p for h in hs if h != cfg.horizon_h for p in evals[h].pop("plots")]
+    if plots:
+        print(f" Gráficos salvos em {', '.join(str(p) for p in plots)}")
+
+    return {
+        "model": clf,
+        "model_path": out_path,
+        "bundle_path": bundle_path,
+        "watermark": watermark,
+        "params": params,
+        "metrics": metrics | {"n_train": int(len(X_train))},
+        "horizons": {h: {k: evals[h][k] for k in ("roc_auc", "n_test")} for h in hs},
+        "plots": plots,
+        "timings": timings,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Treina o modelo de falha nas próximas HORIZON_H horas.")
+    TrainConfig.add_cli_args(ap)
+    ap.add_argument("--horizon", type=int, help="horas do horizonte principal (default: HORIZON_H)")
+    ap.add_argument("--horizons", help="horizontes do bundle, ex.: 1,6,24,72 (default: HORIZONS)")
+    args = ap.parse_args(argv)
+    cfg = TrainConfig.from_args(args)
+    if args.horizon:
+        cfg.horizon_h = args.horizon
+    if args.horizons:
+        cfg.horizons = parse_horizons(args.horizons)
+    try:
+        train(cfg)
+    except ValueError as e:
+        print(f"⚠️  {e}")
+        raise SystemExit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+# app/ml/incremental.py
+"""
+Atualização incremental dos modelos com as leituras novas, sem retreino completo.
+
+- Watermark: <modelo>.meta.json (gravado pelo treino completo e por esta rotina) guarda a
+  última leitura já consumida; só entram no ajuste as linhas posteriores a ela
+  (+ as LOOKBACK linhas anteriores de cada peça, apenas como contexto das janelas)
+- Falha: rótulo só é definitivo HORIZON_H horas depois; o ajuste para em max(data) - HORIZON_H
+- Continuação: warm_start com árvores a mais ajustadas SÓ na janela nova
+  (GradientBoosting: novos estágios sobre o resíduo do modelo atual; RandomForest: novas
+  árvores no conjunto) -> custo proporcional aos dados novos, não ao histórico
+- HistGradientBoosting (TRAIN_MODE=scalable) não é continuado: o fit refaz os bins e as
+  árvores antigas deixariam de valer; nesse caso use o treino completo (app.ml.pipeline)
+- Promoção: o candidato (ajustado na parte antiga da janela) e o modelo atual são
+  avaliados na cauda mais recente (holdout); só substitui se não for pior. O modelo
+  anterior fica em <modelo>.prev.joblib. Rejeitado: watermark não anda (dados reaproveitados)
+- Bundle multi-horizonte (modelo_falha_horizontes.joblib): a promoção do modelo de falha
+  substitui também o modelo de HORIZON_H dentro dele (/predict/failure24h e
+  /predict/failure?horizons=24 servem o mesmo modelo); os demais horizontes só mudam no
+  treino completo
+
+Como rodar:
+    docker compose exec web python -m app.ml.incremental [--only falha] [--trees 25] [--dry-run]
+
+Ambiente (opcional):
+    INCR_TREES=25          árvores/estágios novos por atualização
+    INCR_HOLDOUT=0.2       fração mais recente da janela usada na comparação
+    INCR_MIN_ROWS=200      abaixo disso não atualiza
+    INCR_TOLERANCE=0.0     aceita candidato até esta diferença abaixo do atual
+    (+ CSV_PATH / MODEL_DIR / HORIZON_H, ver app/ml/training.py)
+
+Obs.: a API carrega os modelos uma vez por processo (app/ml/predict.py); reinicie o
+serviço web para servir o modelo promovido.
+"""
+import argparse
+import copy
+import os
+import shutil
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.metrics import f1_score, log_loss, roc_auc_score
+
+from . import failure_predict_24_hours as falha
+from . import part_status_classifier as estado
+from .pipeline import load
+from .training import StageTimer, TrainConfig, read_meta, write_meta
+
+TAG = "incremental"
+INCR_TREES = int(os.getenv("INCR_TREES", "25"))
+INCR_HOLDOUT = float(os.getenv("INCR_HOLDOUT", "0.2"))
+INCR_MIN_ROWS = int(os.getenv("INCR_MIN_ROWS", "200"))
+INCR_TOLERANCE = float(os.getenv("INCR_TOLERANCE", "0.0"))
+LOOKBACK = 12   # maior janela de add_window_features (linhas por peça)
+
+MODELS = {
+    # nome: (módulo, coluna do rótulo, linhas de contexto por peça, rótulo atrasa HORIZON_H?)
+    "falha": (falha, "fail_next_h", LOOKBACK, True),
+    "estado": (estado, "estado_peca", 0, False),
+}
+
+
+def window_after(df: pd.DataFrame, watermark, lookback: int = 0) -> pd.DataFrame:
+    """
+    Linhas com leitura_data_hora > watermark + as `lookback` linhas anteriores da mesma peça.
+    `df` em ordem canônica (id_peca, leitura_data_hora); filtro vetorizado, sem loop por peça.
+    """
+    new = (df["leitura_data_hora"] > watermark).to_numpy()
+    if not new.any():
+        return df.iloc[:0]
+    pos = np.arange(len(df))
+    pieces = df["id_peca"].to_numpy()
+    first = pd.Series(pos[new]).groupby(pieces[new]).min()
+    start = pd.Series(pieces).map(first - lookback).to_numpy(dtype=float)   # NaN: peça sem novidade
+    with np.errstate(invalid="ignore"):
+        keep = pos >= start
+    return df.iloc[keep].reset_index(drop=True)
+
+
+def _score(name: str, model, X, y) -> float:
+    """Maior é melhor. Falha: ROC-AUC (ou -log_loss se o holdout tiver uma classe só)."""
+    if name == "falha":
+        prob = model.predict_proba(X)[:, 1]
+        if y.nunique() > 1:
+            return float(roc_auc_score(y, prob))
+        return -float(log_loss(y, prob, labels=[0, 1]))
+    return float(f1_score(y, model.predict(X), average="macro", zero_division=0))
+
+
+def _n_trees(model) -> int:
+    return int(getattr(model, "n_estimators_", None) or len(model.estimators_))
+
+
+def continue_fit(model, X, y, n_new: int):
+    """Cópia de `model` com `n_new` árvores/estágios a mais ajustados em (X, y)."""
+    cand = copy.deepcopy(model)
+    cand.set_params(warm_start=True, n_estimators=_n_trees(model) + n_new)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        return cand.fit(X, y)
+
+
+def _save(model, path, meta: dict):
+    tmp = path.with_name(path.name + ".tmp")
+    joblib.dump(model, tmp)
+    if path.exists():
+        shutil.copy2(path, path.with_suffix(".prev.joblib"))
+    os.replace(tmp, path)
+    write_meta(path, **meta)
+
+
+def _sync_bundle(cfg: TrainConfig, model) -> bool:
+    """Troca o modelo de HORIZON_H no bundle multi-horizonte pelo modelo promovido."""
+    path = cfg.model_dir / falha.BUNDLE_FILE
+    if not path.exists():
+        return False
+    bundle = joblib.load(path)
+    if cfg.horizon_h not in bundle["models"]:
+        print(f"[{TAG}] falha: bundle sem o horizonte {cfg.horizon_h}h; não sincronizado")
+        return False
+    bundle["models"][cfg.horizon_h] = model
+    tmp = path.with_name(path.name + ".tmp")
+    joblib.dump(bundle, tmp)
+    os.replace(tmp, path)
+    meta = read_meta(path)
+    write_meta(path, **(meta | {"incrementos": int(meta.get("incrementos", 0)) + 1}))
+    return True
+
+
+def update(name: str, cfg: TrainConfig = None, data: pd.DataFrame = None, *, trees: int = INCR_TREES,
+           holdout: float = INCR_HOLDOUT, since=None, dry_run: bool = False) -> dict:
+    """
+    Atualiza um modelo ("falha" ou "estado") com os dados após o watermark.
+    Retorna {"status": promovido|rejeitado|sem_dados|nao_suportado, ...}.
+    """
+    cfg = cfg or TrainConfig(plots=False)
+    mod, label, lookback, delayed = MODELS[name]
+    path = cfg.model_dir / mod.MODEL_FILE
+    timer = StageTimer(f"{TAG}:{name}")
+    if not path.exists():
+        raise FileNotFoundError(f"Modelo não encontrado: {path} (rode o treino completo antes)")
+
+    model = joblib.load(path)
+    if isinstance(model, HistGradientBoostingClassifier):
+        msg = "HistGradientBoosting não suporta continuação com dados novos; use o treino completo"
+        print(f"[{TAG}] {name}: {msg}")
+        return {"status": "nao_suportado", "motivo": msg}
+
+    meta = read_meta(path)
+    watermark = pd.Timestamp(since) if since is not None else (
+        pd.Timestamp(meta["watermark"]) if meta.get("watermark") else None)
+    if watermark is None:
+        raise ValueError(f"{path.name} sem watermark no meta; rode o treino completo ou informe --since")
+
+    if data is None:
+        data = load(cfg)
+        timer.lap("carga")
+    window = window_after(data, watermark, lookback)
+    cutoff = data["leitura_data_hora"].max()
+    if delayed:
+        cutoff -= pd.Timedelta(hours=cfg.horizon_h)
+    timer.lap("janela nova")
+
+    if window.empty:
+        print(f"[{TAG}] {name}: nada novo após {watermark}")
+        return {"status": "sem_dados", "watermark": watermark}
+    feat = mod.prepare(window, cfg, timer)
+    ts = feat["leitura_data_hora"]
+    feat = feat[(ts > watermark) & (ts <= cutoff)].reset_index(drop=True)   # descarta contexto e rótulos provisórios
+    if len(feat) < INCR_MIN_ROWS:
+        print(f"[{TAG}] {name}: {len(feat)} linha(s) rotulada(s) após {watermark} (< {INCR_MIN_ROWS}); aguardando mais dados")
+        return {"status": "sem_dados", "watermark": watermark, "linhas": len(feat)}
+
+    cut = len(feat) - max(1, int(len(feat) * holdout))
+    fit_df, hold_df = feat.iloc[:cut], feat.iloc[cut:]
+    X_fit, y_fit = fit_df[mod.FEATURE_COLS], fit_df[label]
+    X_hold, y_hold = hold_df[mod.FEATURE_COLS], hold_df[label]
+    if name == "falha":
+        y_fit, y_hold = y_fit.astype(int), y_hold.astype(int)
+
+    # warm_start reencoda as classes: a janela precisa trazer exatamente as que o modelo conhece
+    seen, known = set(y_fit.unique()), set(model.classes_)
+    if seen != known:
+        msg = (f"classes da janela {sorted(map(str, seen))} != do modelo {sorted(map(str, known))}; "
+               "aguardando mais dados (classe nova exige treino completo)")
+        print(f"[{TAG}] {name}: {msg}")
+        return {"status": "sem_dados", "watermark": watermark, "motivo": msg}
+
+    cand = continue_fit(model, X_fit, y_fit, trees)
+    timer.lap(f"continuação (+{trees} árvores, {len(X_fit)} linhas)")
+
+    cur_score = _score(name, model, X_hold, y_hold)
+    new_score = _score(name, cand, X_hold, y_hold)
+    promote = new_score >= cur_score - INCR_TOLERANCE
+    timer.lap("holdout")
+    print(f"[{TAG}] {name}: holdout {len(X_hold)} linhas | atual={cur_score:.4f} candidato={new_score:.4f} "
+          f"-> {'promove' if promote else 'mantém o atual'}")
+
+    result = {
+        "status": "promovido" if promote else "rejeitado",
+        "watermark": watermark,
+        "n_fit": int(len(X_fit)), "n_holdout": int(len(X_hold)),
+        "score_atual": cur_score, "score_candidato": new_score,
+        "arvores": _n_trees(cand) if promote else _n_trees(model),
+    }
+    last = {k: result[k] for k in ("status", "n_fit", "n_holdout", "score_atual", "score_candidato")}
+    if promote:
+        # o holdout ainda não foi usado no ajuste: fica para a próxima atualização
+        result["watermark"] = fit_df["leitura_data_hora"].max()
+        if not dry_run:
+            _save(cand, path, meta | {"watermark": result["watermark"], "kind": "incremental",
+                                      "n_estimators": result["arvores"],
+                                      "incrementos": int(meta.get("incrementos", 0)) + 1,
+                                      "ultima_atualizacao": last})
+            if name == "falha" and _sync_bundle(cfg, cand):
+                print(f"[{TAG}] falha: bundle multi-horizonte atualizado ({cfg.horizon_h}h)")
+    elif not dry_run:
+        write_meta(path, **(meta | {"ultima_atualizacao": last}))
+    result["timings"] = timer.report()
+    return result
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Atualiza os modelos com as leituras posteriores ao último treino.")
+    TrainConfig.add_cli_args(ap)
+    ap.add_argument("--only", choices=list(MODELS), action="append", help="atualiza só este modelo (repetível)")
+    ap.add_argument("--trees", type=int, default=INCR_TREES, help=f"árvores novas (default: {INCR_TREES})")
+    ap.add_argument("--holdout", type=float, default=INCR_HOLDOUT, help=f"fração de comparação (default: {INCR_HOLDOUT})")
+    ap.add_argument("--since", help="ignora o watermark do meta (ISO 8601)")
+    ap.add_argument("--dry-run", action="store_true", help="avalia sem gravar modelo nem meta")
+    args = ap.parse_args(argv)
+    cfg = TrainConfig.from_args(args)
+    names = args.only or list(MODELS)
+
+    data = load(cfg)
+    for name in names:
+        try:
+            r = update(name, cfg, data, trees=args.trees, holdout=args.holdout,
+                       since=args.since, dry_run=args.dry_run)
+        except (FileNotFoundError, ValueError) as e:
+            print(f"[{TAG}] {name}: ERRO — {e}")
+            continue
+        print(f"[{TAG}] {name}: {r['status']} (watermark {r.get('watermark', '-')})")
+
+
+if __name__ == "__main__":
+    main()
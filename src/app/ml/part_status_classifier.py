@@ -1,102 +1,243 @@
 """
 Classificação do estado da peça (Saudável / Desgastada / Crítica)
-- Lê app/app/database/sensores.csv (ou CSV_PATH)
+- Lê app/app/database/sensores.csv (ou CSV_PATH), via cache colunar sensores.cols/
+  quando ele está em dia (ver app/ml/dataset.py)
 - Consolida leituras por (id_peca, leitura_data_hora)
 - Usa 'risco_falha' do CSV como rótulo (mapeado para nomes de negócio)
-- Treina RandomForest e avalia com split temporal
+- Treina RandomForest (ou, com TRAIN_MODE=scalable, HistGradientBoosting com parada
+  antecipada + busca paralela em dobras temporais) e avalia com split temporal
 - Salva gráficos (matriz de confusão, importância das features) e o modelo .joblib
 
 Como rodar (no container):
-    docker compose exec web python -m app.ml.piece_state_classifier
+    docker compose exec web python -m app.ml.part_status_classifier [--no-plots] [--mode scalable]
+
+Como biblioteca:
+    from app.ml.part_status_classifier import train
+    artefatos = train(TrainConfig(plots=False))      # ou train(cfg, data=df já carregado)
 
 Ambiente (opcional):
     CSV_PATH  (default: /app/app/database/sensores.csv)
     MODEL_DIR (default: /app/app/ml)
     ASSETS_DIR(default: /app/assets)
+    TRAIN_MODE=classic|scalable, TRAIN_JOBS, CV_SPLITS, VAL_FRACTION (ver app/ml/training.py)
 """
 
-import os
-from pathlib import Path
+import argparse
 import numpy as np
 import pandas as pd
 import joblib
 
-# Matplotlib headless
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-
-from sklearn.ensemble import RandomForestClassifier
+from sklearn.base import clone
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
 from sklearn.metrics import classification_report, confusion_matrix
 
-RANDOM_SEED = 42
-
-# ---------------- utils de caminho ----------------
-def _resolve_csv() -> str:
-    env = os.getenv("CSV_PATH")
-    if env:
-        return env
-    here = Path(__file__).resolve()
-    candidates = [
-        Path("/app/app/database/sensores.csv"),                # container
-        here.parents[1] / "database" / "sensores.csv",         # app/database
-        Path.cwd() / "app" / "database" / "sensores.csv",      # se cwd=/app
-        Path.cwd() / "src" / "app" / "database" / "sensores.csv",
-    ]
-    for p in candidates:
-        if p.exists():
-            return str(p)
-    # fallback padrão no container
-    return "/app/app/database/sensores.csv"
-
-
-CSV_PATH   = Path(_resolve_csv())
-MODEL_DIR  = Path(os.getenv("MODEL_DIR", "/app/app/ml"))
-ASSETS_DIR = Path(os.getenv("ASSETS_DIR", "/app/assets"))
-MODEL_DIR.mkdir(parents=True, exist_ok=True)
-ASSETS_DIR.mkdir(parents=True, exist_ok=True)
-
-print(f"[estado] Lendo CSV: {CSV_PATH}")
-df = pd.read_csv(CSV_PATH, parse_dates=["leitura_data_hora"])
-
-required = {
+from .dataset import load_table
+from .training import (
+    StageTimer, TrainConfig, fit_with_early_stopping, save_drift_reference, time_series_search, write_meta,
+)
+
+TAG = "estado"
+MODEL_FILE = "modelo_estado_peca.joblib"
+REQUIRED = {
     "id_peca", "leitura_data_hora",
     "tempo_uso", "ciclos", "temperatura", "vibracao",
     "risco_falha"
 }
-missing = required - set(df.columns)
-if missing:
-    raise RuntimeError(
-        f"CSV sem colunas obrigatórias: {missing}. "
-        "Gere o CSV novamente com `docker compose exec web python -m app.generate_csv`."
-    )
+FEATURE_COLS = ["tempo_uso", "ciclos", "temperatura", "vibracao"]
+LABELS = ["Saudável", "Desgastada", "Crítica"]
+MAP_ROTULOS = {"baixo": "Saudável", "medio": "Desgastada", "alto": "Crítica"}
+
+# modo escalável: grade pequena (cada combinação x CV_SPLITS dobras em paralelo)
+HGB_GRID = {
+    "learning_rate": [0.05, 0.1],
+    "max_leaf_nodes": [15, 31],
+    "min_samples_leaf": [20, 50],
+}
 
-# Ordenação canônica
-df = df.sort_values(["id_peca", "leitura_data_hora"]).reset_index(drop=True)
-
-# ---------------- agregação por timestamp/peça ----------------
-agg_cols = ["tempo_uso", "ciclos", "temperatura", "vibracao", "risco_falha"]
-df_agg = (
-    df.groupby(["id_peca", "leitura_data_hora"], as_index=False)[agg_cols]
-      .agg({
-          "tempo_uso": "max",
-          "ciclos": "max",
-          "temperatura": "max",
-          "vibracao": "max",
-          "risco_falha": "last"   # string: pega a última etiqueta conhecida
-      })
-)
 
-# ---------------- rótulo de negócio ----------------
-map_rotulos = {"baixo": "Saudável", "medio": "Desgastada", "alto": "Crítica"}
-df_agg["estado_peca"] = df_agg["risco_falha"].map(map_rotulos)
+def hgb_template(seed: int) -> HistGradientBoostingClassifier:
+    return HistGradientBoostingClassifier(
+        max_iter=500, early_stopping=True, n_iter_no_change=20, random_state=seed
+    )
 
-# Remove linhas sem rótulo (se houver)
-df_agg = df_agg.dropna(subset=["estado_peca"]).reset_index(drop=True)
 
-# ---------------- features e imputação ----------------
-feature_cols = ["tempo_uso", "ciclos", "temperatura", "vibracao"]
+def prepare(df: pd.DataFrame, cfg: TrainConfig, timer: StageTimer = None) -> pd.DataFrame:
+    """Leituras ordenadas por (id_peca, data) -> uma linha rotulada por (peça, timestamp), em ordem temporal."""
+    timer = timer or StageTimer(TAG)
+
+    # ---------------- agregação por timestamp/peça ----------------
+    agg_cols = ["tempo_uso", "ciclos", "temperatura", "vibracao", "risco_falha"]
+    df_agg = (
+        df.groupby(["id_peca", "leitura_data_hora"], as_index=False)[agg_cols]
+          .agg({
+              "tempo_uso": "max",
+              "ciclos": "max",
+              "temperatura": "max",
+              "vibracao": "max",
+              "risco_falha": "last"   # string: pega a última etiqueta conhecida
+          })
+    )
 
-# Imputação leve:
-# - ffill/bfill por peça para temperatura/vibração
-# - median global + 0.0 como fallbac
+    # ---------------- rótulo de negócio ----------------
+    df_agg["estado_peca"] = df_agg["risco_falha"].astype(object).map(MAP_ROTULOS)
+
+    # Remove linhas sem rótulo (se houver)
+    df_agg = df_agg.dropna(subset=["estado_peca"]).reset_index(drop=True)
+    timer.lap("agregação + rótulo")
+
+    # ---------------- features e imputação ----------------
+    # Imputação leve:
+    # - ffill/bfill por peça para temperatura/vibração
+    # - median global + 0.0 como fallback
+    # float32 no modo escalável: metade da memória da matriz de features
+    dtype = np.float32 if cfg.scalable else float
+    df_agg["temperatura"] = df_agg.groupby("id_peca")["temperatura"].ffill().bfill()
+    df_agg["vibracao"]    = df_agg.groupby("id_peca")["vibracao"].ffill().bfill()
+    for col in FEATURE_COLS:
+        med = df_agg[col].median() if not df_agg[col].dropna().empty else 0.0
+        df_agg[col] = df_agg[col].fillna(med).replace([np.inf, -np.inf], 0.0).astype(dtype)
+
+    return df_agg.sort_values("leitura_data_hora").reset_index(drop=True)
+
+
+def _plots(cfg: TrainConfig, clf, cm, feature_names) -> list:
+    # Matplotlib headless, importado só quando há gráficos a gerar
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    saved = []
+    plt.figure(figsize=(5, 4))
+    plt.imshow(cm, interpolation="nearest")
+    plt.title("Matriz de Confusão - Estado da Peça")
+    plt.colorbar()
+    plt.xticks(np.arange(3), LABELS, rotation=45)
+    plt.yticks(np.arange(3), LABELS)
+    plt.ylabel("Real")
+    plt.xlabel("Previsto")
+    plt.tight_layout()
+    path = cfg.assets_dir / "matriz_confusao_estado.png"
+    plt.savefig(path, dpi=140)
+    plt.close()
+    saved.append(path)
+
+    # Importância das features (explicabilidade rápida; HGB não expõe feature_importances_)
+    if hasattr(clf, "feature_importances_"):
+        importances = pd.Series(clf.feature_importances_, index=feature_names).sort_values(ascending=False)
+        print("\nImportância das features:\n", importances)
+        plt.figure(figsize=(6, 4))
+        importances.plot(kind="bar")
+        plt.title("Importância das Features - Estado da Peça")
+        plt.tight_layout()
+        path = cfg.assets_dir / "feature_importance_estado.png"
+        plt.savefig(path, dpi=140)
+        plt.close()
+        saved.append(path)
+    return saved
+
+
+def train(cfg: TrainConfig = None, data: pd.DataFrame = None) -> dict:
+    """
+    Treina, avalia e salva o classificador de estado.
+    `data`: leituras já carregadas e ordenadas por (id_peca, leitura_data_hora) — usado pelo
+    pipeline combinado; se None, lê o CSV/cache.
+    Retorna {model, model_path, watermark, metrics, plots, timings, params}.
+    """
+    cfg = cfg or TrainConfig()
+    cfg.ensure_dirs()
+    timer = StageTimer(TAG)
+
+    own_data = data is None
+    if own_data:
+        print(f"[{TAG}] Lendo CSV: {cfg.csv_path} (modo {cfg.mode})")
+        data = load_table(cfg.csv_path, columns=sorted(REQUIRED), tag=TAG)
+        missing = REQUIRED - set(data.columns)
+        if missing:
+            raise RuntimeError(
+                f"CSV sem colunas obrigatórias: {missing}. "
+                "Gere o CSV novamente com `docker compose exec web python -m app.generate_csv`."
+            )
+        # Ordenação canônica
+        data = data.sort_values(["id_peca", "leitura_data_hora"]).reset_index(drop=True)
+        timer.lap("carga")
+
+    df_agg = prepare(data, cfg, timer)
+
+    # ---------------- split temporal (70% / 30%) ----------------
+    cut_idx = int(len(df_agg) * 0.7)
+    train_df = df_agg.iloc[:cut_idx]
+    test_df  = df_agg.iloc[cut_idx:]
+
+    X_train, y_train = train_df[FEATURE_COLS], train_df["estado_peca"]
+    X_test,  y_test  = test_df[FEATURE_COLS],  test_df["estado_peca"]
+    timer.lap("features + split")
+
+    # ---------------- modelo ----------------
+    params = None
+    if cfg.scalable:
+        template = hgb_template(cfg.seed)
+        params, _ = time_series_search(template, HGB_GRID, X_train, y_train, scoring="f1_macro",
+                                       n_splits=cfg.cv_splits, n_jobs=cfg.jobs)
+        timer.lap("busca (TimeSeriesSplit)")
+        clf = fit_with_early_stopping(clone(template).set_params(**params), X_train, y_train,
+                                      cfg.val_fraction)
+        print(f"[{TAG}] HGB: {params} | iterações={clf.n_iter_}")
+    else:
+        clf = RandomForestClassifier(
+            n_estimators=300,
+            max_depth=None,
+            random_state=cfg.seed,
+            n_jobs=-1,
+        )
+        clf.fit(X_train, y_train)
+    timer.lap("treino final")
+
+    # ---------------- avaliação ----------------
+    y_pred = clf.predict(X_test)
+    print("\n=== Classification Report (Estado da Peça) ===")
+    print(classification_report(y_test, y_pred, digits=4, zero_division=0))
+    cm = confusion_matrix(y_test, y_pred, labels=LABELS)
+    timer.lap("avaliação")
+
+    plots = []
+    if cfg.plots:
+        plots = _plots(cfg, clf, cm, X_train.columns)
+        timer.lap("gráficos")
+
+    # ---------------- salvar ----------------
+    out_path = cfg.model_dir / MODEL_FILE
+    joblib.dump(clf, out_path)
+    watermark = data["leitura_data_hora"].max()
+    write_meta(out_path, watermark=watermark, mode=cfg.mode, kind="full", n_train=int(len(X_train)))
+    if own_data:   # no pipeline combinado a referência é gravada uma vez, por ele
+        save_drift_reference(data, cfg.model_dir, TAG)
+    timer.lap("salvar modelo")
+    timings = timer.report()
+    print(f"\n Modelo salvo em {out_path}")
+    if plots:
+        print(f" Gráficos salvos em {', '.join(str(p) for p in plots)}")
+
+    return {
+        "model": clf,
+        "model_path": out_path,
+        "watermark": watermark,
+        "params": params,
+        "metrics": {
+            "report": classification_report(y_test, y_pred, digits=4, output_dict=True, zero_division=0),
+            "confusion_matrix": cm.tolist(),
+            "n_train": int(len(X_train)),
+            "n_test": int(len(X_test)),
+        },
+        "plots": plots,
+        "timings": timings,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Treina o classificador de estado da peça.")
+    TrainConfig.add_cli_args(ap)
+    train(TrainConfig.from_args(ap.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
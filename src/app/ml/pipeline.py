@@ -0,0 +1,107 @@
+# app/ml/pipeline.py
+"""
+Pipeline de treino combinado: carrega, valida e ordena o dataset UMA vez e treina os
+dois modelos (falha nas próximas HORIZON_H horas e estado da peça) a partir dele.
+
+- Uma leitura do CSV/cache colunar com a união das colunas dos dois modelos
+- --parallel: cada modelo num processo (fork; o DataFrame é herdado, não serializado);
+  no modo escalável os TRAIN_JOBS da busca são divididos entre os dois
+- --no-plots: não importa matplotlib nem gera gráficos (retreino headless)
+- grava MODEL_DIR/referencia_drift.json (histogramas do dataset, ver app/drift.py)
+
+Como rodar:
+    docker compose exec web python -m app.ml.pipeline [--parallel] [--no-plots] [--mode scalable]
+
+Como biblioteca (ex.: agendador):
+    from app.ml.pipeline import train
+    artefatos = train(TrainConfig(plots=False), parallel=True)   # {"falha": {...}, "estado": {...}}
+"""
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+
+import pandas as pd
+
+from . import failure_predict_24_hours as falha
+from . import part_status_classifier as estado
+from .dataset import load_table
+from .training import StageTimer, TrainConfig, save_drift_reference
+
+TAG = "pipeline"
+TRAINERS = {"falha": falha.train, "estado": estado.train}
+REQUIRED = falha.REQUIRED | estado.REQUIRED
+
+_DATA = None   # dataset compartilhado com os processos filhos (herdado no fork)
+
+
+def load(cfg: TrainConfig) -> pd.DataFrame:
+    df = load_table(cfg.csv_path, columns=sorted(REQUIRED), tag=TAG)
+    missing = REQUIRED - set(df.columns)
+    if missing:
+        raise RuntimeError(
+            f"CSV sem colunas obrigatórias: {missing}. "
+            "Gere o CSV novamente com `docker compose exec web python -m app.generate_csv`."
+        )
+    # ordenação canônica (os dois treinadores partem dela)
+    return df.sort_values(["id_peca", "leitura_data_hora"]).reset_index(drop=True)
+
+
+def _run(name: str, cfg: TrainConfig) -> dict:
+    try:
+        return TRAINERS[name](cfg, data=_DATA)
+    except ValueError as e:          # ex.: sem diversidade de classes
+        print(f"[{TAG}] {name}: {e}")
+        return {"error": str(e)}
+
+
+def train(cfg: TrainConfig = None, parallel: bool = False, models=tuple(TRAINERS)) -> dict:
+    """Treina `models` a partir de uma única carga. Retorna {nome: artefatos ou {"error"}}."""
+    global _DATA
+    cfg = cfg or TrainConfig()
+    timer = StageTimer(TAG)
+    print(f"[{TAG}] Lendo CSV: {cfg.csv_path} (modo {cfg.mode}, modelos {', '.join(models)})")
+    _DATA = load(cfg)
+    timer.lap("carga compartilhada")
+    cfg.ensure_dirs()
+    save_drift_reference(_DATA, cfg.model_dir, TAG)
+
+    results = {}
+    try:
+        can_fork = "fork" in multiprocessing.get_all_start_methods()
+        if parallel and len(models) > 1 and can_fork:
+            sub = replace(cfg, jobs=max(1, cfg.jobs // len(models)))
+            ctx = multiprocessing.get_context("fork")
+            with ProcessPoolExecutor(max_workers=len(models), mp_context=ctx) as ex:
+                futures = {name: ex.submit(_run, name, sub) for name in models}
+                results = {name: fut.result() for name, fut in futures.items()}
+        else:
+            for name in models:
+                results[name] = _run(name, cfg)
+        timer.lap("treino dos modelos")
+    finally:
+        _DATA = None
+
+    timer.report()
+    for name, art in results.items():
+        if "error" in art:
+            print(f"[{TAG}] {name}: ERRO — {art['error']}")
+        else:
+            print(f"[{TAG}] {name}: {art['model_path']} ({art['timings']['total']:.2f}s)")
+    return results
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Treina os modelos de falha e de estado com uma única carga de dados.")
+    TrainConfig.add_cli_args(ap)
+    ap.add_argument("--parallel", action="store_true", help="um processo por modelo")
+    ap.add_argument("--only", choices=list(TRAINERS), action="append", help="treina só este modelo (repetível)")
+    args = ap.parse_args(argv)
+    results = train(TrainConfig.from_args(args), parallel=args.parallel,
+                    models=tuple(args.only or TRAINERS))
+    if any("error" in r for r in results.values()):
+        raise SystemExit(2)
+
+
+if __name__ == "__main__":
+    main()
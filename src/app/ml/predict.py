@@ -2,7 +2,6 @@
 from pathlib import Path
 import os
 import numpy as np
-import joblib
 
 MODEL_DIR = Path(os.getenv("MODEL_DIR", Path(__file__).parent))
 BASE_FEATURES = ["tempo_uso", "ciclos", "temperatura", "vibracao"]
@@ -10,59 +9,151 @@ BASE_FEATURES = ["tempo_uso", "ciclos", "temperatura", "vibracao"]
 # Lazy loading para performance
 _modelo_estado = None
 _modelo_falha24 = None
+_bundle_falha = None        # {"horizons", "feature_cols", "models": {h: modelo}} (failure_predict_24_hours)
+_versao = None              # assinatura dos arquivos de modelo carregados
+
+ESTADO_FILE = "modelo_estado_peca.joblib"
+FALHA24_FILE = "modelo_falha_24h.joblib"
+BUNDLE_FILE = "modelo_falha_horizontes.joblib"
 
 def _load(path):
+    import joblib   # adiado: joblib (e o sklearn, no unpickle) só no 1º uso, não na partida do worker
+
     p = MODEL_DIR / path
     if not p.exists():
         raise FileNotFoundError(f"Modelo não encontrado: {p}")
     return joblib.load(p)
 
+def _assinatura() -> str:
+    """mtime + tamanho dos arquivos de estado, falha 24h e bundle -> 12 hex (muda a cada treino/promoção)."""
+    import hashlib
+
+    h = hashlib.sha1()
+    for nome in (ESTADO_FILE, FALHA24_FILE, BUNDLE_FILE):
+        p = MODEL_DIR / nome
+        st = p.stat() if p.exists() else None
+        h.update(f"{nome}:{st and st.st_mtime_ns}:{st and st.st_size};".encode())
+    return h.hexdigest()[:12]
+
 def _ensure_loaded():
-    global _modelo_estado, _modelo_falha24
+    global _modelo_estado, _modelo_falha24, _versao
+    if _modelo_estado is None or _modelo_falha24 is None:
+        _versao = _assinatura()
     if _modelo_estado is None:
-        _modelo_estado = _load("modelo_estado_peca.joblib")
+        _modelo_estado = _load(ESTADO_FILE)
     if _modelo_falha24 is None:
-        _modelo_falha24 = _load("modelo_falha_24h.joblib")
+        _modelo_falha24 = _load(FALHA24_FILE)
 
-def _make_X(payload: dict, model) -> np.ndarray:
+def model_version() -> str:
+    """Versão (assinatura dos arquivos) dos modelos em uso."""
+    _ensure_loaded()
+    return _versao
+
+def reload_if_changed() -> bool:
+    """Descarta os modelos carregados se os arquivos mudaram (processos longos, ex.: app.scoring --loop)."""
+    global _modelo_estado, _modelo_falha24, _bundle_falha
+    if _versao is None or _assinatura() == _versao:
+        return False
+    _modelo_estado = _modelo_falha24 = _bundle_falha = None
+    return True
+
+def _ensure_bundle():
+    global _bundle_falha, _versao
+    if _bundle_falha is None:
+        if _versao is None:
+            _versao = _assinatura()
+        _bundle_falha = _load(BUNDLE_FILE)
+    return _bundle_falha
+
+def failure_horizons() -> list:
+    """Horizontes (h) disponíveis no bundle de falha."""
+    return list(_ensure_bundle()["horizons"])
+
+ALIAS = {
+    "tempo_uso_total": "tempo_uso",
+    "qtd_ciclos": "ciclos",
+    "temp": "temperatura",
+    "vib": "vibracao",
+}
+
+def _make_rows(payloads: list, model) -> np.ndarray:
+    """Matriz (n, features) para n payloads — uma chamada do modelo para o lote inteiro."""
     cols = getattr(model, "feature_names_in_", None)
     if cols is None:
-        row = [float(payload.get(f, 0.0)) for f in BASE_FEATURES]
+        rows = [[float(p.get(f, 0.0)) for f in BASE_FEATURES] for p in payloads]
     else:
-        alias = {
-            "tempo_uso_total": "tempo_uso",
-            "qtd_ciclos": "ciclos",
-            "temp": "temperatura",
-            "vib": "vibracao",
-        }
-        row = []
-        for c in cols:
-            v = payload.get(c, payload.get(alias.get(c, ""), 0.0))
-            row.append(float(v) if v is not None else 0.0)
-
-    X = np.array([row], dtype=float)
+        rows = []
+        for p in payloads:
+            row = []
+            for c in cols:
+                v = p.get(c, p.get(ALIAS.get(c, ""), 0.0))
+                row.append(float(v) if v is not None else 0.0)
+            rows.append(row)
+
+    X = np.array(rows, dtype=float).reshape(len(payloads), -1)
     # blindagem contra NaN/Inf
     X = np.nan_to_num(X, nan=0.0, posinf=1e9, neginf=-1e9)
     return X
 
+def _make_X(payload: dict, model) -> np.ndarray:
+    return _make_rows([payload], model)
 
-def predict_state(payload: dict):
-    _ensure_loaded()
-    X = _make_X(payload, _modelo_estado)
-    y = _modelo_estado.predict(X)[0]
+
+def _prob_falha(model, X) -> np.ndarray:
+    proba = getattr(model, "predict_proba", None)
+    if proba is None:
+        raw = np.ravel(model.decision_function(X))
+        return 1 / (1 + np.exp(-raw))     # sigmoid
+    return proba(X)[:, 1]
+
+def _estado(y):
     try:
         return {"estado": int(y)}
     except Exception:
         return {"estado": y}
 
-def predict_failure_24h(payload: dict, threshold: float = 0.5):
+def predict_state_batch(payloads: list) -> list:
     _ensure_loaded()
-    X = _make_X(payload, _modelo_falha24)
-    proba = getattr(_modelo_falha24, "predict_proba", None)
-    if proba is None:
-        raw = _modelo_falha24.decision_function(X)
-        # sigmoid
-        prob = float(1 / (1 + np.exp(-raw)) if np.ndim(raw)==0 else 1/(1+np.exp(-raw[0])))
-    else:
-        prob = float(_modelo_falha24.predict_proba(X)[0, 1])
-    return {"falha_prox_24h": int(prob >= threshold), "prob": prob, "threshold": threshold}
+    if not payloads:
+        return []
+    return [_estado(y) for y in _modelo_estado.predict(_make_rows(payloads, _modelo_estado))]
+
+def predict_failure_24h_batch(payloads: list, thresholds) -> list:
+    """Uma probabilidade por payload; `thresholds` é um float ou um por payload."""
+    _ensure_loaded()
+    if not payloads:
+        return []
+    if np.ndim(thresholds) == 0:
+        thresholds = [thresholds] * len(payloads)
+    probs = _prob_falha(_modelo_falha24, _make_rows(payloads, _modelo_falha24))
+    return [{"falha_prox_24h": int(prob >= th), "prob": prob, "threshold": th}
+            for prob, th in zip(probs.tolist(), thresholds)]
+
+def predict_failure_horizons_batch(payloads: list, horizons, thresholds) -> list:
+    """
+    Probabilidade de falha em cada um dos `horizons` (h) para cada payload: uma montagem da
+    matriz de features (os modelos do bundle compartilham as colunas) e um predict_proba
+    por horizonte para o lote inteiro. `thresholds`: float ou um por payload.
+    KeyError se algum horizonte não estiver no bundle.
+    """
+    bundle = _ensure_bundle()
+    faltam = [h for h in horizons if h not in bundle["models"]]
+    if faltam:
+        raise KeyError(f"horizonte(s) sem modelo: {faltam}; disponíveis: {bundle['horizons']}")
+    if not payloads:
+        return []
+    if np.ndim(thresholds) == 0:
+        thresholds = [thresholds] * len(payloads)
+    models = bundle["models"]
+    X = _make_rows(payloads, models[horizons[0]]) if horizons else None
+    probs = {h: _prob_falha(models[h], X).tolist() for h in horizons}
+    return [{"horizontes": {str(h): {"prob": probs[h][i], "falha": int(probs[h][i] >= th)} for h in horizons},
+             "threshold": th}
+            for i, th in enumerate(thresholds)]
+
+
+def predict_state(payload: dict):
+    return predict_state_batch([payload])[0]
+
+def predict_failure_24h(payload: dict, threshold: float = 0.5):
+    return predict_failure_24h_batch([payload], threshold)[0]
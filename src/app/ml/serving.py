@@ -0,0 +1,155 @@
+# app/ml/serving.py
+"""
+Micro-batching de inferência para /api/predict/state, /api/predict/failure24h e
+/api/predict/failure (vários horizontes).
+
+Cada chamada com 1 linha paga o overhead fixo do sklearn (validação, e no RandomForest
+com n_jobs=-1 o despacho para o pool de threads do joblib: ~8 ms para 1 linha, ~9 ms para
+64). Aqui cada modelo tem uma thread executora com fila própria:
+
+- A requisição enfileira o payload e espera um Future (até INFER_TIMEOUT_MS -> 503)
+- A executora pega o primeiro da fila e junta o que chegar em até INFER_MAX_WAIT_MS ou
+  INFER_MAX_BATCH itens; roda UM predict vetorizado (predict_*_batch) e entrega a linha
+  de cada Future. Pedido que estourou o timeout antes de entrar num lote é descartado
+- Requisição sozinha (nenhuma outra pendente no processo) vai direto, sem esperar a janela:
+  servidor ocioso não paga os INFER_MAX_WAIT_MS
+- Erro do modelo vai para todas as requisições do lote (exceção no Future)
+
+Só há lote com requisições concorrentes no mesmo processo: gunicorn com threads
+(--threads N, ver Dockerfile) ou servidor de desenvolvimento. Com worker síncrono o lote
+é sempre 1 e o custo extra é a troca de thread; desligue com INFER_BATCHING=0.
+
+Ambiente (opcional):
+    INFER_BATCHING=1   INFER_MAX_BATCH=64   INFER_MAX_WAIT_MS=2   INFER_TIMEOUT_MS=2000
+
+Benchmark por concorrência (direto vs. lote): python -m app.bench.inference
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from . import predict
+
+INFER_BATCHING = os.getenv("INFER_BATCHING", "1") == "1"
+INFER_MAX_BATCH = int(os.getenv("INFER_MAX_BATCH", "64"))
+INFER_MAX_WAIT_MS = float(os.getenv("INFER_MAX_WAIT_MS", "2"))
+INFER_TIMEOUT_MS = float(os.getenv("INFER_TIMEOUT_MS", "2000"))
+
+
+class InferenceTimeout(TimeoutError):
+    """A requisição esperou mais que o timeout pela inferência."""
+
+
+class MicroBatcher:
+    """Fila + thread executora: `fn(lista de itens) -> lista de resultados` por lote."""
+
+    def __init__(self, nome: str, fn, max_batch: int = INFER_MAX_BATCH, max_wait_ms: float = INFER_MAX_WAIT_MS):
+        self.nome = nome
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.stats = {"lotes": 0, "itens": 0, "descartados": 0}
+        self._fila = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._pendentes = 0          # submetidos ainda sem resposta
+
+    def _garantir_thread(self):
+        # threads não sobrevivem ao fork (gunicorn --preload): uma executora por processo
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._fila = queue.SimpleQueue()
+                    self._pendentes = 0
+                    threading.Thread(target=self._loop, name=f"infer-{self.nome}", daemon=True).start()
+                    self._pid = os.getpid()
+
+    def submit(self, item) -> Future:
+        self._garantir_thread()
+        fut = Future()
+        with self._lock:
+            self._pendentes += 1
+        fut.add_done_callback(self._concluido)
+        self._fila.put((item, fut))
+        return fut
+
+    def _concluido(self, fut):
+        with self._lock:
+            self._pendentes -= 1
+
+    def __call__(self, item, timeout_ms: float = INFER_TIMEOUT_MS):
+        fut = self.submit(item)
+        try:
+            return fut.result(timeout=timeout_ms / 1000)
+        except FutureTimeout:
+            fut.cancel()          # ainda na fila: a executora pula
+            raise InferenceTimeout(f"inferência ({self.nome}) excedeu {timeout_ms:g} ms") from None
+
+    def _coletar(self, fila) -> list:
+        lote = [fila.get()]
+        prazo = time.monotonic() + self.max_wait
+        while len(lote) < self.max_batch:
+            if self._pendentes <= 1:             # requisição sozinha (servidor ocioso): não segura
+                break
+            resta = prazo - time.monotonic()
+            try:
+                lote.append(fila.get(timeout=resta) if resta > 0 else fila.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _loop(self):
+        fila = self._fila
+        while True:
+            coletados = self._coletar(fila)
+            lote = [(item, fut) for item, fut in coletados if fut.set_running_or_notify_cancel()]
+            self.stats["descartados"] += len(coletados) - len(lote)
+            if not lote:
+                continue
+            try:
+                resultados = self.fn([item for item, _ in lote])
+            except BaseException as e:
+                for _, fut in lote:
+                    fut.set_exception(e)
+                continue
+            self.stats["lotes"] += 1
+            self.stats["itens"] += len(lote)
+            for (_, fut), res in zip(lote, resultados):
+                fut.set_result(res)
+
+
+_estado = MicroBatcher("estado", predict.predict_state_batch)
+_falha24 = MicroBatcher(
+    "falha24",
+    lambda itens: predict.predict_failure_24h_batch([p for p, _ in itens], [th for _, th in itens]),
+)
+
+
+def _lote_horizontes(itens: list) -> list:
+    """Itens (payload, horizontes, threshold): roda a união dos horizontes do lote e recorta."""
+    todos = sorted({h for _, hs, _ in itens for h in hs})
+    res = predict.predict_failure_horizons_batch([p for p, _, _ in itens], todos, [th for _, _, th in itens])
+    return [r | {"horizontes": {str(h): r["horizontes"][str(h)] for h in hs}}
+            for r, (_, hs, _) in zip(res, itens)]
+
+
+_falha_horizontes = MicroBatcher("falha_horizontes", _lote_horizontes)
+
+
+def predict_state(payload: dict) -> dict:
+    return _estado(payload) if INFER_BATCHING else predict.predict_state(payload)
+
+
+def predict_failure_24h(payload: dict, threshold: float = 0.5) -> dict:
+    if not INFER_BATCHING:
+        return predict.predict_failure_24h(payload, threshold=threshold)
+    return _falha24((payload, threshold))
+
+
+def predict_failure_horizons(payload: dict, horizons, threshold: float = 0.5) -> dict:
+    if not INFER_BATCHING:
+        return predict.predict_failure_horizons_batch([payload], list(horizons), threshold)[0]
+    return _falha_horizontes((payload, tuple(horizons), threshold))
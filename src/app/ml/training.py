@@ -0,0 +1,255 @@
+# app/ml/training.py
+"""
+Configuração e utilitários de treino compartilhados por failure_predict_24_hours.py,
+part_status_classifier.py e pipeline.py.
+
+- TrainConfig: caminhos, modo, paralelismo e gráficos (defaults vindos do ambiente)
+- read_meta/write_meta: <modelo>.meta.json ao lado do .joblib (watermark do último treino)
+- save_drift_reference: histogramas de referência do monitor de drift (app/drift.py)
+- StageTimer: tempo de parede por etapa (carga, rótulo, features, busca, treino, ...)
+- fit_with_early_stopping: HistGradientBoosting com parada antecipada validada na
+  CAUDA temporal do treino (X_val/y_val), não num sorteio aleatório
+- time_series_search: busca em grade x dobras TimeSeriesSplit num pool de processos;
+  os dados vão para cada worker uma única vez (initializer), as tarefas levam só
+  os limites das dobras
+
+Ambiente (opcional):
+    CSV_PATH / MODEL_DIR / ASSETS_DIR / HORIZON_H
+    HORIZONS=1,6,24,72            horizontes (h) do bundle multi-horizonte de falha
+    TRAIN_MODE=classic|scalable   (default: classic — modelos originais)
+    TRAIN_JOBS=<n processos>      (default: nº de CPUs)
+    CV_SPLITS=4                   dobras temporais da busca
+    VAL_FRACTION=0.15             cauda do treino usada na parada antecipada
+"""
+import json
+import math
+import multiprocessing
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import product
+from pathlib import Path
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import ParameterGrid, TimeSeriesSplit
+
+TRAIN_MODE = os.getenv("TRAIN_MODE", "classic").strip().lower()
+TRAIN_JOBS = int(os.getenv("TRAIN_JOBS", "0")) or os.cpu_count() or 1
+CV_SPLITS = int(os.getenv("CV_SPLITS", "4"))
+VAL_FRACTION = float(os.getenv("VAL_FRACTION", "0.15"))
+
+
+def parse_horizons(text: str) -> tuple:
+    """"1,6,24" -> (1, 6, 24): inteiros positivos, sem repetição, em ordem crescente."""
+    hs = {int(h) for h in str(text).replace(" ", "").split(",") if h}
+    if not hs or min(hs) <= 0:
+        raise ValueError(f"horizontes inválidos: {text!r} (use horas inteiras positivas, ex.: 1,6,24)")
+    return tuple(sorted(hs))
+
+
+def resolve_csv() -> str:
+    env = os.getenv("CSV_PATH")
+    if env:
+        return env
+    here = Path(__file__).resolve()
+    candidates = [
+        Path("/app/app/database/sensores.csv"),                # container
+        here.parents[1] / "database" / "sensores.csv",         # app/database
+        Path.cwd() / "app" / "database" / "sensores.csv",      # se cwd=/app
+        Path.cwd() / "src" / "app" / "database" / "sensores.csv",
+    ]
+    for p in candidates:
+        if p.exists():
+            return str(p)
+    # fallback padrão no container
+    return "/app/app/database/sensores.csv"
+
+
+@dataclass
+class TrainConfig:
+    csv_path: Path = field(default_factory=lambda: Path(resolve_csv()))
+    model_dir: Path = field(default_factory=lambda: Path(os.getenv("MODEL_DIR", "/app/app/ml")))
+    assets_dir: Path = field(default_factory=lambda: Path(os.getenv("ASSETS_DIR", "/app/assets")))
+    horizon_h: int = field(default_factory=lambda: int(os.getenv("HORIZON_H", "24")))
+    horizons: tuple = field(default_factory=lambda: parse_horizons(os.getenv("HORIZONS", "1,6,24,72")))
+    mode: str = TRAIN_MODE
+    jobs: int = TRAIN_JOBS
+    cv_splits: int = CV_SPLITS
+    val_fraction: float = VAL_FRACTION
+    plots: bool = True
+    seed: int = 42
+
+    @property
+    def scalable(self) -> bool:
+        return self.mode == "scalable"
+
+    @staticmethod
+    def add_cli_args(parser):
+        """Opções de linha de comando comuns aos scripts de treino."""
+        parser.add_argument("--csv", help="CSV de treino (default: CSV_PATH)")
+        parser.add_argument("--model-dir", help="destino dos .joblib (default: MODEL_DIR)")
+        parser.add_argument("--mode", choices=["classic", "scalable"], help="default: TRAIN_MODE")
+        parser.add_argument("--jobs", type=int, help="processos da busca (default: TRAIN_JOBS)")
+        parser.add_argument("--no-plots", action="store_true", help="não gera gráficos (sem matplotlib)")
+
+    @classmethod
+    def from_args(cls, args) -> "TrainConfig":
+        cfg = cls()
+        if args.csv:
+            cfg.csv_path = Path(args.csv)
+        if args.model_dir:
+            cfg.model_dir = Path(args.model_dir)
+        if args.mode:
+            cfg.mode = args.mode
+        if args.jobs:
+            cfg.jobs = args.jobs
+        cfg.plots = not args.no_plots
+        return cfg
+
+    def ensure_dirs(self):
+        self.model_dir.mkdir(parents=True, exist_ok=True)
+        if self.plots:
+            self.assets_dir.mkdir(parents=True, exist_ok=True)
+
+
+def meta_path(model_path) -> Path:
+    return Path(model_path).with_suffix(".meta.json")
+
+
+def read_meta(model_path) -> dict:
+    p = meta_path(model_path)
+    return json.loads(p.read_text(encoding="utf-8")) if p.exists() else {}
+
+
+def write_meta(model_path, **fields) -> dict:
+    """Grava (atomicamente) o meta do modelo; `watermark` = última leitura já consumida."""
+    meta = {k: (v.isoformat() if hasattr(v, "isoformat") else v) for k, v in fields.items()}
+    p = meta_path(model_path)
+    tmp = p.with_name(p.name + ".tmp")
+    tmp.write_text(json.dumps(meta, ensure_ascii=False, indent=1, default=str), encoding="utf-8")
+    os.replace(tmp, p)
+    return meta
+
+
+def save_drift_reference(data, model_dir, tag: str) -> Path:
+    """referencia_drift.json ao lado dos modelos: base do PSI/KS de `python -m app.drift`."""
+    from ..drift import write_reference
+    path = write_reference(data, model_dir)
+    print(f"[{tag}] referência de drift: {path}")
+    return path
+
+
+class StageTimer:
+    """Cronômetro por volta: lap("etapa") fecha a etapa iniciada na volta anterior."""
+
+    def __init__(self, tag: str):
+        self.tag = tag
+        self.stages = []
+        self._t0 = self._last = time.perf_counter()
+
+    def lap(self, name: str) -> float:
+        now = time.perf_counter()
+        dt = now - self._last
+        self._last = now
+        self.stages.append((name, dt))
+        print(f"[{self.tag}] {name}: {dt:.2f}s")
+        return dt
+
+    def report(self) -> dict:
+        total = time.perf_counter() - self._t0
+        print(f"\n[{self.tag}] tempo por etapa (total {total:.2f}s)")
+        for name, dt in self.stages:
+            print(f"  {name:<28} {dt:8.2f}s  {100 * dt / total if total else 0:5.1f}%")
+        return {name: round(dt, 3) for name, dt in self.stages} | {"total": round(total, 3)}
+
+
+def fit_with_early_stopping(model, X, y, val_fraction: float = VAL_FRACTION):
+    """
+    Treina com X_val/y_val = últimos `val_fraction` do treino (ordem temporal preservada).
+    Cai para fit simples quando não há cauda útil (poucos dados ou classe nova na cauda).
+    """
+    n_val = int(len(X) * val_fraction)
+    if not getattr(model, "early_stopping", False) or n_val < 1 or n_val >= len(X):
+        return model.fit(X, y)
+    cut = len(X) - n_val
+    y_tr, y_val = y.iloc[:cut], y.iloc[cut:]
+    if y_tr.nunique() < 2 or not set(y_val.unique()) <= set(y_tr.unique()):
+        return model.fit(X, y)
+    return model.fit(X.iloc[:cut], y_tr, X_val=X.iloc[cut:], y_val=y_val)
+
+
+# ---------------- busca paralela ----------------
+_X = _y = None
+
+
+def _init_worker(X, y, limit_threads: bool):
+    global _X, _y
+    _X, _y = X, y
+    if limit_threads:
+        # um processo por núcleo: sem threads OpenMP extras dentro de cada worker
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+
+
+def _eval_task(estimator, params, train_end, test_start, test_end, scoring):
+    X_tr, y_tr = _X.iloc[:train_end], _y.iloc[:train_end]
+    X_te, y_te = _X.iloc[test_start:test_end], _y.iloc[test_start:test_end]
+    if y_tr.nunique() < 2:
+        return math.nan, 0.0
+    t0 = time.perf_counter()
+    model = fit_with_early_stopping(clone(estimator).set_params(**params), X_tr, y_tr)
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            score = float(get_scorer(scoring)(model, X_te, y_te))
+    except ValueError:   # ex.: ROC-AUC com uma única classe na dobra
+        score = math.nan
+    return score, time.perf_counter() - t0
+
+
+def time_series_search(estimator, grid: dict, X, y, scoring: str,
+                       n_splits: int = CV_SPLITS, n_jobs: int = TRAIN_JOBS):
+    """
+    Avalia cada combinação de `grid` em `n_splits` dobras TimeSeriesSplit.
+    X (DataFrame) e y (Series) já devem estar em ordem temporal.
+    Retorna (melhores parâmetros, [{params, mean, scores}] ordenado do melhor ao pior).
+    """
+    folds = [(int(tr[-1]) + 1, int(te[0]), int(te[-1]) + 1)
+             for tr, te in TimeSeriesSplit(n_splits=n_splits).split(np.empty((len(X), 1)))]
+    candidates = list(ParameterGrid(grid))
+    tasks = list(product(range(len(candidates)), range(len(folds))))
+    scores = np.full((len(candidates), len(folds)), np.nan)
+    fit_s = 0.0
+
+    workers = max(1, min(n_jobs, len(tasks)))
+    if workers == 1:
+        _init_worker(X, y, limit_threads=False)
+        for c, f in tasks:
+            scores[c, f], dt = _eval_task(estimator, candidates[c], *folds[f], scoring)
+            fit_s += dt
+    else:
+        # fork: os workers herdam X/y (initargs) sem serializar o DataFrame; sem fork, o padrão da plataforma
+        ctx = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                 initializer=_init_worker, initargs=(X, y, True)) as ex:
+            futures = {ex.submit(_eval_task, estimator, candidates[c], *folds[f], scoring): (c, f)
+                       for c, f in tasks}
+            for fut, (c, f) in futures.items():
+                scores[c, f], dt = fut.result()
+                fit_s += dt
+
+    means = [float(np.nanmean(row)) if not np.isnan(row).all() else -math.inf for row in scores]
+    order = sorted(range(len(candidates)), key=lambda i: means[i], reverse=True)
+    results = [{"params": candidates[i], "mean": means[i], "scores": scores[i].tolist()} for i in order]
+
+    print(f"[busca] {len(candidates)} combinações x {len(folds)} dobras em {workers} processo(s); "
+          f"soma dos ajustes {fit_s:.1f}s")
+    for r in results[:5]:
+        print(f"  {scoring}={r['mean']:.4f}  {r['params']}")
+    if results[0]["mean"] == -math.inf:
+        print("[busca] nenhuma dobra avaliável (classes insuficientes); usando a primeira combinação.")
+    return results[0]["params"], results
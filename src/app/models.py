@@ -5,7 +5,10 @@ class Peca(db.Model):
     id_peca = db.Column(db.Integer, primary_key=True)
     tipo = db.Column(db.String(100), nullable=False)
     fabricante = db.Column(db.String(100))
-    tempo_uso_total = db.Column(db.Integer)
+    tempo_uso_total = db.Column(db.Integer)               # minutos de ciclos FECHADOS (acumulado)
+    qtd_ciclos = db.Column(db.Integer, nullable=False, default=0, server_default="0")  # ciclos fechados
+    id_ciclo_aberto = db.Column(db.Integer)               # ciclo em andamento (NULL = parada)
+    __table_args__ = (db.Index("IX_PECAS_CICLO_ABERTO", "id_ciclo_aberto"),)
 
 class Sensor(db.Model):
     __tablename__ = "SENSORES"
@@ -21,6 +24,8 @@ class Ciclo(db.Model):
     data_inicio = db.Column(db.DateTime)
     data_fim = db.Column(db.DateTime)
     duracao = db.Column(db.Integer)
+    # "ciclo aberto da peça" (start/end set-based filtram por id_peca + data_fim IS NULL)
+    __table_args__ = (db.Index("IX_CICLOS_PECA_FIM", "id_peca", "data_fim"),)
 
 class Leitura(db.Model):
     __tablename__ = "LEITURAS_SENSOR"
@@ -28,16 +33,94 @@ class Leitura(db.Model):
     id_sensor = db.Column(db.Integer, db.ForeignKey("SENSORES.id_sensor"))
     leitura_valor = db.Column(db.Float)
     leitura_data_hora = db.Column(db.DateTime)
+    sensor = db.relationship("Sensor")                  # sem backref: Sensor não carrega leituras
+    __table_args__ = (
+        # série/janela por sensor (gráfico, streak de alerta, médias do snapshot): cobre o valor
+        db.Index("IX_LEITURAS_SENSOR_DATA", "id_sensor", "leitura_data_hora", "leitura_valor"),
+        # janela de tempo sem sensor (admin, export): keyset em (data, id)
+        db.Index("IX_LEITURAS_DATA", "leitura_data_hora"),
+    )
+
+class EstatisticaSensor(db.Model):
+    """Contagem e última leitura por sensor, mantidas na ingestão (ver app/stats.py)."""
+    __tablename__ = "ESTATISTICAS_SENSOR"
+    id_sensor = db.Column(db.Integer, db.ForeignKey("SENSORES.id_sensor", ondelete="CASCADE"), primary_key=True)
+    qtd_leituras = db.Column(db.BigInteger, nullable=False, default=0, server_default="0")
+    ultimo_valor = db.Column(db.Float)
+    ultima_data_hora = db.Column(db.DateTime)
+
+class HistogramaLeitura(db.Model):
+    """Contagem por (feature, hora, faixa fixa) mantida na ingestão (ver app/drift.py)."""
+    __tablename__ = "HISTOGRAMAS_LEITURA"
+    feature = db.Column(db.String(50), primary_key=True)
+    hora = db.Column(db.DateTime, primary_key=True)
+    bin = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)
+    qtd = db.Column(db.BigInteger, nullable=False, default=0, server_default="0")
+
+class SketchLeitura(db.Model):
+    """Sketch de quantis por (sensor, hora): contagem por balde logarítmico (ver app/quantiles.py)."""
+    __tablename__ = "SKETCHES_LEITURA"
+    id_sensor = db.Column(db.Integer, db.ForeignKey("SENSORES.id_sensor", ondelete="CASCADE"), primary_key=True)
+    hora = db.Column(db.DateTime, primary_key=True)
+    bucket = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)
+    qtd = db.Column(db.BigInteger, nullable=False, default=0, server_default="0")
+
+class DriftAvaliacao(db.Model):
+    """Resultado periódico do monitor de drift (PSI/KS e taxas de qualidade por feature)."""
+    __tablename__ = "DRIFT_AVALIACOES"
+    id_avaliacao = db.Column(db.Integer, primary_key=True)
+    avaliado_em = db.Column(db.DateTime, nullable=False)
+    feature = db.Column(db.String(50), nullable=False)
+    janela_inicio = db.Column(db.DateTime)
+    janela_fim = db.Column(db.DateTime)
+    qtd_leituras = db.Column(db.BigInteger)
+    psi = db.Column(db.Float)
+    ks = db.Column(db.Float)
+    taxa_nulos = db.Column(db.Float)
+    taxa_fora_faixa = db.Column(db.Float)
+    taxa_fora_ref = db.Column(db.Float)
+    status = db.Column(db.String(20))                  # ok | atencao | drift | sem_dados | sem_ref
+    __table_args__ = (db.Index("IX_DRIFT_FEATURE_DATA", "feature", "avaliado_em"),)
 
 class Falha(db.Model):
     __tablename__ = "FALHAS"
     id_falha = db.Column(db.Integer, primary_key=True)
     id_peca = db.Column(db.Integer, db.ForeignKey("PECAS.id_peca"))
     descricao = db.Column(db.String(255))
-    data = db.Column(db.DateTime)
+    data = db.Column(db.DateTime)                      # abertura do incidente
+    # incidente coalescido (ver app/alerting.py)
+    id_sensor = db.Column(db.Integer, db.ForeignKey("SENSORES.id_sensor"))
+    status = db.Column(db.String(20))                  # aberta | em_andamento | resolvida
+    qtd_excedencias = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    valor_pico = db.Column(db.Float)
+    ultima_ocorrencia = db.Column(db.DateTime)
+    data_fim = db.Column(db.DateTime)                  # resolução
+    origem = db.Column(db.String(20))                  # leitura | api
+    sensor = db.relationship("Sensor")
+    peca = db.relationship("Peca")
+    __table_args__ = (
+        db.Index("IX_FALHAS_SENSOR_STATUS", "id_sensor", "status"),
+        # listagens paginadas por (data, id) — /api/failures e /api/alerts
+        db.Index("IX_FALHAS_DATA", "data", "id_falha"),
+        db.Index("IX_FALHAS_PECA_DATA", "id_peca", "data", "id_falha"),
+        db.Index("IX_FALHAS_SENSOR_DATA", "id_sensor", "data", "id_falha"),
+    )
 
 class Alerta(db.Model):
     __tablename__ = "ALERTAS"
     id_alerta = db.Column(db.Integer, primary_key=True)
     id_falha = db.Column(db.Integer, db.ForeignKey("FALHAS.id_falha"))
     nivel_risco = db.Column(db.String(20))
+    falha = db.relationship("Falha")
+    __table_args__ = (db.Index("IX_ALERTAS_NIVEL", "nivel_risco", "id_falha"),)
+
+class Predicao(db.Model):
+    """Histórico compacto de previsões por peça, gravado pelo scorer periódico (ver app/scoring.py)."""
+    __tablename__ = "PREDICOES"
+    id_predicao = db.Column(db.Integer, primary_key=True)
+    id_peca = db.Column(db.Integer, db.ForeignKey("PECAS.id_peca", ondelete="CASCADE"), nullable=False)
+    data = db.Column(db.DateTime, nullable=False)       # instante avaliado
+    estado = db.Column(db.String(20))
+    prob_falha = db.Column(db.Float)                    # falha nas próximas 24h
+    versao_modelo = db.Column(db.String(16))
+    __table_args__ = (db.Index("IX_PREDICOES_PECA_DATA", "id_peca", "data"),)
@@ -0,0 +1,213 @@
+# app/profiling.py
+"""
+Profiling sob demanda de UMA requisição.
+
+Ativação (Config / env):
+    PROFILE_ENABLED=1                 -> liga o mecanismo (default: desligado)
+    PROFILE_DIR=/tmp/profiles         -> onde gravar os arquivos
+    PROFILE_ALLOWED_IPS=127.0.0.1     -> clientes autorizados (separados por vírgula)
+    PROFILE_MODE=sample|cprofile      -> amostragem de pilhas ou cProfile determinístico
+    PROFILE_SAMPLE_INTERVAL_MS=2      -> intervalo entre amostras (modo sample)
+
+Disparo (por requisição):
+    header  X-Profile: 1     ou     query  ?_profile=1            (modo default)
+    header  X-Profile: cprofile  ou query  ?_profile=cprofile     (força o modo)
+
+Saída:
+    <id>.folded    -> pilhas colapsadas (flamegraph.pl / speedscope / inferno)
+    <id>.prof      -> estatísticas do cProfile (snakeviz / flameprof)
+    <id>.sql.json  -> SQL executado na requisição, com tempo de cada statement
+    Header da resposta: X-Profile-File (caminho do perfil)
+
+Sem disparo, o custo é só o teste do header no before_request; os listeners de SQL
+são registrados uma única vez, no primeiro disparo, e descartam tudo que não é
+da requisição perfilada.
+"""
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from pathlib import Path
+
+from flask import current_app, g, request
+from sqlalchemy import event
+
+from .extensions import db
+
+# lista de statements da requisição perfilada (None = não perfilando)
+_sql_log: ContextVar = ContextVar("profile_sql_log", default=None)
+_listeners_ready = set()
+_listeners_lock = threading.Lock()
+
+
+class StackSampler:
+    """Amostra a pilha de uma thread em intervalo fixo e acumula em formato 'folded'."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            # a própria thread do sampler nunca aparece aqui (amostramos a thread da requisição)
+            self.samples[";".join(reversed(stack))] += 1
+
+    def write(self, path: Path):
+        with open(path, "w", encoding="utf-8") as fh:
+            for stack, count in self.samples.most_common():
+                fh.write(f"{stack} {count}\n")
+
+
+def _client_allowed(cfg) -> bool:
+    allowed = {ip.strip() for ip in cfg["PROFILE_ALLOWED_IPS"].split(",") if ip.strip()}
+    return "*" in allowed or request.remote_addr in allowed
+
+
+def _requested_mode(cfg):
+    flag = request.headers.get("X-Profile") or request.args.get("_profile")
+    if not flag or flag in ("0", "false"):
+        return None
+    if flag in ("sample", "cprofile"):
+        return flag
+    return cfg["PROFILE_MODE"]
+
+
+def _attach_sql_listeners(engine, bind):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _sql_log.get() is not None:
+            context._profile_t0 = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        log = _sql_log.get()
+        if log is None:
+            return
+        t0 = getattr(context, "_profile_t0", None) or time.perf_counter()
+        log.append({
+            "bind": bind,
+            "statement": statement,
+            "parameters": repr(parameters)[:500],
+            "executemany": executemany,
+            "ms": round((time.perf_counter() - t0) * 1000, 3),
+        })
+
+
+def _ensure_sql_listeners():
+    """Listeners em todos os engines do app (principal e réplica das rotas @read_replica)."""
+    engines = db.engines
+    if all(id(e) in _listeners_ready for e in engines.values()):
+        return
+    with _listeners_lock:
+        for bind, engine in engines.items():
+            if id(engine) in _listeners_ready:
+                continue
+            _attach_sql_listeners(engine, bind or "default")
+            _listeners_ready.add(id(engine))
+
+
+def _start_profile():
+    cfg = current_app.config
+    mode = _requested_mode(cfg)
+    if mode is None or not _client_allowed(cfg):
+        return
+
+    _ensure_sql_listeners()
+    g._profile = {
+        "id": f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}",
+        "mode": mode,
+        "sql": [],
+        "t0": time.perf_counter(),
+    }
+    g._profile["token"] = _sql_log.set(g._profile["sql"])
+
+    if mode == "cprofile":
+        import cProfile
+        prof = cProfile.Profile()
+        prof.enable()
+    else:
+        interval = float(cfg["PROFILE_SAMPLE_INTERVAL_MS"]) / 1000.0
+        prof = StackSampler(threading.get_ident(), interval)
+        prof.start()
+    g._profile["profiler"] = prof
+
+
+def _finish_profile(response):
+    info = g.pop("_profile", None)
+    if info is None:
+        return response
+
+    prof = info["profiler"]
+    if info["mode"] == "cprofile":
+        prof.disable()
+    else:
+        prof.stop()
+    _sql_log.reset(info["token"])
+    wall_ms = round((time.perf_counter() - info["t0"]) * 1000, 3)
+
+    out_dir = Path(current_app.config["PROFILE_DIR"])
+    out_dir.mkdir(parents=True, exist_ok=True)
+    base = out_dir / info["id"]
+    if info["mode"] == "cprofile":
+        profile_path = base.with_suffix(".prof")
+        prof.dump_stats(profile_path)
+    else:
+        profile_path = base.with_suffix(".folded")
+        prof.write(profile_path)
+
+    with open(base.with_suffix(".sql.json"), "w", encoding="utf-8") as fh:
+        json.dump({
+            "method": request.method,
+            "path": request.full_path,
+            "status": response.status_code,
+            "wall_ms": wall_ms,
+            "sql_ms": round(sum(s["ms"] for s in info["sql"]), 3),
+            "statements": info["sql"],
+        }, fh, ensure_ascii=False, indent=2)
+
+    response.headers["X-Profile-File"] = str(profile_path)
+    response.headers["X-Profile-Id"] = info["id"]
+    return response
+
+
+def _abort_profile(exc):
+    # exceção não tratada: after_request não roda, mas o profiler precisa parar
+    info = g.pop("_profile", None)
+    if info is None:
+        return
+    if info["mode"] == "cprofile":
+        info["profiler"].disable()
+    else:
+        info["profiler"].stop()
+    _sql_log.reset(info["token"])
+
+
+def init_profiling(app):
+    """Registra os hooks apenas se PROFILE_ENABLED estiver ligado."""
+    if not app.config.get("PROFILE_ENABLED"):
+        return
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
+    app.teardown_request(_abort_profile)
@@ -0,0 +1,221 @@
+# app/quantiles.py
+"""
+Quantis aproximados por sensor (p50/p95/p99 em janelas arbitrárias) sem ordenar LEITURAS_SENSOR.
+
+Sketch logarítmico mesclável (estilo DDSketch) por (sensor, hora) em SKETCHES_LEITURA:
+cada leitura cai no balde k = ceil(log_γ |v|) (γ = (1+α)/(1-α)) e o balde guarda só a
+contagem. Mesclar horas/sensores = somar contagens do mesmo balde, então a consulta é um
+SUM ... GROUP BY balde sobre (sensores x horas x baldes ocupados), independente do nº de
+leituras. Erro relativo do quantil <= QUANTILE_ALPHA (valores com |v| < 1e-3 viram 0).
+
+    balde = sinal(v) * (ceil(log_γ |v|) + K0)   -> a ordem dos baldes é a ordem dos valores
+                                                   (negativos < 0 < positivos)
+
+- Ingestão: bump_sketches (chamada por app.ingest, junto com stats e drift): O(1) por
+  leitura + um upsert por (sensor, hora, balde) do lote
+- Recuperação/histórico: `python -m app.quantiles --rebuild [--desde ISO] [--ate ISO]`
+  apaga e recalcula as horas do intervalo lendo LEITURAS_SENSOR em blocos (rode para
+  horas sem ingestão em andamento: leituras gravadas durante o rebuild podem contar 2x)
+- Consulta: quantiles(...) / GET /api/readings/quantiles; a janela é alinhada a horas cheias
+
+Ambiente (opcional):
+    QUANTILES_ENABLED=1
+    QUANTILE_ALPHA=0.01     (mudar o α invalida os sketches gravados: rode --rebuild)
+"""
+import argparse
+import math
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import delete, func, select
+
+from .extensions import db
+from .models import Leitura, Sensor, SketchLeitura
+from .sqlutils import dialect_insert
+
+QUANTILES_ENABLED = os.getenv("QUANTILES_ENABLED", "1") == "1"
+ALPHA = float(os.getenv("QUANTILE_ALPHA", "0.01"))
+GAMMA = (1 + ALPHA) / (1 - ALPHA)
+LOG_GAMMA = math.log(GAMMA)
+MIN_ABS = 1e-3
+K0 = -math.ceil(math.log(MIN_ABS) / LOG_GAMMA) + 1   # |v| = MIN_ABS -> balde 1
+DEFAULT_QS = (0.5, 0.95, 0.99)
+REBUILD_CHUNK = 50_000
+
+SKETCHES = SketchLeitura.__table__
+
+
+def bucket_of(valor: float) -> int:
+    if valor != valor:          # NaN
+        return None
+    a = abs(valor)
+    if a < MIN_ABS:
+        return 0
+    k = math.ceil(math.log(a) / LOG_GAMMA) + K0
+    return k if valor > 0 else -k
+
+
+def buckets_of(valores: np.ndarray) -> np.ndarray:
+    """Versão vetorizada de bucket_of (sem NaN)."""
+    a = np.abs(valores)
+    with np.errstate(divide="ignore"):
+        k = np.ceil(np.log(np.maximum(a, MIN_ABS)) / LOG_GAMMA).astype(np.int64) + K0
+    k[a < MIN_ABS] = 0
+    return np.where(valores < 0, -k, k)
+
+
+def value_of(bucket: int) -> float:
+    """Representante do balde: erro relativo <= ALPHA para qualquer valor dentro dele."""
+    if bucket == 0:
+        return 0.0
+    i = abs(bucket) - K0
+    v = 2 * GAMMA ** i / (GAMMA + 1)
+    return v if bucket > 0 else -v
+
+
+def quantiles_from(counts: dict, qs=DEFAULT_QS) -> dict:
+    """{balde: qtd} mesclado -> {q: valor}; rank = q * (n - 1), como np.quantile(method="lower")."""
+    n = sum(counts.values())
+    if not n:
+        return {q: None for q in qs}
+    keys = sorted(counts)
+    acc = np.cumsum([counts[k] for k in keys])
+    out = {}
+    for q in qs:
+        i = int(np.searchsorted(acc, q * (n - 1), side="right"))
+        out[q] = round(value_of(keys[min(i, len(keys) - 1)]), 4)
+    return out
+
+
+def _hora(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def _upsert(conn, params: list) -> None:
+    ins, novo = dialect_insert(conn, SKETCHES)
+    soma = SKETCHES.c.qtd + novo.qtd
+    if conn.dialect.name == "mysql":
+        stmt = ins.on_duplicate_key_update(qtd=soma)
+    else:
+        t = SKETCHES.c
+        stmt = ins.on_conflict_do_update(index_elements=[t.id_sensor, t.hora, t.bucket], set_={"qtd": soma})
+    conn.execute(stmt, params)
+
+
+def bump_sketches(conn, rows: list) -> None:
+    """Soma o lote aos sketches horários (um upsert executemany por (sensor, hora, balde))."""
+    if not QUANTILES_ENABLED or not rows:
+        return
+    cont = Counter()
+    for r in rows:
+        v, ts = r["leitura_valor"], r["leitura_data_hora"]
+        if v is None or ts is None:
+            continue
+        b = bucket_of(float(v))
+        if b is not None:
+            cont[(r["id_sensor"], _hora(ts), b)] += 1
+    if cont:
+        # ordem fixa de chave: writers concorrentes travam as linhas na mesma sequência
+        _upsert(conn, [{"id_sensor": s, "hora": h, "bucket": b, "qtd": cont[(s, h, b)]}
+                       for s, h, b in sorted(cont)])
+
+
+def rebuild(desde: datetime = None, ate: datetime = None) -> int:
+    """Recalcula as horas [desde, ate) a partir de LEITURAS_SENSOR. Retorna nº de leituras."""
+    desde = _hora(desde) if desde else None
+    if ate is not None and ate != _hora(ate):
+        ate = _hora(ate) + timedelta(hours=1)
+    filtros = [Leitura.leitura_valor.isnot(None), Leitura.leitura_data_hora.isnot(None)]
+    apagar = []
+    if desde is not None:
+        filtros.append(Leitura.leitura_data_hora >= desde)
+        apagar.append(SketchLeitura.hora >= desde)
+    if ate is not None:
+        filtros.append(Leitura.leitura_data_hora < ate)
+        apagar.append(SketchLeitura.hora < ate)
+    db.session.execute(delete(SketchLeitura).where(*apagar))
+
+    conn = db.session.connection()
+    stmt = (select(Leitura.id_sensor, Leitura.leitura_valor, Leitura.leitura_data_hora)
+            .where(*filtros).execution_options(yield_per=REBUILD_CHUNK))
+    total = 0
+    for part in conn.execute(stmt).partitions(REBUILD_CHUNK):
+        ids = np.fromiter((r[0] for r in part), dtype=np.int64, count=len(part))
+        vals = np.fromiter((float(r[1]) for r in part), dtype=float, count=len(part))
+        horas = np.array([_hora(r[2]) for r in part], dtype="datetime64[us]")
+        keys = buckets_of(vals)
+        # agrega o bloco: (sensor, hora, balde) únicos + contagem
+        uniq, qtd = np.unique(np.rec.fromarrays([ids, horas, keys]), return_counts=True)
+        _upsert(conn, [{"id_sensor": int(u[0]), "hora": u[1].astype(datetime), "bucket": int(u[2]),
+                        "qtd": int(c)} for u, c in zip(uniq, qtd)])
+        total += len(part)
+    db.session.commit()
+    return total
+
+
+def quantiles(inicio: datetime, fim: datetime, qs=DEFAULT_QS, id_sensor: int = None,
+              id_peca: int = None, por_peca: bool = False) -> list:
+    """
+    Quantis por sensor (ou por peça + tipo de sensor, com por_peca) nas horas que
+    intersectam [inicio, fim). Custo: baldes ocupados, não leituras.
+    """
+    from .drift import feature_for
+
+    q = (
+        db.session.query(SketchLeitura.id_sensor, SketchLeitura.bucket, func.sum(SketchLeitura.qtd))
+        .filter(SketchLeitura.hora >= _hora(inicio), SketchLeitura.hora < fim)
+    )
+    if id_sensor is not None:
+        q = q.filter(SketchLeitura.id_sensor == id_sensor)
+    if id_peca is not None:
+        q = q.join(Sensor, Sensor.id_sensor == SketchLeitura.id_sensor).filter(Sensor.id_peca == id_peca)
+    por_sensor = {}
+    for s, b, qtd in q.group_by(SketchLeitura.id_sensor, SketchLeitura.bucket):
+        por_sensor.setdefault(s, Counter())[b] += int(qtd)
+
+    sensores = {s.id_sensor: s for s in
+                db.session.query(Sensor).filter(Sensor.id_sensor.in_(list(por_sensor)))} if por_sensor else {}
+    grupos = {}
+    for s, counts in por_sensor.items():
+        sensor = sensores.get(s)
+        tipo = sensor.tipo_sensor if sensor else None
+        if por_peca:
+            chave = (sensor.id_peca if sensor else None, feature_for(tipo))
+            g = grupos.setdefault(chave, {"id_peca": chave[0], "feature": chave[1], "sensores": [], "_c": Counter()})
+            g["sensores"].append(s)
+        else:
+            g = grupos.setdefault(s, {"id_sensor": s, "id_peca": sensor.id_peca if sensor else None,
+                                      "tipo_sensor": tipo, "_c": Counter()})
+        g["_c"].update(counts)
+
+    out = []
+    for chave in sorted(grupos, key=str):
+        g = grupos[chave]
+        counts = g.pop("_c")
+        g["qtd"] = sum(counts.values())
+        g["quantis"] = {f"p{q * 100:g}": v for q, v in quantiles_from(counts, qs).items()}
+        out.append(g)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Reconstrói os sketches de quantis a partir de LEITURAS_SENSOR.")
+    ap.add_argument("--rebuild", action="store_true", help="apaga e recalcula as horas do intervalo")
+    ap.add_argument("--desde", help="ISO 8601 (default: desde a primeira leitura)")
+    ap.add_argument("--ate", help="ISO 8601 (default: até a última leitura)")
+    args = ap.parse_args()
+    if not args.rebuild:
+        ap.error("nada a fazer: use --rebuild")
+
+    from .factory import create_cli_app
+    app = create_cli_app()
+    with app.app_context():
+        n = rebuild(datetime.fromisoformat(args.desde) if args.desde else None,
+                    datetime.fromisoformat(args.ate) if args.ate else None)
+        print(f"[quantis] sketches recalculados a partir de {n} leitura(s) (α={ALPHA})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+# app/scoring.py
+"""
+Scorer periódico: histórico de previsões por peça em PREDICOES.
+
+- Features de TODAS as peças com consultas set-based (piece_features): uma agregação
+  por tipo de sensor na janela (média de temperatura/vibração), o último valor só para as
+  peças sem leitura na janela e os totais de uso/ciclos mantidos em PECAS. É a mesma
+  montagem de /api/predict/snapshot
+- Uma inferência em lote por modelo (predict_state_batch / predict_failure_24h_batch)
+- Deduplicação: a peça só ganha linha nova quando o estado ou a versão do modelo mudam,
+  a probabilidade anda >= PRED_DELTA_PROB desde a última linha gravada ou passaram
+  PRED_HEARTBEAT_MIN minutos (ponto de vida para os gráficos). Entre duas linhas vale a
+  anterior (série em degraus)
+- Inserção em massa (um executemany) e descarte além de PRED_RETENCAO_D dias
+- Modelos trocados em disco (treino/incremental) são recarregados na rodada seguinte
+
+Como rodar (agendado):
+    python -m app.scoring --loop 300
+
+GET /api/predictions/history?id_peca=12 devolve a série reduzida a ?pontos= baldes e as
+transições de estado exatas (ex.: quando a peça 12 ficou Crítica).
+
+Ambiente (opcional):
+    PRED_TEMP_MIN=15   PRED_VIB_MIN=5          janelas das médias (minutos)
+    PRED_DELTA_PROB=0.02   PRED_HEARTBEAT_MIN=60   PRED_RETENCAO_D=180
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, delete, func, insert, select
+
+from .extensions import db
+from .models import Ciclo, Leitura, Peca, Predicao, Sensor
+
+TEMP_MIN = int(os.getenv("PRED_TEMP_MIN", "15"))
+VIB_MIN = int(os.getenv("PRED_VIB_MIN", "5"))
+DELTA_PROB = float(os.getenv("PRED_DELTA_PROB", "0.02"))
+HEARTBEAT_MIN = int(os.getenv("PRED_HEARTBEAT_MIN", "60"))
+RETENCAO_D = int(os.getenv("PRED_RETENCAO_D", "180"))
+MAX_PONTOS = 2000
+
+GRAVIDADE = {"Saudável": 0, "Desgastada": 1, "Crítica": 2}   # pior estado do balde no downsampling
+PREDICOES = Predicao.__table__
+
+
+# ---------------- features ----------------
+def _medias(tipo_like: str, desde: datetime) -> dict:
+    """id_peca -> média das leituras dos sensores do tipo desde `desde` (uma agregação)."""
+    rows = (
+        db.session.query(Sensor.id_peca, func.avg(Leitura.leitura_valor))
+        .join(Sensor, Sensor.id_sensor == Leitura.id_sensor)
+        .filter(Sensor.tipo_sensor.ilike(tipo_like), Leitura.leitura_data_hora >= desde)
+        .group_by(Sensor.id_peca)
+    )
+    return {p: float(v) for p, v in rows if v is not None}
+
+
+def _ultimos(tipo_like: str, pecas: list) -> dict:
+    """id_peca -> última leitura dos sensores do tipo (fallback das peças sem leitura na janela)."""
+    if not pecas:
+        return {}
+    do_tipo = and_(Sensor.id_sensor == Leitura.id_sensor, Sensor.tipo_sensor.ilike(tipo_like))
+    ult = (
+        select(Sensor.id_peca, func.max(Leitura.leitura_data_hora).label("data"))
+        .join(Sensor, do_tipo)
+        .where(Sensor.id_peca.in_(pecas))
+        .group_by(Sensor.id_peca)
+        .subquery()
+    )
+    rows = (
+        db.session.query(Sensor.id_peca, Leitura.leitura_valor)
+        .join(Sensor, do_tipo)
+        .join(ult, and_(ult.c.id_peca == Sensor.id_peca, ult.c.data == Leitura.leitura_data_hora))
+    )
+    out = {}
+    for p, v in rows:
+        if v is not None:
+            out.setdefault(p, float(v))
+    return out
+
+
+def _feature(tipo_like: str, minutos: int, ids: list, agora: datetime) -> dict:
+    valores = _medias(tipo_like, agora - timedelta(minutes=minutos))
+    return valores | _ultimos(tipo_like, [i for i in ids if i not in valores])
+
+
+def piece_features(agora: datetime = None, temp_min: int = TEMP_MIN, vib_min: int = VIB_MIN) -> list:
+    """
+    [(Peca, payload)] de todas as peças, em ordem de id_peca; payload no formato dos modelos
+    (tempo_uso, ciclos, temperatura, vibracao). Sem leitura nenhuma do tipo -> 0.0.
+    tempo_uso (min) e ciclos: totais de ciclos fechados em PECAS + o ciclo aberto.
+    """
+    agora = agora or datetime.utcnow()
+    pecas = (
+        db.session.query(Peca, Ciclo.data_inicio)
+        .outerjoin(Ciclo, Ciclo.id_ciclo == Peca.id_ciclo_aberto)
+        .order_by(Peca.id_peca)
+        .all()
+    )
+    ids = [p.id_peca for p, _ in pecas]
+    temperatura = _feature("%temper%", temp_min, ids, agora)
+    vibracao = _feature("%vibra%", vib_min, ids, agora)
+
+    out = []
+    for p, inicio_aberto in pecas:
+        total = p.tempo_uso_total or 0
+        ciclos = p.qtd_ciclos or 0
+        if p.id_ciclo_aberto is not None:
+            ciclos += 1
+            if inicio_aberto:
+                total += int((agora - inicio_aberto).total_seconds() // 60)
+        out.append((p, {
+            "tempo_uso": float(total),
+            "ciclos": float(ciclos),
+            "temperatura": temperatura.get(p.id_peca, 0.0),
+            "vibracao": vibracao.get(p.id_peca, 0.0),
+        }))
+    return out
+
+
+# ---------------- scorer ----------------
+def _ultimas_gravadas() -> dict:
+    """id_peca -> última linha de PREDICOES (data, estado, prob_falha, versao_modelo)."""
+    ult = (
+        select(Predicao.id_peca, func.max(Predicao.data).label("data"))
+        .group_by(Predicao.id_peca)
+        .subquery()
+    )
+    rows = db.session.execute(
+        select(Predicao.id_peca, Predicao.data, Predicao.estado, Predicao.prob_falha, Predicao.versao_modelo)
+        .join(ult, and_(ult.c.id_peca == Predicao.id_peca, ult.c.data == Predicao.data))
+    )
+    return {r.id_peca: r for r in rows}
+
+
+def _mudou(ult, row: dict) -> bool:
+    if ult is None:
+        return True
+    return (
+        ult.estado != row["estado"]
+        or ult.versao_modelo != row["versao_modelo"]
+        or ult.prob_falha is None
+        or abs(row["prob_falha"] - ult.prob_falha) >= DELTA_PROB
+        or row["data"] - ult.data >= timedelta(minutes=HEARTBEAT_MIN)
+    )
+
+
+def score(agora: datetime = None) -> dict:
+    """Pontua todas as peças, grava o que mudou em PREDICOES e aplica a retenção."""
+    from .ml import predict
+
+    agora = (agora or datetime.utcnow()).replace(microsecond=0)
+    if predict.reload_if_changed():
+        print("[scoring] modelos alterados em disco: recarregados")
+    feats = piece_features(agora)
+    payloads = [payload for _, payload in feats]
+    estados = predict.predict_state_batch(payloads)
+    falhas = predict.predict_failure_24h_batch(payloads, 0.5)
+    versao = predict.model_version()
+
+    ultimas = _ultimas_gravadas()
+    rows = []
+    for (p, _), est, falha in zip(feats, estados, falhas):
+        row = {"id_peca": p.id_peca, "data": agora, "estado": str(est["estado"]),
+               "prob_falha": round(float(falha["prob"]), 6), "versao_modelo": versao}
+        if _mudou(ultimas.get(p.id_peca), row):
+            rows.append(row)
+    if rows:
+        db.session.execute(insert(PREDICOES), rows)
+    db.session.execute(delete(Predicao).where(Predicao.data < agora - timedelta(days=RETENCAO_D)))
+    db.session.commit()
+    return {"data": agora.isoformat(), "pecas": len(feats), "gravadas": len(rows), "versao_modelo": versao}
+
+
+# ---------------- consulta ----------------
+def _ponto(r) -> dict:
+    return {"data": r.data.isoformat(), "estado": r.estado, "prob_falha": r.prob_falha,
+            "versao_modelo": r.versao_modelo}
+
+
+def history(id_peca: int, inicio: datetime, fim: datetime, pontos: int = 200) -> dict:
+    """
+    Série de PREDICOES da peça em [inicio, fim] reduzida a até `pontos` baldes de mesma
+    largura: por balde, pior estado, maior e última probabilidade e nº de linhas. As
+    transições de estado saem das linhas brutas (exatas, não reduzidas); `inicial` é a
+    última linha antes de `inicio` (estado vigente no começo da janela).
+    """
+    pontos = max(1, min(pontos, MAX_PONTOS))
+    cols = (Predicao.data, Predicao.estado, Predicao.prob_falha, Predicao.versao_modelo)
+    inicial = db.session.execute(
+        select(*cols).where(Predicao.id_peca == id_peca, Predicao.data < inicio)
+        .order_by(Predicao.data.desc()).limit(1)
+    ).first()
+    rows = db.session.execute(
+        select(*cols).where(Predicao.id_peca == id_peca, Predicao.data.between(inicio, fim))
+        .order_by(Predicao.data)
+    ).all()
+
+    passo = max((fim - inicio) / pontos, timedelta(seconds=1))
+    baldes, transicoes = [], []
+    anterior = inicial.estado if inicial else None
+    for r in rows:
+        if r.estado != anterior and anterior is not None:
+            transicoes.append({"data": r.data.isoformat(), "de": anterior, "para": r.estado})
+        anterior = r.estado
+        b = int((r.data - inicio) / passo)
+        if not baldes or baldes[-1]["_b"] != b:
+            baldes.append({"_b": b, "data": (inicio + b * passo).isoformat(timespec="seconds"),
+                           "estado": r.estado, "prob_max": r.prob_falha, "prob_ultima": r.prob_falha,
+                           "versao_modelo": r.versao_modelo, "n": 0})
+        cur = baldes[-1]
+        if GRAVIDADE.get(r.estado, -1) > GRAVIDADE.get(cur["estado"], -1):
+            cur["estado"] = r.estado
+        if r.prob_falha is not None and (cur["prob_max"] is None or r.prob_falha > cur["prob_max"]):
+            cur["prob_max"] = r.prob_falha
+        cur["prob_ultima"] = r.prob_falha
+        cur["versao_modelo"] = r.versao_modelo
+        cur["n"] += 1
+    for b in baldes:
+        del b["_b"]
+
+    return {
+        "id_peca": id_peca,
+        "inicio": inicio.isoformat(),
+        "fim": fim.isoformat(),
+        "passo_s": passo.total_seconds(),
+        "linhas": len(rows),
+        "inicial": _ponto(inicial) if inicial else None,
+        "pontos": baldes,
+        "transicoes": transicoes,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Pontua todas as peças e grava o histórico de previsões (PREDICOES).")
+    ap.add_argument("--loop", type=float, default=0, help="repete a cada N segundos (0 = uma vez)")
+    args = ap.parse_args()
+
+    from .factory import create_cli_app
+    app = create_cli_app()
+    while True:
+        with app.app_context():
+            r = score()
+            print(f"[scoring] {r['data']} peças={r['pecas']} gravadas={r['gravadas']} modelo={r['versao_modelo']}")
+        if not args.loop:
+            break
+        time.sleep(args.loop)
+
+
+if __name__ == "__main__":
+    main()
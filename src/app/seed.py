@@ -3,7 +3,7 @@ import time
 from sqlalchemy import text
 from sqlalchemy.exc import OperationalError
 from flask import current_app
-from .wsgi import app
+from .factory import create_cli_app
 from .extensions import db
 from .models import Peca, Sensor
 
@@ -14,6 +14,8 @@ PEÇAS_PADRÃO = [
 ]
 TIPOS_SENSORES = ["vibracao", "temperatura"]
 
+app = create_cli_app()     # só banco: sem admin/blueprints/ML (ver app/factory.py)
+
 def wait_for_db(max_tries=30, sleep=2):
     for i in range(max_tries):
         try:
@@ -0,0 +1,252 @@
+# app/sqlite_edge.py
+"""
+Perfil SQLite para gateways de borda (vários workers do gunicorn escrevendo no mesmo arquivo).
+
+Aplicado por app.dbrouting a todo engine SQLite de arquivo (e pelo app.gateway):
+
+- Pragmas na conexão: journal_mode=WAL (leitores não bloqueiam o writer e vice-versa),
+  synchronous=NORMAL (fsync só no checkpoint; um crash perde no máximo as últimas
+  transações, nunca corrompe), cache_size, mmap_size, busy_timeout, temp_store=MEMORY
+- BEGIN adiado até o 1º statement da transação. Só leitura: BEGIN comum, sem fila — no
+  WAL leitores não bloqueiam o writer nem esperam por ele (rotas GET, snapshot, export)
+- Fila de writer única: o 1º INSERT/UPDATE/DELETE/DDL da transação pega o lock da fila
+  (threading.Lock no processo + fcntl.lockf entre processos, em <banco>.writer.lock) e
+  abre BEGIN IMMEDIATE. Os workers esperam na fila do kernel em vez de disputar o lock do
+  SQLite com sleep/retry -> sem "database is locked". Transação que leu antes de escrever
+  tem o snapshot de leitura fechado (COMMIT, nada foi escrito) antes do BEGIN IMMEDIATE:
+  sem SQLITE_BUSY_SNAPSHOT no upgrade; as leituras anteriores valem como leitura sem lock
+  (mesma semântica do MySQL sem SELECT ... FOR UPDATE). O lock é solto logo após o
+  COMMIT/ROLLBACK
+- Checkpoint: o autocheckpoint do SQLite (no caminho do COMMIT) fica desligado; quem
+  comita faz um wal_checkpoint(PASSIVE) a cada SQLITE_CHECKPOINT_S, ainda dono da fila
+  (não compete com outro writer, não espera leitores). journal_size_limit corta o -wal
+  depois que ele é reciclado. Manutenção: `python -m app.sqlite_edge --checkpoint`
+  (TRUNCATE) ou `--info`
+
+Leituras fora da fila: aponte a réplica para o mesmo arquivo em modo somente leitura
+(rotas @read_replica, ver app/dbrouting.py); conexões ro recebem os pragmas mas não a fila:
+    DATABASE_REPLICA_URL="sqlite:///file:/dados/local.db?mode=ro&uri=true"
+
+Uma segunda conexão de escrita aberta pela MESMA thread enquanto ela já é dona da fila
+(ex.: engine.connect() dentro de uma transação da sessão) não entra na fila: começa com
+BEGIN comum e, se tentar escrever, espera o busy_timeout.
+
+Ambiente (opcional):
+    SQLITE_EDGE=1                 (0 = comportamento padrão do pysqlite)
+    SQLITE_SYNCHRONOUS=NORMAL     SQLITE_CACHE_MB=64      SQLITE_MMAP_MB=256
+    SQLITE_BUSY_TIMEOUT_MS=5000   SQLITE_CHECKPOINT_S=30  SQLITE_WAL_LIMIT_MB=64
+
+Comparação com o padrão (journal de rollback, sem fila): python -m app.bench.sqlite_ingest
+"""
+import argparse
+import fcntl
+import os
+import threading
+import time
+
+from sqlalchemy import event
+
+SQLITE_EDGE = os.getenv("SQLITE_EDGE", "1") == "1"
+SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+CACHE_MB = int(os.getenv("SQLITE_CACHE_MB", "64"))
+MMAP_MB = int(os.getenv("SQLITE_MMAP_MB", "256"))
+BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+CHECKPOINT_S = float(os.getenv("SQLITE_CHECKPOINT_S", "30"))
+WAL_LIMIT_MB = int(os.getenv("SQLITE_WAL_LIMIT_MB", "64"))
+
+
+def pragmas(readonly: bool = False) -> list:
+    out = [
+        f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+        f"PRAGMA cache_size = {-CACHE_MB * 1024}",      # negativo = KiB
+        f"PRAGMA mmap_size = {MMAP_MB * 1024 * 1024}",
+        "PRAGMA temp_store = MEMORY",
+    ]
+    if not readonly:
+        out += [
+            "PRAGMA journal_mode = WAL",                 # persistente no arquivo
+            f"PRAGMA synchronous = {SYNCHRONOUS}",
+            "PRAGMA wal_autocheckpoint = 0",             # checkpoint feito por _checkpoint
+            f"PRAGMA journal_size_limit = {WAL_LIMIT_MB * 1024 * 1024}",
+        ]
+    return out
+
+
+class WriterQueue:
+    """Um writer por vez no arquivo: lock local (threads) + fcntl.lockf (processos)."""
+
+    def __init__(self, db_path: str):
+        self.lock_path = db_path + ".writer.lock"
+        self._mutex = threading.Lock()
+        self._fd = None
+        self._owner = None
+        self.last_checkpoint = time.monotonic()
+
+    def held_by_current_thread(self) -> bool:
+        return self._owner == threading.get_ident()
+
+    def acquire(self):
+        self._mutex.acquire()
+        try:
+            if self._fd is None:
+                self._fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o666)
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+        except BaseException:
+            self._mutex.release()
+            raise
+        self._owner = threading.get_ident()
+
+    def release(self):
+        self._owner = None
+        fcntl.lockf(self._fd, fcntl.LOCK_UN)
+        self._mutex.release()
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def writer_queue(db_path: str) -> WriterQueue:
+    path = os.path.abspath(db_path)
+    with _queues_lock:
+        return _queues.setdefault(path, WriterQueue(path))
+
+
+def _db_file(url) -> tuple:
+    """(caminho do arquivo, somente leitura?) ou (None, _) para banco em memória."""
+    path = url.database or ""
+    query = dict(url.query)
+    if path.startswith("file:"):
+        path = path[len("file:"):]
+    if not path or path == ":memory:" or query.get("mode") == "memory":
+        return None, False
+    return path, query.get("mode") == "ro"
+
+
+_ESCRITA = ("INSERT", "UPDATE", "DELETE", "REPLACE", "CREATE", "DROP", "ALTER")
+
+
+def _escrita(statement: str, context) -> bool:
+    if context is not None and (context.isinsert or context.isupdate or context.isdelete or context.isddl):
+        return True
+    palavras = statement.split(None, 1)
+    return bool(palavras) and palavras[0].upper() in _ESCRITA
+
+
+def _checkpoint(dbapi_conn, queue: WriterQueue) -> None:
+    agora = time.monotonic()
+    if agora - queue.last_checkpoint >= CHECKPOINT_S:
+        queue.last_checkpoint = agora
+        dbapi_conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+
+
+def apply_sqlite_profile(engine) -> None:
+    """Pragmas + fila de writer + checkpoint periódico em `engine` (no-op fora de SQLite de arquivo)."""
+    if not SQLITE_EDGE or engine.dialect.name != "sqlite":
+        return
+    path, readonly = _db_file(engine.url)
+    if path is None:
+        return
+    queue = None if readonly else writer_queue(path)
+    comandos = pragmas(readonly)
+
+    @event.listens_for(engine, "connect")
+    def _pragmas(dbapi_conn, record):
+        dbapi_conn.isolation_level = None     # o BEGIN passa a ser emitido em _begin
+        for sql in comandos:
+            dbapi_conn.execute(sql).fetchall()
+
+    def _entrar_na_fila(conn, dbapi_conn, fechar_leitura: bool):
+        queue.acquire()
+        conn.info["fila_writer"] = True
+        try:
+            if fechar_leitura:
+                dbapi_conn.execute("COMMIT")     # transação só leu até aqui: nada a perder
+            dbapi_conn.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            conn.info.pop("fila_writer")
+            queue.release()
+            raise
+
+    # BEGIN adiado até o 1º statement: leitura -> BEGIN comum (WAL: não bloqueia nem espera
+    # o writer); escrita -> fila + BEGIN IMMEDIATE
+    @event.listens_for(engine, "before_cursor_execute")
+    def _begin(conn, cursor, statement, parameters, context, executemany):
+        if not conn.in_transaction():
+            return                               # autocommit explícito
+        dbapi_conn = conn.connection.dbapi_connection
+        fila = queue is not None and not conn.info.get("fila_writer") and not queue.held_by_current_thread()
+        if not dbapi_conn.in_transaction:
+            if fila and _escrita(statement, context):
+                _entrar_na_fila(conn, dbapi_conn, fechar_leitura=False)
+            else:
+                dbapi_conn.execute("BEGIN")
+        elif fila and _escrita(statement, context):
+            _entrar_na_fila(conn, dbapi_conn, fechar_leitura=True)
+
+    def _finish(conn, sql):
+        dbapi_conn = conn.connection.dbapi_connection
+        try:
+            if dbapi_conn.in_transaction:
+                dbapi_conn.execute(sql)          # o commit()/rollback() do driver vira no-op
+            if sql == "COMMIT" and conn.info.get("fila_writer"):
+                _checkpoint(dbapi_conn, queue)
+        finally:
+            if conn.info.pop("fila_writer", False) and not dbapi_conn.in_transaction:
+                queue.release()
+
+    @event.listens_for(engine, "commit")
+    def _commit(conn):
+        _finish(conn, "COMMIT")
+
+    @event.listens_for(engine, "rollback")
+    def _rollback(conn):
+        _finish(conn, "ROLLBACK")
+
+    # rede de segurança: conexão devolvida ao pool ou invalidada ainda dona da fila
+    @event.listens_for(engine, "checkin")
+    @event.listens_for(engine, "invalidate")
+    def _orphan(dbapi_conn, record, *exc):
+        if record is not None and record.info.pop("fila_writer", False):
+            try:
+                if dbapi_conn is not None and dbapi_conn.in_transaction:
+                    dbapi_conn.execute("ROLLBACK")
+            finally:
+                queue.release()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Manutenção do banco SQLite de borda.")
+    ap.add_argument("--checkpoint", action="store_true", help="wal_checkpoint(TRUNCATE): zera o -wal")
+    ap.add_argument("--info", action="store_true", help="mostra pragmas e tamanho do -wal")
+    args = ap.parse_args()
+
+    from .extensions import db
+    from .factory import create_cli_app
+    app = create_cli_app()
+    with app.app_context():
+        if db.engine.dialect.name != "sqlite" or _db_file(db.engine.url)[0] is None:
+            ap.error("DATABASE_URL não é um SQLite de arquivo")
+        path, _ = _db_file(db.engine.url)
+        raw = db.engine.raw_connection()      # fora de transação: checkpoint não roda dentro de uma
+        try:
+            cur = raw.cursor()
+            if args.checkpoint:
+                queue = writer_queue(path)
+                queue.acquire()               # espera o writer atual; leitores podem deixar parcial
+                try:
+                    busy, log, feitos = cur.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+                finally:
+                    queue.release()
+                print(f"[sqlite] checkpoint: {feitos}/{log} frames{' (leitores ativos: parcial)' if busy else ''}")
+            if args.info or not args.checkpoint:
+                for p in ("journal_mode", "synchronous", "cache_size", "mmap_size", "busy_timeout"):
+                    print(f"[sqlite] {p} = {cur.execute(f'PRAGMA {p}').fetchone()[0]}")
+                wal = path + "-wal"
+                tamanho = os.path.getsize(wal) / 2**20 if os.path.exists(wal) else 0.0
+                print(f"[sqlite] -wal: {tamanho:.1f} MiB")
+        finally:
+            raw.close()
+
+if __name__ == "__main__":
+    main()
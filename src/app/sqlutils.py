@@ -0,0 +1,49 @@
+# app/sqlutils.py
+"""Expressões SQL portáveis (MySQL / SQLite) usadas pelos statements set-based."""
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.types import Integer
+
+
+def dialect_insert(conn, table):
+    """
+    INSERT com upsert do dialeto da conexão -> (insert, referência aos valores novos).
+    Use `ins.on_duplicate_key_update(...)` (MySQL) ou `ins.on_conflict_do_update(...)` (SQLite).
+    """
+    dialeto = conn.dialect.name
+    if dialeto == "mysql":
+        from sqlalchemy.dialects.mysql import insert as upsert
+        ins = upsert(table)
+        return ins, ins.inserted
+    if dialeto == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as upsert
+        ins = upsert(table)
+        return ins, ins.excluded
+    raise NotImplementedError(f"upsert: dialeto {dialeto} não suportado")
+
+
+class minutes_between(FunctionElement):
+    """Minutos inteiros (truncados) entre dois DATETIME: minutes_between(inicio, fim)."""
+    type = Integer()
+    inherit_cache = True
+    name = "minutes_between"
+
+
+@compiles(minutes_between)
+def _minutes_between_default(element, compiler, **kw):
+    inicio, fim = list(element.clauses)
+    return "TIMESTAMPDIFF(MINUTE, %s, %s)" % (compiler.process(inicio, **kw), compiler.process(fim, **kw))
+
+
+def _sqlite_epoch_ms(expr: str) -> str:
+    # strftime('%s') -> segundos inteiros; '%f' -> "SS.SSS" (milissegundos)
+    return ("(CAST(strftime('%%s', %s) AS INTEGER) * 1000 + CAST(substr(strftime('%%f', %s), 4) AS INTEGER))"
+            % (expr, expr))
+
+
+@compiles(minutes_between, "sqlite")
+def _minutes_between_sqlite(element, compiler, **kw):
+    inicio, fim = list(element.clauses)
+    # divisão inteira = mesmo truncamento do Python (total_seconds() // 60)
+    return "((%s - %s) / 60000)" % (
+        _sqlite_epoch_ms(compiler.process(fim, **kw)), _sqlite_epoch_ms(compiler.process(inicio, **kw)))
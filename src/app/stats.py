@@ -0,0 +1,155 @@
+# app/stats.py
+"""
+Estatísticas mantidas por sensor (ESTATISTICAS_SENSOR): qtd de leituras, último valor
+e timestamp. Atualizadas na ingestão (bump_stats, chamada por app.ingest) com um
+upsert em lote por sensor; totais e visão por peça saem de SUM/GROUP BY nessa tabela
+pequena (junto com SENSORES), sem tocar em LEITURAS_SENSOR.
+
+Cargas fora da API (SQL manual, imports) e eventuais desvios são corrigidos pela
+reconciliação periódica (serviço "stats" do compose) ou sob demanda:
+    python -m app.stats --loop 3600
+    docker compose exec web python -m app.stats
+"""
+import argparse
+import time
+
+from sqlalchemy import case, func, insert, or_, select, update
+from .extensions import db
+from .models import EstatisticaSensor, Leitura, Sensor
+from .sqlutils import dialect_insert
+
+ESTATS = EstatisticaSensor.__table__
+
+
+def _agrupar(rows: list) -> list:
+    """Linhas de leitura -> um registro por sensor (qtd + leitura mais recente), ordenado por id."""
+    por_sensor = {}
+    for r in rows:
+        atual = por_sensor.get(r["id_sensor"])
+        if atual is None:
+            por_sensor[r["id_sensor"]] = {
+                "id_sensor": r["id_sensor"], "qtd_leituras": 1,
+                "ultimo_valor": r["leitura_valor"], "ultima_data_hora": r["leitura_data_hora"],
+            }
+            continue
+        atual["qtd_leituras"] += 1
+        if r["leitura_data_hora"] >= atual["ultima_data_hora"]:
+            atual["ultimo_valor"] = r["leitura_valor"]
+            atual["ultima_data_hora"] = r["leitura_data_hora"]
+    # ordem fixa de id: writers concorrentes travam as linhas na mesma sequência
+    return [por_sensor[k] for k in sorted(por_sensor)]
+
+
+def bump_stats(conn, rows: list) -> None:
+    """Soma o lote às estatísticas (INSERT ... ON DUPLICATE KEY / ON CONFLICT, executemany)."""
+    params = _agrupar(rows)
+    if not params:
+        return
+    t = ESTATS.c
+    ins, novo = dialect_insert(conn, ESTATS)
+
+    mais_recente = or_(t.ultima_data_hora.is_(None), t.ultima_data_hora <= novo.ultima_data_hora)
+    sets = [
+        ("qtd_leituras", t.qtd_leituras + novo.qtd_leituras),
+        # MySQL aplica as atribuições em ordem: valor antes do timestamp
+        ("ultimo_valor", case((mais_recente, novo.ultimo_valor), else_=t.ultimo_valor)),
+        ("ultima_data_hora", case((mais_recente, novo.ultima_data_hora), else_=t.ultima_data_hora)),
+    ]
+    if conn.dialect.name == "mysql":
+        stmt = ins.on_duplicate_key_update(sets)
+    else:
+        stmt = ins.on_conflict_do_update(index_elements=[t.id_sensor], set_=dict(sets))
+    conn.execute(stmt, params)
+
+
+def total_readings() -> int:
+    return int(db.session.query(func.coalesce(func.sum(EstatisticaSensor.qtd_leituras), 0)).scalar())
+
+
+def latest_by_sensor(id_peca: int = None) -> list:
+    q = (
+        db.session.query(Sensor.id_sensor, Sensor.id_peca, Sensor.tipo_sensor,
+                         EstatisticaSensor.qtd_leituras, EstatisticaSensor.ultimo_valor,
+                         EstatisticaSensor.ultima_data_hora)
+        .outerjoin(EstatisticaSensor, EstatisticaSensor.id_sensor == Sensor.id_sensor)
+    )
+    if id_peca is not None:
+        q = q.filter(Sensor.id_peca == id_peca)
+    return [
+        {
+            "id_sensor": r.id_sensor,
+            "id_peca": r.id_peca,
+            "tipo_sensor": r.tipo_sensor,
+            "qtd_leituras": int(r.qtd_leituras or 0),
+            "ultimo_valor": float(r.ultimo_valor) if r.ultimo_valor is not None else None,
+            "ultima_data_hora": r.ultima_data_hora.isoformat() if r.ultima_data_hora else None,
+        }
+        for r in q.order_by(Sensor.id_sensor)
+    ]
+
+
+def latest_by_piece(id_peca: int = None) -> list:
+    """Por peça: soma das leituras, última leitura entre os sensores e a lista de sensores."""
+    pecas = {}
+    for s in latest_by_sensor(id_peca):
+        p = pecas.setdefault(s["id_peca"], {"id_peca": s["id_peca"], "qtd_leituras": 0,
+                                            "ultima_data_hora": None, "ultimo_valor": None,
+                                            "id_sensor_ultimo": None, "sensores": []})
+        p["qtd_leituras"] += s["qtd_leituras"]
+        p["sensores"].append(s)
+        if s["ultima_data_hora"] and (p["ultima_data_hora"] is None or s["ultima_data_hora"] > p["ultima_data_hora"]):
+            p["ultima_data_hora"] = s["ultima_data_hora"]
+            p["ultimo_valor"] = s["ultimo_valor"]
+            p["id_sensor_ultimo"] = s["id_sensor"]
+    return list(pecas.values())
+
+
+def reconcile_stats() -> int:
+    """
+    Reconstrói as estatísticas a partir de LEITURAS_SENSOR: cria as linhas que faltam
+    e faz um UPDATE único com subqueries correlacionadas. Retorna nº de sensores.
+    Leituras gravadas durante a execução podem deixar desvio, corrigido na próxima rodada.
+    """
+    faltando = (
+        select(Sensor.id_sensor)
+        .where(~select(EstatisticaSensor.id_sensor)
+               .where(EstatisticaSensor.id_sensor == Sensor.id_sensor).exists())
+    )
+    db.session.execute(insert(EstatisticaSensor).from_select(["id_sensor"], faltando))
+
+    do_sensor = Leitura.id_sensor == EstatisticaSensor.id_sensor
+    qtd = select(func.count(Leitura.id_leitura)).where(do_sensor).scalar_subquery()
+    ultima = select(func.max(Leitura.leitura_data_hora)).where(do_sensor).scalar_subquery()
+    valor = (
+        select(Leitura.leitura_valor).where(do_sensor)
+        .order_by(Leitura.leitura_data_hora.desc(), Leitura.id_leitura.desc())
+        .limit(1).scalar_subquery()
+    )
+    n = db.session.execute(
+        update(EstatisticaSensor)
+        .values(qtd_leituras=qtd, ultima_data_hora=ultima, ultimo_valor=valor)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return n
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Reconstrói ESTATISTICAS_SENSOR a partir de LEITURAS_SENSOR.")
+    ap.add_argument("--loop", type=float, default=0, help="repete a cada N segundos (0 = uma vez)")
+    args = ap.parse_args()
+
+    from .factory import create_cli_app
+    app = create_cli_app()
+    while True:
+        with app.app_context():
+            n = reconcile_stats()
+            total = total_readings()
+        print(f"[stats] {n} sensores reconciliados; {total} leituras no total.")
+        if not args.loop:
+            break
+        time.sleep(args.loop)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+# app/udp_ingest.py
+"""
+Ingestão binária compacta para os ESP32 (UDP, com TCP opcional).
+
+Formato do quadro (little-endian, sem padding):
+
+    cabeçalho  8 bytes   magic b"LS" | versão u8 (=1) | n u8 (1..255) | id_dispositivo u32
+    registro  20 bytes   id_sensor u32 | epoch_ms i64 | valor f32 | seq u32     (x n)
+
+Um datagrama = um quadro (MAX_POR_DATAGRAMA=64 registros -> 1288 bytes, abaixo do MTU).
+No TCP cada quadro vem prefixado pelo tamanho (u16 little-endian).
+
+- Decodificação com struct.iter_unpack sobre memoryview (sem cópia do datagrama).
+- `seq` é um contador u32 por sensor (dá a volta em 2**32). Janela deslizante de 64
+  posições separa duplicadas (descartadas) de atrasadas (aceitas) e contabiliza lacunas.
+  Volta de JANELA posições ou mais só é reinício do dispositivo (seq recomeçou) se o
+  epoch_ms for posterior a tudo o que o sensor já mandou: a janela recomeça nesse seq
+  ("reinicios"). Sem essa evidência o registro é antigo/replay e é descartado ("antigas"),
+  assim como qualquer registro com epoch_ms anterior ao último reinício.
+- Quadros inválidos, sensores desconhecidos e valores NaN/inf são descartados e contados.
+- As leituras aceitas seguem para app.ingest.ingest_batch — o mesmo caminho de
+  /api/readings (insert em lote + motor de alertas + estado quente) — a cada UDP_FLUSH_MS.
+
+Como rodar:
+    docker compose up udp              (UDP 5003; TCP em UDP_TCP_PORT se > 0)
+    python -m app.udp_ingest
+
+Ambiente:
+    UDP_HOST (0.0.0.0)  UDP_PORT (5003)  UDP_TCP_PORT (0 = desligado)
+    UDP_FLUSH_MS (100)  UDP_BATCH_MAX (5000)  UDP_STATS_SECONDS (60)  UDP_SENSOR_REFRESH (30)
+"""
+import asyncio
+import math
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+MAGIC = b"LS"
+VERSION = 1
+HEADER = struct.Struct("<2sBBI")
+RECORD = struct.Struct("<IqfI")
+FRAME_LEN = struct.Struct("<H")
+MAX_POR_DATAGRAMA = 64
+JANELA = 64
+_SEQ_MOD = 1 << 32
+_EPOCH = datetime(1970, 1, 1)
+
+HOST = os.getenv("UDP_HOST", "0.0.0.0")
+PORT = int(os.getenv("UDP_PORT", "5003"))
+TCP_PORT = int(os.getenv("UDP_TCP_PORT", "0"))
+FLUSH_MS = float(os.getenv("UDP_FLUSH_MS", "100"))
+BATCH_MAX = int(os.getenv("UDP_BATCH_MAX", "5000"))
+STATS_SECONDS = float(os.getenv("UDP_STATS_SECONDS", "60"))
+SENSOR_REFRESH = float(os.getenv("UDP_SENSOR_REFRESH", "30"))
+
+
+# ---------------- protocolo ----------------
+def encode_frame(readings, id_dispositivo: int = 0) -> bytes:
+    """Encoder de referência: [(id_sensor, epoch_ms, valor, seq), ...] -> um quadro."""
+    n = len(readings)
+    if not 0 < n <= 255:
+        raise ValueError("um quadro leva de 1 a 255 registros")
+    buf = bytearray(HEADER.size + n * RECORD.size)
+    HEADER.pack_into(buf, 0, MAGIC, VERSION, n, id_dispositivo)
+    off = HEADER.size
+    for rec in readings:
+        RECORD.pack_into(buf, off, *rec)
+        off += RECORD.size
+    return bytes(buf)
+
+
+def encode_frames(readings, id_dispositivo: int = 0, per_frame: int = MAX_POR_DATAGRAMA) -> list:
+    """Divide em quadros que cabem num datagrama."""
+    return [encode_frame(readings[i:i + per_frame], id_dispositivo)
+            for i in range(0, len(readings), per_frame)]
+
+
+def decode_frame(data):
+    """
+    bytes/memoryview de UM quadro -> (id_dispositivo, iterador de registros).
+    ValueError se magic/versão/tamanho não batem.
+    """
+    mv = memoryview(data)
+    if len(mv) < HEADER.size:
+        raise ValueError("quadro menor que o cabeçalho")
+    magic, versao, n, id_dispositivo = HEADER.unpack_from(mv)
+    if magic != MAGIC or versao != VERSION:
+        raise ValueError("magic/versão desconhecidos")
+    fim = HEADER.size + n * RECORD.size
+    if n == 0 or len(mv) != fim:
+        raise ValueError(f"tamanho {len(mv)} não corresponde a {n} registros")
+    return id_dispositivo, RECORD.iter_unpack(mv[HEADER.size:fim])
+
+
+class SeqWindow:
+    """
+    Janela anti-replay por sensor (bitmap de JANELA posições atrás do maior seq visto).
+    `epoch_max` é o maior epoch_ms aceito; `inicio`, o epoch_ms do último reinício
+    (nada anterior a ele é aceito: são quadros da execução passada do dispositivo).
+    """
+    __slots__ = ("maior", "bitmap", "epoch_max", "inicio")
+
+    def __init__(self, seq: int, epoch_ms: int):
+        self.maior = seq
+        # o que veio antes do primeiro seq visto conta como já recebido (não vira lacuna)
+        self.bitmap = (1 << JANELA) - 1
+        self.epoch_max = epoch_ms
+        self.inicio = None
+
+    def accept(self, seq: int, epoch_ms: int, stats: dict) -> bool:
+        if self.inicio is not None and epoch_ms < self.inicio:
+            stats["antigas"] += 1
+            return False
+        avanco = (seq - self.maior) % _SEQ_MOD
+        if 0 < avanco < _SEQ_MOD // 2:
+            stats["lacunas"] += avanco - 1
+            self.bitmap = ((self.bitmap << avanco) | 1) & ((1 << JANELA) - 1) if avanco < JANELA else 1
+            self.maior = seq
+            self.epoch_max = max(self.epoch_max, epoch_ms)
+            return True
+        atras = (self.maior - seq) % _SEQ_MOD
+        if atras >= JANELA:
+            if epoch_ms <= self.epoch_max:
+                # fora da janela e sem timestamp novo: atrasada demais ou replay
+                stats["antigas"] += 1
+                return False
+            # seq baixo com epoch_ms posterior a tudo já visto: ESP32 reiniciou
+            stats["reinicios"] += 1
+            self.maior = seq
+            self.bitmap = (1 << JANELA) - 1
+            self.epoch_max = self.inicio = epoch_ms
+            return True
+        bit = 1 << atras
+        if self.bitmap & bit:
+            stats["duplicadas"] += 1
+            return False
+        self.bitmap |= bit
+        stats["lacunas"] -= 1          # chegou fora de ordem: preenche uma lacuna já contada
+        stats["fora_de_ordem"] += 1
+        self.epoch_max = max(self.epoch_max, epoch_ms)
+        return True
+
+
+# ---------------- servidor ----------------
+class UdpIngest:
+    def __init__(self, app):
+        self.app = app
+        self.sensors = set()
+        self.windows = {}
+        self.rows = []
+        self.pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="udp-writer")
+        self.wake = None
+        self.stats = {"quadros": 0, "quadros_invalidos": 0, "leituras": 0, "gravadas": 0,
+                      "duplicadas": 0, "antigas": 0, "reinicios": 0, "fora_de_ordem": 0, "lacunas": 0,
+                      "sensor_desconhecido": 0, "valor_invalido": 0, "alertas": 0, "erros": 0}
+
+    # ---- decodificação ----
+    def feed(self, data) -> int:
+        """Um quadro -> linhas na fila. Retorna quantas leituras foram aceitas."""
+        st = self.stats
+        try:
+            _, registros = decode_frame(data)
+        except ValueError:
+            st["quadros_invalidos"] += 1
+            return 0
+        st["quadros"] += 1
+        aceitas = 0
+        for id_sensor, epoch_ms, valor, seq in registros:
+            if id_sensor not in self.sensors:
+                st["sensor_desconhecido"] += 1
+                continue
+            if not math.isfinite(valor):
+                st["valor_invalido"] += 1
+                continue
+            janela = self.windows.get(id_sensor)
+            if janela is None:
+                self.windows[id_sensor] = SeqWindow(seq, epoch_ms)
+            elif not janela.accept(seq, epoch_ms, st):
+                continue
+            self.rows.append({
+                "id_sensor": id_sensor,
+                "leitura_valor": valor,
+                "leitura_data_hora": _EPOCH + timedelta(milliseconds=epoch_ms),
+            })
+            aceitas += 1
+        st["leituras"] += aceitas
+        if len(self.rows) >= BATCH_MAX and self.wake is not None:
+            self.wake.set()
+        return aceitas
+
+    # ---- gravação ----
+    def _write(self, rows):
+        from .ingest import ingest_batch
+        from .extensions import db
+        with self.app.app_context():
+            try:
+                _, alertas = ingest_batch(rows)
+            except Exception:
+                db.session.rollback()
+                raise
+        return len(alertas)
+
+    def _load_sensors(self):
+        from .extensions import db
+        from .models import Sensor
+        with self.app.app_context():
+            return {i for (i,) in db.session.query(Sensor.id_sensor)}
+
+    async def _flusher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await asyncio.wait_for(self.wake.wait(), FLUSH_MS / 1000.0)
+            except asyncio.TimeoutError:
+                pass
+            self.wake.clear()
+            if not self.rows:
+                continue
+            rows, self.rows = self.rows, []
+            try:
+                for i in range(0, len(rows), BATCH_MAX):
+                    self.stats["alertas"] += await loop.run_in_executor(
+                        self.pool, self._write, rows[i:i + BATCH_MAX])
+                    self.stats["gravadas"] += len(rows[i:i + BATCH_MAX])
+            except Exception as e:  # noqa: BLE001 — UDP não tem a quem devolver o erro
+                self.stats["erros"] += 1
+                print(f"[udp] falha ao gravar lote de {len(rows)}: {e}")
+
+    async def _refresh_sensors(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(SENSOR_REFRESH)
+            try:
+                self.sensors = await loop.run_in_executor(self.pool, self._load_sensors)
+            except Exception as e:  # noqa: BLE001
+                print(f"[udp] falha ao atualizar sensores: {e}")
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(STATS_SECONDS)
+            print(f"[udp] {self.stats}")
+
+    # ---- transporte ----
+    class _Datagram(asyncio.DatagramProtocol):
+        def __init__(self, owner):
+            self.owner = owner
+
+        def datagram_received(self, data, addr):
+            self.owner.feed(data)
+
+    async def _tcp(self, reader, writer):
+        try:
+            while True:
+                n = FRAME_LEN.unpack(await reader.readexactly(FRAME_LEN.size))[0]
+                self.feed(await reader.readexactly(n))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=HOST, port=PORT, tcp_port=TCP_PORT):
+        loop = asyncio.get_running_loop()
+        self.wake = asyncio.Event()
+        self.sensors = await loop.run_in_executor(self.pool, self._load_sensors)
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: UdpIngest._Datagram(self), local_addr=(host, port))
+        tasks = [asyncio.ensure_future(c) for c in (self._flusher(), self._refresh_sensors(), self._report())]
+        server = await asyncio.start_server(self._tcp, host, tcp_port) if tcp_port else None
+        print(f"[udp] ouvindo UDP {host}:{port}" + (f", TCP {host}:{tcp_port}" if tcp_port else "")
+              + f" (flush={FLUSH_MS}ms, lote<={BATCH_MAX})")
+        try:
+            if server is not None:
+                async with server:
+                    await server.serve_forever()
+            else:
+                await asyncio.Event().wait()
+        finally:
+            transport.close()
+            for t in tasks:
+                t.cancel()
+
+
+def main():
+    from .factory import create_cli_app
+    app = create_cli_app()
+    asyncio.run(UdpIngest(app).serve())
+
+
+if __name__ == "__main__":
+    main()
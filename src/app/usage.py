@@ -0,0 +1,45 @@
+# app/usage.py
+"""
+Reconciliação dos totais de uso mantidos em PECAS a partir do histórico de CICLOS_OPERACAO.
+
+PECAS.tempo_uso_total / qtd_ciclos / id_ciclo_aberto são atualizados pelos eventos de
+ciclo (app/api/cycles.py). Este comando reconstrói os três campos do zero — útil após
+migração do schema, cargas manuais em CICLOS_OPERACAO ou para auditoria.
+
+Como rodar:
+    docker compose exec web python -m app.usage
+"""
+from sqlalchemy import func, select, update
+from .extensions import db
+from .models import Peca, Ciclo
+
+
+def reconcile_usage() -> int:
+    """UPDATE único (subqueries correlacionadas por peça). Retorna nº de peças atualizadas."""
+    fechados = (Ciclo.id_peca == Peca.id_peca, Ciclo.data_fim.is_not(None))
+    soma = select(func.coalesce(func.sum(Ciclo.duracao), 0)).where(*fechados).scalar_subquery()
+    qtd = select(func.count(Ciclo.id_ciclo)).where(*fechados).scalar_subquery()
+    aberto = (
+        select(func.max(Ciclo.id_ciclo))
+        .where(Ciclo.id_peca == Peca.id_peca, Ciclo.data_fim.is_(None))
+        .scalar_subquery()
+    )
+    stmt = (
+        update(Peca)
+        .values(tempo_uso_total=soma, qtd_ciclos=qtd, id_ciclo_aberto=aberto)
+        .execution_options(synchronize_session=False)
+    )
+    n = db.session.execute(stmt).rowcount
+    db.session.commit()
+    return n
+
+
+def main():
+    from .factory import create_cli_app
+    with create_cli_app().app_context():
+        n = reconcile_usage()
+    print(f"[usage] totais reconstruídos para {n} peças.")
+
+
+if __name__ == "__main__":
+    main()
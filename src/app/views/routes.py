@@ -1,10 +1,11 @@
 from flask import Blueprint, render_template
-from ..extensions import db
-from ..models import Leitura
+from ..stats import total_readings
+from ..dbrouting import read_replica
 
 views = Blueprint("views", __name__, template_folder="template", static_folder="static")
 
 @views.get("/")
+@read_replica
 def home():
-    total = db.session.query(Leitura).count()
+    total = total_readings()   # SUM em ESTATISTICAS_SENSOR (sem COUNT em LEITURAS_SENSOR)
     return render_template("dashboard.html", total_leituras=total)
@@ -1,33 +1,31 @@
-from flask import Flask
-from .config import Config
-from .extensions import db, migrate, admin, cors
+import click
+from flask_cors import CORS
+from .factory import create_base_app
 from .api.routes import bp as api_bp
 from .views.routes import views
-from .models import Peca, Sensor, Ciclo, Leitura, Falha, Alerta
-from flask_admin.contrib.sqla import ModelView
 from .api.cycles import bp_cycles
 from .api.alerts import bp_alerts
+from .profiling import init_profiling
 
 def create_app():
-    app = Flask(__name__)
-    app.config.from_object(Config)
+    app = create_base_app()
 
-    cors.init_app(app)
-    db.init_app(app)
-    migrate.init_app(app, db)
+    CORS(app)
+    if click.get_current_context(silent=True) is not None:
+        # carregado pelo CLI do flask (flask db ...): gunicorn/workers não importam o alembic
+        from flask_migrate import Migrate
+        from .extensions import db
+        Migrate(app, db)
+    init_profiling(app)
 
     app.register_blueprint(api_bp)
     app.register_blueprint(views)
     app.register_blueprint(bp_cycles)
     app.register_blueprint(bp_alerts)
 
-    admin.init_app(app)
-    admin.add_view(ModelView(Peca, db.session))
-    admin.add_view(ModelView(Sensor, db.session))
-    admin.add_view(ModelView(Ciclo, db.session))
-    admin.add_view(ModelView(Leitura, db.session))
-    admin.add_view(ModelView(Falha, db.session))
-    admin.add_view(ModelView(Alerta, db.session))
+    if app.config["ADMIN_ENABLED"]:
+        from .admin_views import init_admin
+        init_admin(app)
 
     @app.get("/health")
     def health(): return {"status": "ok"}
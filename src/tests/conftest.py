@@ -0,0 +1,5 @@
+# tests/conftest.py — `python -m pytest` a partir de src/ ou da raiz do repositório
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
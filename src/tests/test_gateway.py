@@ -0,0 +1,86 @@
+# tests/test_gateway.py
+"""
+Gateway assíncrono (app/gateway.py) contra SQLite: requisições concorrentes passam pelo
+Batcher e viram um lote; uma requisição com linha inválida (FK de sensor removido depois
+do refresh) recebe 500 sozinha e as demais do mesmo lote são gravadas.
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event, func, select
+
+from app.extensions import db
+from app.gateway import Batcher, Gateway
+from app.models import Leitura, Peca, Sensor
+
+T0 = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    eng = create_engine(f"sqlite:///{tmp_path / 'gw.db'}")
+
+    @event.listens_for(eng, "connect")
+    def _fk(dbapi_conn, record):
+        dbapi_conn.execute("PRAGMA foreign_keys=ON")
+
+    db.metadata.create_all(eng)
+    with eng.begin() as conn:
+        conn.execute(Peca.__table__.insert(), [{"id_peca": 1, "tipo": "rolamento"}])
+        conn.execute(Sensor.__table__.insert(), [
+            {"id_sensor": s, "tipo_sensor": "temperatura", "id_peca": 1} for s in (1, 2)])
+    yield eng
+    eng.dispose()
+
+
+def _corpo(id_sensor, n, base=0):
+    return json.dumps([{"id_sensor": id_sensor, "leitura_valor": float(base + i),
+                        "leitura_data_hora": (T0 + timedelta(seconds=base + i)).isoformat()}
+                       for i in range(n)]).encode()
+
+
+async def _postar(engine, corpos):
+    gw = Gateway(engine)
+    gw.batcher = Batcher(engine, asyncio.get_running_loop())
+    gw.sensors = {1, 2, 999}          # 999: sensor no cache mas já removido do banco
+    tarefa = asyncio.ensure_future(gw.batcher.run())
+    try:
+        res = await asyncio.gather(*(gw.dispatch("POST", "/api/readings", c) for c in corpos))
+    finally:
+        tarefa.cancel()
+    return res, gw.batcher
+
+
+def _leituras(engine):
+    with engine.connect() as conn:
+        return dict(conn.execute(select(Leitura.id_sensor, func.count())
+                                 .group_by(Leitura.id_sensor)).all())
+
+
+def test_requisicoes_concorrentes_num_lote(engine):
+    corpos = [_corpo(1 + i % 2, 10, base=i * 10) for i in range(20)]
+    res, batcher = asyncio.run(_postar(engine, corpos))
+    assert [s for s, _ in res] == [201] * 20
+    assert sum(r["accepted"] for _, r in res) == 200
+    assert _leituras(engine) == {1: 100, 2: 100}
+    assert batcher.stats["rows"] == 200 and batcher.pending == 0
+    assert batcher.stats["batches"] < 20          # agrupadas, não uma transação por requisição
+    assert batcher.stats["errors"] == batcher.stats["fallbacks"] == 0
+
+
+def test_linha_invalida_so_falha_a_propria_requisicao(engine):
+    corpos = [_corpo(1, 5), _corpo(999, 3), _corpo(2, 5, base=100), _corpo(1, 5, base=200)]
+    res, batcher = asyncio.run(_postar(engine, corpos))
+    assert [s for s, _ in res] == [201, 500, 201, 201]
+    assert res[1][1] == {"error": "falha ao gravar lote"}
+    assert _leituras(engine) == {1: 10, 2: 5}
+    assert batcher.stats["errors"] == 1 and batcher.stats["fallbacks"] == 1
+    assert batcher.stats["rows"] == 15 and batcher.pending == 0
+
+
+def test_sensor_fora_do_cache_recusado_sem_gravar(engine):
+    res, batcher = asyncio.run(_postar(engine, [_corpo(3, 2)]))
+    assert res == [(400, {"error": "id_sensor inexistente", "id_sensor": [3]})]
+    assert _leituras(engine) == {} and batcher.stats["batches"] == 0
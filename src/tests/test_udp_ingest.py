@@ -0,0 +1,124 @@
+# tests/test_udp_ingest.py
+"""
+Protocolo binário (app/udp_ingest.py): ida e volta do encoder de referência, rejeição
+de quadros truncados/malformados e a janela de seq por sensor (duplicadas, fora de
+ordem, lacunas, volta do u32, replay e reinício do dispositivo).
+"""
+import math
+import struct
+
+import pytest
+
+from app.udp_ingest import (HEADER, JANELA, MAX_POR_DATAGRAMA, RECORD, SeqWindow, UdpIngest,
+                            decode_frame, encode_frame, encode_frames)
+
+T0 = 1_700_000_000_000
+
+
+def _stats():
+    return {"duplicadas": 0, "antigas": 0, "reinicios": 0, "fora_de_ordem": 0, "lacunas": 0}
+
+
+def _seqs(janela, seqs, stats, epoch=None):
+    """Aplica a sequência; epoch_ms cresce com o seq salvo quando `epoch` é dado."""
+    return [janela.accept(s, T0 + s if epoch is None else epoch, stats) for s in seqs]
+
+
+# ---------------- protocolo ----------------
+def test_ida_e_volta():
+    regs = [(7, T0 + i, float(i) * 0.5, i) for i in range(10)]
+    disp, it = decode_frame(encode_frame(regs, id_dispositivo=42))
+    assert disp == 42
+    assert list(it) == regs
+
+
+def test_encode_frames_cabe_no_datagrama():
+    regs = [(1, T0, 1.0, i) for i in range(MAX_POR_DATAGRAMA * 2 + 5)]
+    quadros = encode_frames(regs)
+    assert [len(q) for q in quadros] == [HEADER.size + n * RECORD.size
+                                         for n in (MAX_POR_DATAGRAMA, MAX_POR_DATAGRAMA, 5)]
+    assert [r for q in quadros for r in decode_frame(q)[1]] == regs
+
+
+def test_encode_rejeita_quadro_vazio_ou_grande():
+    with pytest.raises(ValueError):
+        encode_frame([])
+    with pytest.raises(ValueError):
+        encode_frame([(1, T0, 1.0, i) for i in range(256)])
+
+
+@pytest.mark.parametrize("quadro", [
+    b"",
+    b"LS\x01",                                                  # menor que o cabeçalho
+    encode_frame([(1, T0, 1.0, 1), (1, T0, 2.0, 2)])[:-1],      # truncado
+    encode_frame([(1, T0, 1.0, 1)]) + b"\x00",                  # sobra
+    b"XX" + encode_frame([(1, T0, 1.0, 1)])[2:],                # magic
+    b"LS\x02" + encode_frame([(1, T0, 1.0, 1)])[3:],            # versão
+    HEADER.pack(b"LS", 1, 0, 0),                                # n = 0
+])
+def test_decode_rejeita_malformado(quadro):
+    with pytest.raises(ValueError):
+        decode_frame(quadro)
+
+
+def test_feed_conta_invalidos_e_descartados():
+    ing = UdpIngest(app=None)
+    ing.sensors = {1}
+    assert ing.feed(b"lixo") == 0
+    quadro = encode_frame([(1, T0, 1.0, 1), (2, T0, 1.0, 1), (1, T0 + 1, math.nan, 2),
+                           (1, T0 + 2, 3.0, 3), (1, T0 + 2, 3.0, 3)])
+    assert ing.feed(quadro) == 2
+    st = ing.stats
+    assert (st["quadros_invalidos"], st["quadros"], st["sensor_desconhecido"],
+            st["valor_invalido"], st["duplicadas"]) == (1, 1, 1, 1, 1)
+    assert [r["leitura_valor"] for r in ing.rows] == [1.0, 3.0]
+
+
+# ---------------- janela de seq ----------------
+def test_duplicada_descartada():
+    st = _stats()
+    j = SeqWindow(10, T0 + 10)
+    assert _seqs(j, [11, 11, 10], st) == [True, False, False]
+    assert st["duplicadas"] == 2
+
+
+def test_lacuna_e_fora_de_ordem():
+    st = _stats()
+    j = SeqWindow(1, T0 + 1)
+    assert _seqs(j, [2, 5], st) == [True, True]
+    assert st["lacunas"] == 2
+    assert _seqs(j, [4, 3, 4], st) == [True, True, False]
+    assert (st["lacunas"], st["fora_de_ordem"], st["duplicadas"]) == (0, 2, 1)
+
+
+def test_volta_do_u32_sem_lacuna():
+    st = _stats()
+    j = SeqWindow(2**32 - 2, T0)
+    assert [j.accept(s, T0 + i, st) for i, s in enumerate([2**32 - 1, 0, 1], 1)] == [True] * 3
+    assert j.maior == 1
+    assert st["lacunas"] == 0
+    assert j.accept(2**32 - 1, T0 + 9, st) is False          # ainda dentro da janela
+    assert st["duplicadas"] == 1
+
+
+def test_replay_fora_da_janela_e_descartado():
+    st = _stats()
+    j = SeqWindow(1, T0 + 1)
+    assert all(_seqs(j, range(2, 1001), st))
+    assert j.accept(900, T0 + 900, st) is False               # replay: epoch_ms antigo
+    assert j.accept(1001, T0 + 1001, st) is True
+    assert st["lacunas"] == 0
+    assert not any(_seqs(j, range(990, 1001), st))            # nada duplica em LEITURAS
+    assert (st["antigas"], st["duplicadas"], st["reinicios"]) == (1, 11, 0)
+
+
+def test_reinicio_exige_epoch_posterior():
+    st = _stats()
+    j = SeqWindow(5000, T0)
+    assert j.accept(3, T0, st) is False                       # mesmo epoch: antiga
+    assert j.accept(3, T0 + 60_000, st) is True               # seq baixo e tempo novo: reinício
+    assert (st["antigas"], st["reinicios"], j.maior) == (1, 1, 3)
+    assert j.accept(4, T0 + 60_001, st) is True
+    # quadro da execução anterior chegando atrasado: seq "à frente", epoch antes do reinício
+    assert j.accept(5001, T0 + 1, st) is False
+    assert st["antigas"] == 2 and j.maior == 4